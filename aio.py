@@ -0,0 +1,186 @@
+import asyncio
+from collections import namedtuple
+
+from engine import STATE_STOPPED, PlaybackEngine
+
+# ======================================================================================
+# MIDI PLAYER | asyncio 인터페이스
+# asyncio 기반 서비스에 재생기를 넣기 위한 래퍼입니다. 전송은 그대로 엔진의 재생 스레드가 하므로
+# 이벤트 루프가 잠시 막혀도 MIDI 타이밍에는 영향이 없습니다.
+# 래퍼는 스레드를 따로 만들지 않고(엔진 콜백 -> call_soon_threadsafe), 일시정지 / 정지된 재생기는
+# 조건 변수에서 대기하거나 스레드가 없으므로 한 프로세스에서 여러 개를 띄워도 CPU 를 쓰지 않습니다.
+#
+#   player = AsyncPlayer()
+#   await player.open_port("포트 이름")
+#   await player.load("file.mid")
+#   await player.play()
+#   async for event in player.events():
+#       ...
+# ======================================================================================
+
+# kind: "state" / "position" / "finished" / "error"
+PlayerEvent = namedtuple('PlayerEvent', ['kind', 'state', 'position', 'error'])
+
+# 구독자 큐에 이만큼 쌓여 있으면 위치 이벤트는 버림 (상태 / 끝남 / 오류 이벤트는 항상 넣음)
+EVENT_QUEUE_POSITIONS = 64
+
+
+class AsyncPlayer:
+    def __init__(self, params=None, cache=None, loop=None):
+        self.loop = loop if loop is not None else asyncio.get_running_loop()
+        self.engine = PlaybackEngine(params, on_state=self._from_thread(self._on_state),
+                                     on_finished=self._from_thread(self._on_finished),
+                                     on_error=self._from_thread(self._on_error),
+                                     cache=cache, on_position=self._from_thread(self._on_position))
+        self._subscribers = []
+        self._waiters = []  # wait_finished() 퓨처
+
+    # ------------------------------------------------------------------ 엔진 콜백 (재생 / 로드 스레드 -> 이벤트 루프)
+
+    def _from_thread(self, callback):
+        loop = self.loop
+
+        def post(*args):
+            try:
+                loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError:
+                pass  # 이벤트 루프가 이미 닫힘
+        return post
+
+    def _emit(self, kind, error=None):
+        event = PlayerEvent(kind, self.engine.state, self.engine.position, error)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def _on_state(self, state):
+        self._emit("state")
+
+    def _on_position(self):
+        position = self.engine.take_position()
+        if self._subscribers:
+            event = PlayerEvent("position", self.engine.state, position, None)
+            for queue in self._subscribers:
+                if queue.qsize() < EVENT_QUEUE_POSITIONS:
+                    queue.put_nowait(event)
+
+    def _on_finished(self):
+        self._emit("finished")
+        self._settle(True)
+
+    def _on_error(self, error):
+        self._emit("error", error)
+        self._settle(error)
+
+    def _settle(self, result):
+        # 대기 중인 wait_finished() 를 모두 깨움. True = 끝까지 재생, False = 중지, 예외 = 오류
+        waiters = self._waiters
+        self._waiters = []
+        for future in waiters:
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _call(self, function, *args):
+        # 스레드 join 등 잠깐 막힐 수 있는 엔진 호출은 루프 기본 실행기에서
+        return await self.loop.run_in_executor(None, function, *args)
+
+    # ------------------------------------------------------------------ 상태
+
+    @property
+    def state(self):
+        return self.engine.state
+
+    @property
+    def position(self):
+        return self.engine.position
+
+    @property
+    def duration(self):
+        return self.engine.duration
+
+    def configure(self, **settings):
+        # 재생 중에도 바로 적용 (스냅샷 교체뿐이라 막히지 않음)
+        return self.engine.configure(**settings)
+
+    # ------------------------------------------------------------------ 포트 / 파일
+
+    async def open_port(self, port_name):
+        return await self._call(self.engine.open_port, port_name)
+
+    async def open_ports(self, port_names, channels=None, tracks=None):
+        return await self._call(self.engine.open_ports, port_names, channels, tracks)
+
+    async def load(self, file_path, streaming=None, on_progress=None):
+        # 헤더를 읽고 재생 가능해지면 타임라인 반환 (나머지 디코딩은 백그라운드에서 계속)
+        # 재생 중이었다면 교체되는 순간 중지됨
+        future = self.loop.create_future()
+
+        def loaded(timeline):
+            if not future.done():
+                future.set_result(timeline)
+
+        def failed(error):
+            if not future.done():
+                future.set_exception(error)
+
+        progress = self._from_thread(on_progress) if on_progress is not None else None
+        self.engine.load_async(file_path, streaming, on_progress=progress,
+                               on_loaded=self._from_thread(loaded), on_error=self._from_thread(failed))
+        try:
+            timeline = await future
+        except asyncio.CancelledError:
+            self.engine.cancel_load()
+            raise
+        self._settle(False)
+        return timeline
+
+    async def close(self):
+        await self.stop()
+        await self._call(self.engine.unload)
+        await self._call(self.engine.close_port)
+
+    # ------------------------------------------------------------------ 재생 제어
+
+    async def play(self):
+        # 오류 계획 미리 계산이 있을 수 있으므로 실행기에서. 재생은 엔진의 재생 스레드가 함
+        return await self._call(self.engine.play)
+
+    async def pause(self):
+        return self.engine.pause()
+
+    async def seek(self, seconds):
+        await self._call(self.engine.seek, seconds)
+        return self.engine.position
+
+    async def stop(self):
+        stopped = await self._call(self.engine.stop)
+        self._settle(False)
+        return stopped
+
+    async def panic(self):
+        sent = await self._call(self.engine.panic)
+        self._settle(False)
+        return sent
+
+    async def wait_finished(self):
+        # 재생이 끝날 때까지 대기. 끝까지 재생했으면 True, 중지되면 False, 재생 오류는 예외로
+        # 일시정지 중에는 계속 대기 (재개 후 끝나면 반환)
+        if self.engine.state == STATE_STOPPED:
+            return False
+        future = self.loop.create_future()
+        self._waiters.append(future)
+        return await future
+
+    async def events(self):
+        # 상태 / 위치 / 끝남 / 오류 이벤트 (async for). 구독한 뒤의 이벤트만 받음
+        # 처리가 늦으면 위치 이벤트는 건너뜀 (최신 위치는 다음 이벤트로 옴)
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
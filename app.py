@@ -1,34 +1,68 @@
+import time
+
+# 시작 시간 측정 기준 (import 포함). 단계별 시간은 창이 뜨면 [BOOT] 로 한 번 출력
+_STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox, font
-import mido
-import time
-import threading
-import math
-import random
+import importlib.util
 import sys
 import os
-import traceback
+import shutil
+import threading
+
+from engine import PlaybackEngine
+from midi_output import list_output_names, rtmidi_available
+from midi_router import MidiRouter
+from scheduler import DEFAULT_SCHEDULER_MODE, clock
+from timeline_cache import TimelineCache
+from library import MidiLibrary
+from playlist import REPEAT_ALL, REPEAT_OFF, REPEAT_ONE, Playlist
+from error_plan import new_seed
 
 # ======================================================================================
 # MIDI PLAYER | RIHA STUDIO | By Riha
 # ======================================================================================
 
-try:
-    import rtmidi
-    rtmidi_available = True
-    print("[LIB]: python-rtmidi 라이브러리가 정상 설치 상태입니다.")
-except ImportError:
-    rtmidi_available = False
-    print("[LIB]: python-rtmidi 라이브러리를 감지하지 못했습니다. 플레이어가 비활성화 됩니다.")
-    print("[LIB]: 설치 오류 발생 시, 안내된 Visual C++ Build Tools 설치 후 다시 시도하세요.")
+# rtmidi / mido / ttkthemes 는 설치 여부만 확인하고, 실제 import 는 처음 쓸 때 (시작 시간 단축)
+ttkthemes_available = importlib.util.find_spec("ttkthemes") is not None
+
+
+def report_libraries():
+    # GUI 실행 때만 출력 (headless 렌더를 표준 출력으로 보낼 때 섞이지 않도록)
+    if rtmidi_available:
+        print("[LIB]: python-rtmidi 라이브러리가 정상 설치 상태입니다.")
+    else:
+        print("[LIB]: python-rtmidi 라이브러리를 감지하지 못했습니다. 플레이어가 비활성화 됩니다.")
+        print("[LIB]: 설치 오류 발생 시, 안내된 Visual C++ Build Tools 설치 후 다시 시도하세요.")
+    if ttkthemes_available:
+        print("[LIB]: ttkthemes 라이브러리가 정상 설치 상태입니다.")
+    else:
+        print("[LIB]: ttkthemes 라이브러리를 감지하지 못했습니다. 기본 ttk 스타일을 사용합니다.")
+
+_startup_marks = []
+
 
-try:
-    from ttkthemes import ThemedStyle
-    _global_themed_style_imported = True
-    print("[LIB]: ttkthemes 라이브러리가 정상 설치 상태입니다.")
-except ImportError:
-    _global_themed_style_imported = False
-    print("[LIB]: ttkthemes 라이브러리를 감지하지 못했습니다. 기본 ttk 스타일을 사용합니다.")
+def startup_mark(label):
+    _startup_marks.append((label, time.perf_counter()))
+
+
+def startup_report():
+    # 단계별 경과 시간. import 별 자세한 시간은 python bench.py --startup (python -X importtime)
+    previous = _STARTUP_T0
+    parts = []
+    for label, at in _startup_marks:
+        parts.append(f"{label} {(at - previous) * 1000:.0f}ms")
+        previous = at
+    print(f"[BOOT]: 시작 {(previous - _STARTUP_T0) * 1000:.0f}ms ({' / '.join(parts)})")
+
+
+startup_mark("import")
+
+# 라이브러리 창에 한 번에 추가하는 행 수 (나머지는 다음 이벤트 루프에서)
+LIBRARY_ROWS_PER_TICK = 300
+# 재생 중 속도 슬라이더를 움직이면 이 시간(초) 동안 새 속도로 부드럽게 바뀜
+SPEED_SLIDER_RAMP = 0.3
 
 
 class MidiPlayerApp:
@@ -40,40 +74,54 @@ class MidiPlayerApp:
         self.root.resizable(False, False)
 
         self.midi_file_path = None
-        self.mid = None
-        self.is_playing = False
-        self.is_paused = False
-        self.stop_event = threading.Event()
-        self.pause_event = threading.Event()
-        self.playback_thread = None
-        self.current_playback_time = 0.0
-        self.total_midi_time = 0.0
-        self.cumulative_times = []
 
-        self.notes_paused = []
-        self.pedal_paused = []
-
-        self.outport = None
+        # 재생 엔진의 콜백은 재생 스레드에서 호출되므로 Tk 쪽 처리는 모두 root.after 로 넘김
+        self.engine = PlaybackEngine(
+            on_finished=lambda: self.root.after(0, self._on_playback_finished),
+            on_error=lambda e: self.root.after(0, lambda: self._on_playback_error(e)),
+            on_position=lambda: self.root.after_idle(self._on_position_published),
+            cache=TimelineCache(),
+        )
+        self.params = self.engine.params
+        # 재생목록: 다음 곡을 백그라운드에서 미리 읽어 두고 곡 사이에 멈춤 없이 이어서 재생
+        self.playlist = Playlist(
+            self.engine,
+            on_change=lambda index, file_path: self.root.after(0, lambda: self._on_playlist_changed(file_path)),
+            on_error=lambda file_path, e: self.root.after(0, lambda: self._on_playlist_error(file_path, e)),
+        )
+        self.playlist_repeat = tk.StringVar(value=REPEAT_OFF)
+        self.playlist_shuffle = tk.BooleanVar(value=False)
+        self.playlist_gap = tk.DoubleVar(value=0.0)
 
         self.error_mode_enabled = tk.BooleanVar(value=False)
         self.error_percentage = tk.DoubleVar(value=5.0)
         self.error_pitch_range = tk.IntVar(value=3)
-        self.active_notes = {}
+
+        self._latency_status_time = 0.0
+        # 탐색 바 / 시간 표시에 마지막으로 그린 값 (바뀐 게 없으면 다시 그리지 않음)
+        self._shown_progress = -1.0
+        self._shown_time = None
+        self._seek_dragging = False
+        self.scheduler_mode = tk.StringVar(value=DEFAULT_SCHEDULER_MODE)
+        self.streaming_mode = tk.BooleanVar(value=False)
 
         self.style = ttk.Style()
 
         self.app_font = None
         try:
-            available_fonts = list(font.families())
+            # font.families() 로 전체 글꼴을 나열하면 글꼴이 많은 시스템에서 느리므로, 후보 이름으로 만들어 보고 실제로 잡힌 글꼴인지만 확인
+            # 맞지 않은 후보는 참조를 바로 끊어 Font.__del__ 이 Tk 의 이름 있는 글꼴을 삭제하게 함
             pretendard_names = ['Pretendard', 'Pretendard Regular', 'Pretendard-Regular']
             found_font_name = None
             for p_name in pretendard_names:
-                if p_name in available_fonts:
+                candidate = font.Font(family=p_name, size=9)
+                if candidate.actual("family").lower() == p_name.lower():
                     found_font_name = p_name
+                    self.app_font = candidate
                     break
+                candidate = None
 
             if found_font_name:
-                self.app_font = font.Font(family=found_font_name, size=9)
                 print(f"[FONT]: '{found_font_name}' 폰트 감지 및 적용을 시도하고 있습니다...")
                 self.style.configure('.', font=self.app_font)
                 self.style.configure('TCheckbutton', font=self.app_font)
@@ -83,25 +131,15 @@ class MidiPlayerApp:
             print(f"[ERR]: 폰트 설정 중 오류 발생: {e}. 사용자 기본 폰트를 사용합니다.")
             self.app_font = None
 
-        self.themed_style_available = False
+        # 기본 테마 'clam' 은 ttk 에 들어 있으므로 바로 적용. ttkthemes 는 테마 메뉴를 처음 열 때 import
+        self.themed_style_available = ttkthemes_available
         self.themed_style = None
-
-        if _global_themed_style_imported:
-             try:
-                  self.themed_style = ThemedStyle(self.root)
-                  self.themed_style_available = True
-                  print("[TEM]: ttk 테마가 적용 준비 되었습니다.  >  기본 테마 적용 준비중...")
-                  try:
-                       self.themed_style.set_theme("clam")
-                       print("[TEM]: 시스템 기본 테마 'clam' 이 적용되었습니다.")
-                  except Exception as theme_apply_e:
-                       print(f"[ERR]: 시스템 기본 테마 'clam' 를 적용하는 도중 오류가 발생했습니다: {theme_apply_e}, 테마 기능이 비활성화 됩니다.")
-                       self.themed_style_available = False
-                       self.themed_style = None
-             except Exception as e:
-                 print(f"[ERR]: ThemedStyle 객체 생성 중 오류 발생: {e}. 테마 기능이 비활성화 됩니다.")
-                 self.themed_style_available = False
-                 self.themed_style = None
+        try:
+            self.style.theme_use("clam")
+            print("[TEM]: 시스템 기본 테마 'clam' 이 적용되었습니다.")
+        except tk.TclError as e:
+            print(f"[ERR]: 시스템 기본 테마 'clam' 를 적용하는 도중 오류가 발생했습니다: {e}")
+        startup_mark("폰트/테마")
 
         self.menubar = tk.Menu(root)
         self.root.config(menu=self.menubar)
@@ -111,6 +149,16 @@ class MidiPlayerApp:
         self.menubar.add_cascade(label="파일", menu=self.filemenu)
         self.filemenu.add_command(label="MIDI 파일 열기", command=self.open_midi_file,
                                   font=self.app_font if self.app_font else None)
+        self.filemenu.add_command(label="로드 취소", command=self.cancel_file_load,
+                                  font=self.app_font if self.app_font else None)
+        self.filemenu.add_command(label="MIDI 라이브러리", command=self.open_library_window,
+                                  font=self.app_font if self.app_font else None)
+        self.filemenu.add_command(label="여러 파일을 재생목록으로 열기", command=self.open_playlist_files,
+                                  font=self.app_font if self.app_font else None)
+        self.filemenu.add_command(label="라이브러리 전체 재생", command=self.play_library_playlist,
+                                  font=self.app_font if self.app_font else None)
+        self.filemenu.add_command(label="타이밍 기록 내보내기", command=self.export_latency_log,
+                                  font=self.app_font if self.app_font else None)
         self.filemenu.add_separator()
         self.filemenu.add_command(label="종료", command=self.on_closing,
                                   font=self.app_font if self.app_font else None)
@@ -120,27 +168,46 @@ class MidiPlayerApp:
         self.controlmenu_play = self.controlmenu.add_command(label="재생", command=self.play_midi, font=self.app_font if self.app_font else None)
         self.controlmenu_pause = self.controlmenu.add_command(label="일시정지", command=self.pause_midi, font=self.app_font if self.app_font else None)
         self.controlmenu_stop = self.controlmenu.add_command(label="중지", command=self.stop_midi, font=self.app_font if self.app_font else None)
+        self.controlmenu.add_separator()
+        self.controlmenu.add_command(label="다음 곡", command=self.next_in_playlist, font=self.app_font if self.app_font else None)
+        self.controlmenu.add_command(label="이전 곡", command=self.previous_in_playlist, font=self.app_font if self.app_font else None)
+        self.repeatmenu = tk.Menu(self.controlmenu, tearoff=0)
+        self.controlmenu.add_cascade(label="반복", menu=self.repeatmenu, font=self.app_font if self.app_font else None)
+        for repeat_label, repeat_mode in (("반복 안 함", REPEAT_OFF), ("전체 반복", REPEAT_ALL), ("한 곡 반복", REPEAT_ONE)):
+            self.repeatmenu.add_radiobutton(label=repeat_label, value=repeat_mode, variable=self.playlist_repeat,
+                                            command=self._on_playlist_repeat_changed,
+                                            font=self.app_font if self.app_font else None)
+        self.controlmenu.add_checkbutton(label="셔플", variable=self.playlist_shuffle, command=self._on_playlist_shuffle_changed,
+                                         font=self.app_font if self.app_font else None)
+        self.gapmenu = tk.Menu(self.controlmenu, tearoff=0)
+        self.controlmenu.add_cascade(label="곡 사이 간격", menu=self.gapmenu, font=self.app_font if self.app_font else None)
+        for gap_seconds in (0.0, 1.0, 2.0, 5.0):
+            self.gapmenu.add_radiobutton(label="없음" if gap_seconds == 0 else f"{gap_seconds:.0f}초", value=gap_seconds,
+                                         variable=self.playlist_gap, command=self._on_playlist_gap_changed,
+                                         font=self.app_font if self.app_font else None)
+        self.controlmenu.add_separator()
+        self.controlmenu.add_command(label="모든 소리 끄기 (패닉)", command=self.panic_midi, font=self.app_font if self.app_font else None)
 
         self.settingsmenu = tk.Menu(self.menubar, tearoff=0)
         self.menubar.add_cascade(label="설정", menu=self.settingsmenu)
 
-        if self.themed_style_available and self.themed_style is not None:
-            self.thememenu = tk.Menu(self.settingsmenu, tearoff=0)
+        self.timingmenu = tk.Menu(self.settingsmenu, tearoff=0)
+        self.settingsmenu.add_cascade(label="타이밍 모드", menu=self.timingmenu, font=self.app_font if self.app_font else None)
+        for mode_name, mode_label in (("precise", "정밀 (CPU 사용 많음)"), ("balanced", "균형"), ("eco", "절전")):
+            self.timingmenu.add_radiobutton(label=mode_label, value=mode_name, variable=self.scheduler_mode,
+                                            font=self.app_font if self.app_font else None)
+        self.settingsmenu.add_checkbutton(label="대용량 스트리밍 모드", variable=self.streaming_mode,
+                                          font=self.app_font if self.app_font else None)
+        self.settingsmenu.add_command(label="타임라인 캐시 비우기", command=self.clear_timeline_cache,
+                                      font=self.app_font if self.app_font else None)
+        self.settingsmenu.add_command(label="다중 포트 출력 / 라우팅", command=self.open_routing_window,
+                                      font=self.app_font if self.app_font else None)
+
+        if self.themed_style_available:
+            self.thememenu = tk.Menu(self.settingsmenu, tearoff=0, postcommand=self._populate_theme_menu)
             self.settingsmenu.add_cascade(label="테마 변경", menu=self.thememenu, font=self.app_font if self.app_font else None)
-            try:
-                available_themes = self.themed_style.get_themes()
-                for theme_name in sorted(available_themes):
-                     self.thememenu.add_command(label=theme_name, command=lambda name=theme_name: self.set_theme(name),
-                                                font=self.app_font if self.app_font else None)
-            except Exception as e:
-                 try:
-                      index = self.settingsmenu.index("테마 변경")
-                      self.settingsmenu.entryconfig(index, state=tk.DISABLED, label="(테마 목록 로드 오류)")
-                 except tk.TclError:
-                      pass
         else:
-             status_text = "(ttkthemes 미설치)" if not _global_themed_style_imported else "(테마 로드/적용 오류)"
-             self.settingsmenu.add_command(label=status_text, state=tk.DISABLED, font=self.app_font if self.app_font else None)
+             self.settingsmenu.add_command(label="(ttkthemes 미설치)", state=tk.DISABLED, font=self.app_font if self.app_font else None)
 
         self.status_bar = ttk.Label(root, text="준비됨", relief=tk.SUNKEN, anchor=tk.W, font=self.app_font if self.app_font else None)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
@@ -162,7 +229,19 @@ class MidiPlayerApp:
         self.save_button = ttk.Button(self.file_frame, text="현재 파일 저장", command=self.save_current_midi)
         self.save_button.pack(side=tk.RIGHT, padx=5)
 
-        # 콤보박스 리스트 갱신
+        # 로드 진행률 / 취소 (로드 중에만 표시)
+        self.load_progress = ttk.Progressbar(self.file_frame, mode="determinate", length=120, maximum=100)
+        self.load_cancel_button = ttk.Button(self.file_frame, text="취소", command=self.cancel_file_load)
+
+        # 콤보박스 리스트 갱신 (저장된 인덱스로 바로 채우고, 바뀐 파일은 백그라운드에서 스캔)
+        self.library = MidiLibrary()
+        self.library_window = None
+        self.routing_window = None
+        self.route_channels = {}  # 채널 -> 포트 이름 (다중 포트 출력)
+        self.route_tracks = {}  # 트랙 번호 -> 포트 이름
+        self._library_rescan = False
+        self._library_view_generation = 0
+        self._library_filter_job = None
         self.refresh_saved_midi_list()
 
         self.control_frame = ttk.LabelFrame(root, text="재생 제어")
@@ -247,26 +326,43 @@ class MidiPlayerApp:
         self.timing_variance_value_label.grid(row=3, column=2, padx=10, pady=3, sticky="w")
         self.timing_variance_scale.bind("<Motion>", lambda e: self.timing_variance_value_label.config(text=f"{self.timing_variance.get():.1f}%"))
 
+        # 오류 계획 시드: 같은 시드 / 같은 설정이면 같은 오타 / 타이밍 오차가 재현됨
+        self.error_seed = tk.IntVar(value=new_seed())
+        self.error_seed_label = ttk.Label(self.error_frame, text="시드:", font=self.app_font if self.app_font else None)
+        self.error_seed_label.grid(row=4, column=0, padx=10, pady=3, sticky="w")
+        self.error_seed_spinbox = ttk.Spinbox(self.error_frame, from_=0, to=999999, increment=1, textvariable=self.error_seed, width=10)
+        self.error_seed_spinbox.grid(row=4, column=1, padx=5, pady=3, sticky="w")
+        self.error_seed_button = ttk.Button(self.error_frame, text="새 시드", command=lambda: self.error_seed.set(new_seed()))
+        self.error_seed_button.grid(row=4, column=2, padx=10, pady=3, sticky="w")
+
         self.error_frame.grid_columnconfigure(1, weight=1)
 
         self.pedal_mode_enabled = tk.BooleanVar(value=True)
         self.pedal_check = ttk.Checkbutton(self.settings_frame, text="페달 모드 사용", variable=self.pedal_mode_enabled)
         self.pedal_check.grid(row=2, column=0, columnspan=3, padx=10, pady=3, sticky="w")
 
+        for variable in (self.error_mode_enabled, self.error_percentage, self.error_pitch_range,
+                         self.timing_variance, self.error_seed, self.pedal_mode_enabled, self.scheduler_mode):
+            variable.trace_add("write", self._publish_params)
+        self._publish_params()
+
 
         self.seek_frame = ttk.Frame(root)
         self.seek_frame.pack(pady=(10, 15), padx=15, fill=tk.X)
 
         self.seek_scale = ttk.Scale(self.seek_frame, from_=0, to=100, orient=tk.HORIZONTAL, command=self.seek_midi_drag)
         self.seek_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.seek_scale.bind("<ButtonPress-1>", self.on_seek_press)
         self.seek_scale.bind("<ButtonRelease-1>", self.on_seek_release)
 
         self.time_label = ttk.Label(self.seek_frame, text="00:00 / 00:00", font=self.app_font if self.app_font else None)
         self.time_label.pack(side=tk.RIGHT, padx=5)
 
         self._update_button_states()
+        startup_mark("위젯")
 
     def update_midi_ports(self):
+        self.available_ports = []  # 실제 포트 이름만 (output_ports 에는 안내 문구가 들어갈 수 있음)
         if not rtmidi_available:
             self.output_ports = ["python-rtmidi 라이브러리 미감지로 비활성화."]
             if hasattr(self, 'port_menu'):
@@ -277,8 +373,35 @@ class MidiPlayerApp:
             self._update_button_states()
             return
 
+        # 포트 조회(rtmidi 로드 포함)는 가상 포트가 많거나 드라이버가 느리면 오래 걸리므로 워커 스레드에서 하고,
+        # 결과만 Tk 스레드로 넘겨서 메뉴를 채움. 그동안 창은 바로 뜨고 반응함
+        self.output_ports = ["MIDI 포트 검색 중..."]
+        if hasattr(self, 'port_menu'):
+            self.port_menu.config(state=tk.DISABLED)
+            self.selected_port_name.set(self.output_ports[0])
+        if hasattr(self, 'status_bar'):
+            self.status_bar.config(text="MIDI 포트 검색 중...")
+        self._update_button_states()
+        self._port_scan_id = getattr(self, '_port_scan_id', 0) + 1
+        threading.Thread(target=self._scan_midi_ports, args=(self._port_scan_id,), daemon=True).start()
+
+    def _scan_midi_ports(self, scan_id):
+        try:
+            port_names, error = list_output_names(), None
+        except Exception as e:
+            port_names, error = None, e
+        try:
+            self.root.after(0, lambda: self._apply_midi_ports(scan_id, port_names, error))
+        except (RuntimeError, tk.TclError):
+            pass  # 창이 이미 닫힘
+
+    def _apply_midi_ports(self, scan_id, port_names, error):
+        if scan_id != self._port_scan_id:
+            return  # 그사이 다시 검색함
         try:
-            self.output_ports = mido.get_output_names()
+            if error is not None:
+                raise error
+            self.output_ports = port_names
             if not self.output_ports:
                 self.output_ports = ["출력 포트 없음"]
                 if hasattr(self, 'port_menu'):
@@ -289,6 +412,7 @@ class MidiPlayerApp:
                     self.status_bar.config(text="시스템에서 MIDI 포트를 찾을 수 없습니다.")
                 self._update_button_states()
             else:
+                self.available_ports = list(self.output_ports)
                 display_ports = ["포트를 선택하세요..."] + self.output_ports
                 if hasattr(self, 'port_menu'):
                     self.port_menu.config(state=tk.NORMAL)
@@ -323,7 +447,7 @@ class MidiPlayerApp:
 
     def select_midi_port(self, port_name):
         print(f"\n[포트 선택 시도] 선택된 포트: {port_name}")
-        if port_name in ["포트를 선택하세요...", "출력 포트 없음"] or "오류" in port_name:
+        if port_name in ["포트를 선택하세요...", "출력 포트 없음", "MIDI 포트 검색 중..."] or "오류" in port_name:
             print(f"유효하지 않은 포트 선택 무시: {port_name}")
             return
 
@@ -331,29 +455,123 @@ class MidiPlayerApp:
 
         try:
             print(f"포트 열기 시도: {port_name}")
-            self.outport = mido.open_output(port_name)
-            print(f"포트 열기 성공: {self.outport}")
+            outport = self.engine.open_port(port_name)
+            print(f"포트 열기 성공: {outport.name}")
             self._update_button_states()
         except Exception as e:
             print(f"포트 열기 실패: {str(e)}")
-            self.outport = None
             messagebox.showerror("오류", f"포트 열기 실패: {e}")
 
     def close_midi_port(self):
-        if self.outport is not None:
+        if self.engine.outport is not None:
             try:
-                if not self.outport.closed:
-                     print(f"MIDI 포트 닫는 중: {self.outport.name}")
-                     self.outport.close()
+                self.engine.close_port()
             except Exception as e:
                 print(f"MIDI 포트 닫기 오류: {e}")
             finally:
-                self.outport = None
                 self._update_button_states()
 
-    def open_midi_file(self):
-        self.stop_midi()
+    # ------------------------------------------------------------------ 다중 포트 출력 / 라우팅
 
+    def open_routing_window(self):
+        if not rtmidi_available:
+            messagebox.showwarning("경고", "python-rtmidi 라이브러리가 없어 다중 포트 출력을 사용할 수 없습니다.")
+            return
+        if self.routing_window is not None and self.routing_window.winfo_exists():
+            self.routing_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("다중 포트 출력 / 라우팅")
+        window.geometry("520x520")
+        self.routing_window = window
+
+        outport = self.engine.outport
+        active_ports = outport.port_names if isinstance(outport, MidiRouter) else []
+        ports_frame = ttk.LabelFrame(window, text="사용할 출력 포트 (첫 번째 포트가 기본)")
+        ports_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.routing_port_vars = {}
+        for port_name in self.available_ports:
+            variable = tk.BooleanVar(value=port_name in active_ports)
+            self.routing_port_vars[port_name] = variable
+            ttk.Checkbutton(ports_frame, text=port_name, variable=variable).pack(anchor=tk.W, padx=10)
+
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        tree = ttk.Treeview(frame, columns=("target", "port"), show="headings", selectmode="extended")
+        tree.heading("target", text="대상")
+        tree.heading("port", text="포트")
+        tree.column("target", width=120, stretch=False)
+        tree.column("port", width=340)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        for channel in range(16):
+            tree.insert("", tk.END, iid=f"ch{channel}", values=(f"채널 {channel + 1}", self.route_channels.get(channel, "기본")))
+        track_count = self.engine.timeline.track_count if self.engine.timeline is not None else 0
+        for track in range(track_count):
+            tree.insert("", tk.END, iid=f"tr{track}", values=(f"트랙 {track}", self.route_tracks.get(track, "채널 설정 따름")))
+        self.routing_tree = tree
+
+        assign = ttk.Frame(window)
+        assign.pack(fill=tk.X, padx=10, pady=5)
+        self.routing_target_port = tk.StringVar(value="기본")
+        ttk.Combobox(assign, textvariable=self.routing_target_port, state="readonly",
+                     values=["기본"] + list(self.routing_port_vars)).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(assign, text="선택 항목에 지정", command=self._assign_routing_port).pack(side=tk.LEFT, padx=5)
+
+        buttons = ttk.Frame(window)
+        buttons.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(buttons, text="적용", command=self._apply_routing).pack(side=tk.RIGHT)
+
+        self.routing_stats_label = ttk.Label(window, text="", justify=tk.LEFT, font=self.app_font if self.app_font else None)
+        self.routing_stats_label.pack(fill=tk.X, padx=10, pady=(0, 10))
+        self._update_routing_stats()
+
+    def _assign_routing_port(self):
+        port_name = self.routing_target_port.get()
+        for iid in self.routing_tree.selection():
+            number = int(iid[2:])
+            routes = self.route_channels if iid.startswith("ch") else self.route_tracks
+            if port_name == "기본":
+                routes.pop(number, None)
+                label = "기본" if iid.startswith("ch") else "채널 설정 따름"
+            else:
+                routes[number] = port_name
+                label = port_name
+            self.routing_tree.set(iid, "port", label)
+
+    def _apply_routing(self):
+        port_names = [name for name, variable in self.routing_port_vars.items() if variable.get()]
+        if not port_names:
+            messagebox.showwarning("경고", "사용할 출력 포트를 하나 이상 선택하세요.")
+            return
+        channels = {channel: [name] for channel, name in self.route_channels.items()}
+        tracks = {track: [name] for track, name in self.route_tracks.items()}
+        outport = self.engine.outport
+        try:
+            if isinstance(outport, MidiRouter) and outport.port_names == port_names:
+                # 포트 구성이 같으면 다시 열지 않고 라우팅만 교체 (재생 중에도 적용)
+                self.engine.set_routes(channels, tracks)
+            else:
+                self.engine.open_ports(port_names, channels, tracks)
+        except Exception as e:
+            messagebox.showerror("오류", f"포트 열기 실패: {e}")
+            self._update_button_states()
+            return
+        self.status_bar.config(text=f"다중 포트 출력: {self.engine.outport.name}")
+        self._update_button_states()
+
+    def _update_routing_stats(self):
+        # 라우팅 창이 열려 있는 동안만 1초마다 포트별 카운터 표시
+        if self.routing_window is None or not self.routing_window.winfo_exists():
+            return
+        lines = [f"{stat['name']}: 전송 {stat['sent']} ({stat['rate']:.0f}/s), 큐 {stat['depth']} (최대 {stat['max_depth']}), "
+                 f"버림 {stat['dropped']}" for stat in self.engine.port_stats()]
+        self.routing_stats_label.config(text="\n".join(lines) or "다중 포트 출력이 열려있지 않습니다.")
+        self.root.after(1000, self._update_routing_stats)
+
+    def open_midi_file(self):
         file_path = filedialog.askopenfilename(
             initialdir=".",
             title="MIDI 파일 선택",
@@ -370,68 +588,18 @@ class MidiPlayerApp:
                  self._update_button_states()
                  return
 
-            try:
-                self.mid = mido.MidiFile(file_path)
-                self.midi_file_path = file_path
-                display_name = os.path.basename(file_path)
-                if len(display_name) > 40:
-                     display_name = display_name[:37] + "..."
-                if hasattr(self, 'file_label'):
-                     self.file_label.config(text=f"로드됨: {display_name}")
-
-                self.total_midi_time = self.mid.length
-
-                self.cumulative_times = []
-                current_time = 0.0
-                for msg in self.mid:
-                    current_time += msg.time
-                    self.cumulative_times.append(current_time)
-
-                self.current_playback_time = 0.0
-                if hasattr(self, 'seek_scale'):
-                     self.seek_scale.set(0)
-
-                if hasattr(self, 'time_label'):
-                     self.update_time_label(0, self.total_midi_time)
-
-                if hasattr(self, 'status_bar'):
-                     self.status_bar.config(text=f"파일 로드됨: {os.path.basename(file_path)}")
-                self._update_button_states()
-
-            except Exception as e:
-                if hasattr(self, 'file_label'):
-                     self.file_label.config(text=f"파일 로드 오류")
-                self.mid = None
-                self.midi_file_path = None
-                self.cumulative_times = []
-                self.total_midi_time = 0.0
-                if hasattr(self, 'time_label'):
-                     self.update_time_label(0, 0)
-                if hasattr(self, 'seek_scale'):
-                     self.seek_scale.set(0)
-                if hasattr(self, 'status_bar'):
-                     self.status_bar.config(text=f"파일 로드 오류: {e}")
-                print(f"[ERR]: MIDI 파일 로드 오류: {e}")
-                messagebox.showerror("파일 오류", f"MIDI 파일을 로드할 수 없습니다:\n{e}\n\n파일 형식이 올바른지 확인하세요.")
-                self._update_button_states()
+            self.load_file(file_path)
 
     def play_midi(self):
-        if self.mid is not None and rtmidi_available and self.outport is not None and not self.outport.closed and not self.is_playing:
-            self.is_playing = True
-            self.is_paused = False
-            self.stop_event.clear()
-            self.pause_event.clear()
-
-            self._update_button_states()
-
-            if hasattr(self, 'status_bar'):
-                 self.status_bar.config(text="재생 중...")
-            self.active_notes = {}
-
-            self.playback_thread = threading.Thread(target=self._playback_loop)
-            self.playback_thread.start()
+        if self.engine.timeline is not None and rtmidi_available and self.engine.has_output() and not self.engine.is_playing:
+            try:
+                self.engine.play()
+            except Exception as e:
+                print(f"[ERR]: 재생 시작 오류: {e}")
+                messagebox.showerror("재생 오류", f"재생을 시작할 수 없습니다:\n{e}")
+            self._reset_gui_state()
 
-        elif self.mid is None:
+        elif self.engine.timeline is None:
              if hasattr(self, 'status_bar'):
                   self.status_bar.config(text="경고: MIDI 파일이 로드되지 않았습니다.")
              messagebox.showwarning("재생 경고", "재생 전에 MIDI 파일을 로드하세요.")
@@ -439,409 +607,335 @@ class MidiPlayerApp:
              if hasattr(self, 'status_bar'):
                   self.status_bar.config(text="경고: python-rtmidi가 설치되지 않아 MIDI 출력이 불가합니다.")
              messagebox.showwarning("재생 경고", "python-rtmidi 라이브러리를 설치해야 MIDI 출력이 가능합니다.")
-        elif self.outport is None or self.outport.closed:
+        elif not self.engine.has_output():
             if hasattr(self, 'status_bar'):
                  self.status_bar.config(text="경고: MIDI 출력 포트가 선택되지 않았거나 열리지 않았습니다.")
             messagebox.showwarning("재생 경고", "재생 전에 MIDI 출력 포트를 선택하고 여세요.")
-        elif self.is_playing:
+        elif self.engine.is_playing:
              if hasattr(self, 'status_bar'):
                   self.status_bar.config(text="정보: 이미 재생 중입니다.")
 
     def refresh_saved_midi_list(self):
-        save_dir = "./midi"
-        try:
-            files = [f for f in os.listdir(save_dir) if f.endswith(".mid")]
-            self.saved_midi_combo["values"] = files
+        self._fill_saved_midi_combo()
+        if not self.library.scan(
+                on_progress=lambda done, total: self.root.after(0, lambda: self._on_library_progress(done, total)),
+                on_done=lambda changed: self.root.after(0, lambda: self._on_library_scanned(changed))):
+            self._library_rescan = True  # 스캔 중이면 끝난 뒤 한 번 더
+
+    def _fill_saved_midi_combo(self):
+        files = self.library.names()
+        self.saved_midi_combo["values"] = files
+        if self.saved_midi_combo.get() not in files:
             self.saved_midi_combo.set("저장된 파일 선택" if files else "MIDI 없음")
-        except Exception as e:
-            self.saved_midi_combo["values"] = []
-            self.saved_midi_combo.set("목록 오류")
+
+    def _on_library_progress(self, done, total):
+        if done == total or done % 50 == 0:
+            self.status_bar.config(text=f"라이브러리 스캔 중... ({done}/{total})")
+
+    def _on_library_scanned(self, changed):
+        if changed:
+            self._fill_saved_midi_combo()
+            self._refresh_library_view()
+            self.status_bar.config(text=f"라이브러리 갱신됨: 파일 {len(self.library.entries)}개")
+        if self._library_rescan:
+            self._library_rescan = False
+            self.refresh_saved_midi_list()
+
+    def open_library_window(self):
+        if self.library_window is not None and self.library_window.winfo_exists():
+            self.library_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("MIDI 라이브러리")
+        window.geometry("760x440")
+        self.library_window = window
+
+        top = ttk.Frame(window)
+        top.pack(fill=tk.X, padx=10, pady=(10, 5))
+        ttk.Label(top, text="검색:", font=self.app_font if self.app_font else None).pack(side=tk.LEFT)
+        self.library_filter = tk.StringVar()
+        self.library_filter.trace_add("write", self._on_library_filter_changed)
+        search_entry = ttk.Entry(top, textvariable=self.library_filter)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(top, text="다시 스캔", command=self.refresh_saved_midi_list).pack(side=tk.RIGHT)
+
+        columns = (("name", "이름", 260), ("duration", "길이", 70), ("tracks", "트랙", 50), ("channels", "채널", 50),
+                   ("notes", "노트", 70), ("tempo_max", "템포 (BPM)", 100), ("size", "크기", 80))
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        tree = ttk.Treeview(frame, columns=[column for column, _, _ in columns], show="headings", selectmode="browse")
+        for column, label, width in columns:
+            tree.heading(column, text=label, command=lambda column=column: self._sort_library_view(column))
+            tree.column(column, width=width, anchor=tk.W if column == "name" else tk.E, stretch=column == "name")
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.bind("<Double-1>", self._on_library_activate)
+        tree.bind("<Return>", self._on_library_activate)
+        self.library_tree = tree
+
+        self.library_count_label = ttk.Label(window, text="", font=self.app_font if self.app_font else None)
+        self.library_count_label.pack(fill=tk.X, padx=10, pady=5)
+
+        self._library_sort = ("name", False)
+        search_entry.focus_set()
+        self._refresh_library_view()
+
+    def _on_library_filter_changed(self, *args):
+        # 입력할 때마다 다시 그리지 않고 잠깐 멈췄을 때 한 번만 필터링
+        if self._library_filter_job is not None:
+            self.root.after_cancel(self._library_filter_job)
+        self._library_filter_job = self.root.after(200, self._refresh_library_view)
+
+    def _sort_library_view(self, column):
+        current, reverse = self._library_sort
+        self._library_sort = (column, not reverse if column == current else False)
+        self._refresh_library_view()
+
+    def _refresh_library_view(self):
+        self._library_filter_job = None
+        if self.library_window is None or not self.library_window.winfo_exists():
+            return
+        sort_key, reverse = self._library_sort
+        entries = self.library.query(self.library_filter.get(), sort_key, reverse)
+        self._library_view_generation += 1
+        self.library_tree.delete(*self.library_tree.get_children())
+        self.library_count_label.config(text=f"파일 {len(entries)}개" + (" (스캔 중...)" if self.library.scanning else ""))
+        self._fill_library_rows(entries, 0, self._library_view_generation)
+
+    def _fill_library_rows(self, entries, start, generation):
+        # 큰 라이브러리도 창이 멈추지 않도록 행을 나눠서 추가
+        if generation != self._library_view_generation or not self.library_window.winfo_exists():
+            return
+        end = min(start + LIBRARY_ROWS_PER_TICK, len(entries))
+        for entry in entries[start:end]:
+            if "error" in entry:
+                values = (entry["name"], "오류", "", "", "", "", f"{entry['size'] / 1024:.0f} KB")
+            else:
+                tempo = f"{entry['tempo_min']:.0f}" if entry["tempo_min"] == entry["tempo_max"] else f"{entry['tempo_min']:.0f}~{entry['tempo_max']:.0f}"
+                values = (entry["name"], self.format_time(entry["duration"]), entry["tracks"], entry["channels"],
+                          entry["notes"], tempo, f"{entry['size'] / 1024:.0f} KB")
+            self.library_tree.insert("", tk.END, iid=entry["name"], values=values)
+        if end < len(entries):
+            self.root.after(1, self._fill_library_rows, entries, end, generation)
+
+    def _on_library_activate(self, event=None):
+        selection = self.library_tree.selection()
+        if selection:
+            self.open_midi_file_from_path(self.library.path_for(selection[0]))
+
+    def clear_timeline_cache(self):
+        self.engine.cache.clear()
+        self.status_bar.config(text="타임라인 캐시를 비웠습니다.")
+
+    def _streaming_option(self):
+        # 체크하면 항상 스트리밍, 아니면 파일 크기로 자동 선택
+        return True if self.streaming_mode.get() else None
 
     def load_saved_midi_file(self, event=None):
         filename = self.saved_midi_combo.get()
-        full_path = os.path.join("./midi", filename)
+        full_path = self.library.path_for(filename)
         if os.path.exists(full_path):
             self.open_midi_file_from_path(full_path)
 
     def open_midi_file_from_path(self, file_path):
-        try:
-            self.stop_midi()
-            self.mid = mido.MidiFile(file_path)
-            self.midi_file_path = file_path
-            self.file_label.config(text=f"로드됨: {os.path.basename(file_path)}")
-            self.total_midi_time = self.mid.length
-            self.current_playback_time = 0.0
-            self.cumulative_times = []
-            current_time = 0.0
-            for msg in self.mid:
-                current_time += msg.time
-                self.cumulative_times.append(current_time)
-            self.update_time_label(0, self.total_midi_time)
-            self.seek_scale.set(0)
-            self.status_bar.config(text=f"파일 로드됨: {os.path.basename(file_path)}")
-            self._update_button_states()
-        except Exception as e:
-            messagebox.showerror("파일 오류", f"MIDI 파일 로드 실패:\n{e}")
+        self.load_file(file_path)
+
+    def load_file(self, file_path):
+        # 워커에서 로드하고 끝나면 교체 (그동안 이전 파일 재생은 계속됨)
+        # 파일을 직접 열면 재생목록 재생은 그만둠
+        self.playlist.deactivate()
+        display_name = os.path.basename(file_path)
+        self.status_bar.config(text=f"로드 중: {display_name}")
+        self.engine.load_async(
+            file_path, streaming=self._streaming_option(),
+            on_progress=lambda fraction: self.root.after(0, lambda: self._show_load_progress(fraction)),
+            on_loaded=lambda timeline: self.root.after(0, lambda: self._on_file_loaded(file_path)),
+            on_error=lambda e: self.root.after(0, lambda: self._on_file_load_error(file_path, e)),
+        )
+        self._show_load_progress(0.0)
 
+    def open_playlist_files(self):
+        file_paths = filedialog.askopenfilenames(
+            initialdir=".",
+            title="재생목록에 넣을 MIDI 파일 선택",
+            filetypes=(("MIDI 파일", "*.mid *.midi"), ("모든 파일", "*.*"))
+        )
+        if file_paths:
+            self._start_playlist(list(file_paths))
 
-    def _playback_loop(self):
-        print("재생 루프 스레드 시작.")
-        if self.mid is None or not rtmidi_available or self.outport is None or self.outport.closed:
-            print("재생 루프 시작 조건 미달.")
-            self.root.after(0, self._reset_gui_state)
+    def play_library_playlist(self):
+        names = self.library.names()
+        if not names:
+            messagebox.showwarning("재생목록", "라이브러리에 MIDI 파일이 없습니다.")
             return
+        self._start_playlist([self.library.path_for(name) for name in names])
 
-        try:
-            start_message_index = 0
-            real_start_time = time.time()  # 진짜시작타임 변수 쪽에서 시간 재설정
-
-            if self.current_playback_time > 0 and self.cumulative_times:
-                try:
-                    temp_mid = mido.MidiFile(self.midi_file_path)
-                    messages = temp_mid.play()
-                    import bisect
-                    start_message_index = bisect.bisect_left(self.cumulative_times, self.current_playback_time - 0.01)
-
-                    self.current_playback_time = self.cumulative_times[start_message_index-1] if start_message_index > 0 and start_message_index <= len(self.cumulative_times) else 0.0
-
-                    if start_message_index >= len(self.cumulative_times) and self.total_midi_time > 0:
-                        self.current_playback_time = self.total_midi_time - 0.001
-                        start_message_index = len(self.cumulative_times) -1
-                        if start_message_index < 0: start_message_index = 0
-
-                    real_start_time = time.time() - self.current_playback_time / self.speed_scale.get()
-
-                except Exception as e:
-                    print(f"[ERR]: Bisect 탐색 중 오류 발생 ({e}). 선형 탐색 fallback.")
-                    start_message_index = 0
-                    for i, cum_time in enumerate(self.cumulative_times):
-                        if cum_time >= self.current_playback_time - 0.01:
-                            start_message_index = i
-                            self.current_playback_time = self.cumulative_times[i-1] if i > 0 else 0.0
-                            real_start_time = time.time() - self.current_playback_time / self.speed_scale.get()
-                            break
-                    if start_message_index >= len(self.cumulative_times) and self.total_midi_time > 0:
-                        self.current_playback_time = self.total_midi_time - 0.001
-                        start_message_index = len(self.cumulative_times) -1
-                        if start_message_index < 0: start_message_index = 0
-
-            try:
-                temp_mid = mido.MidiFile(self.midi_file_path)
-                msg_iter = iter(temp_mid)
-                for _ in range(start_message_index):
-                    try:
-                        next(msg_iter)
-                    except StopIteration:
-                        print(f"경고: 시작 인덱스 {start_message_index}까지 메시지를 건너뛰는 중 파일 끝 도달.")
-                        break
-            except Exception as e:
-                print(f"[ERR]: MIDI 파일 다시 열기 오류: {e}")
-                self.root.after(0, lambda: messagebox.showerror("재생 오류", f"MIDI 파일을 다시 열 수 없습니다:\n{e}"))
-                self.root.after(0, self.stop_midi)
-                return
-
-            if self.pedal_mode_enabled.get() is False:
-                print("페달 모드 OFF 상태 - 모든 채널에 대해 sustain 해제 메시지 전송")
-                for ch in range(16):
-                    try:
-                        self.outport.send(mido.Message('control_change', channel=ch, control=64, value=0))
-                    except Exception as e:
-                        print(f"초기 페달 해제 실패 (채널 {ch}): {e}")
-
-            for i, msg in enumerate(msg_iter):
-                if self.stop_event.is_set():
-                    print("중지 이벤트 수신. 재생 루프 종료.")
-                    break
-
-                if self.pause_event.is_set():
-                    if rtmidi_available and self.outport is not None and not self.outport.closed:
-                        self.notes_paused = list(self.active_notes.items())
-                        self.pedal_paused = []
-
-                        for ch in range(16):
-                            try:
-                                self.outport.send(mido.Message('control_change', channel=ch, control=64, value=0))
-                                self.pedal_paused.append(ch)
-                            except Exception as e:
-                                print(f"일시정지 중 페달 해제 실패 (채널 {ch}): {e}")
-
-                        for (ch, note), real_note in self.notes_paused:
-                            try:
-                                self.outport.send(mido.Message('note_off', channel=ch, note=real_note, velocity=0))
-                            except Exception as e:
-                                print(f"일시정지 중 note_off 실패: {e}")
-                        self.active_notes.clear()
-                    print(f"일시정지됨. 현재 시간: {self.current_playback_time:.2f}s")
-                    pause_start_time = time.time()
-                    while self.pause_event.is_set() and not self.stop_event.is_set():
-                        time.sleep(0.05)
-
-                    if self.stop_event.is_set():
-                        print("일시정지 중 중지 이벤트 수신. 재생 루프 종료.")
-                        break
-
-                    print("재생 재개.")
-                    for ch in self.pedal_paused:
-                        try:
-                            self.outport.send(mido.Message('control_change', channel=ch, control=64, value=127))
-                        except Exception as e:
-                            print(f"페달 재설정 실패 (채널 {ch}): {e}")
-
-                    for (ch, original_note), real_note in self.notes_paused:
-                        try:
-                            self.outport.send(mido.Message('note_on', channel=ch, note=real_note, velocity=int(self.velocity_scale.get())))
-                            self.active_notes[(ch, original_note)] = real_note
-                        except Exception as e:
-                            print(f"note_on 재설정 실패: {e}")
-                    pause_duration = time.time() - pause_start_time
-                    real_start_time += pause_duration
-
-                target_midi_time_after_msg = self.current_playback_time + msg.time
-                target_real_time = real_start_time + target_midi_time_after_msg / self.speed_scale.get()
-
-                timing_variance_ratio = self.timing_variance.get() / 100.0
-                jitter = random.uniform(-timing_variance_ratio, timing_variance_ratio)
-                adjusted_time = msg.time * (1.0 + jitter) if self.error_mode_enabled.get() else msg.time
-                target_midi_time_after_msg = self.current_playback_time + adjusted_time
-                target_real_time = real_start_time + target_midi_time_after_msg / self.speed_scale.get()
-                sleep_duration = target_real_time - time.time()
-                if sleep_duration > 0:
-                    time.sleep(sleep_duration)
-
-                if self.pause_event.is_set() or self.stop_event.is_set():
-                    print("슬립 후 이벤트 확인 → 일시정지 or 중지 상태. 현재 시간:", self.current_playback_time)
-                    if self.pause_event.is_set():
-                        self.notes_paused = list(self.active_notes.items())
-                        self.pedal_paused = []
-
-                        for ch in range(16):
-                            try:
-                                self.outport.send(mido.Message('control_change', channel=ch, control=64, value=0))
-                                self.pedal_paused.append(ch)
-                            except Exception as e:
-                                print(f"페달 해제 실패 (채널 {ch}): {e}")
-
-                        for (ch, note), real_note in self.notes_paused:
-                            try:
-                                self.outport.send(mido.Message('note_off', channel=ch, note=real_note, velocity=0))
-                            except Exception as e:
-                                print(f"note_off 실패 (ch {ch}, note {note}): {e}")
-
-                        self.active_notes.clear()
-
-                        pause_start_time = time.time()
-                        while self.pause_event.is_set() and not self.stop_event.is_set():
-                            time.sleep(0.05)
-
-                        if self.stop_event.is_set():
-                            print("일시정지 중 중지 수신 → 루프 종료")
-                            break
-
-                        print("재생 재개됨")
-
-                        # 다시 재생시 페달 복원
-                        for ch in self.pedal_paused:
-                            try:
-                                self.outport.send(mido.Message('control_change', channel=ch, control=64, value=127))
-                            except Exception as e:
-                                print(f"[ERR]: 페달 복원 실패 (채널 {ch}): {e}")
-
-                        for (ch, original_note), real_note in self.notes_paused:
-                            try:
-                                self.outport.send(mido.Message('note_on', channel=ch, note=real_note, velocity=int(self.velocity_scale.get())))
-                                self.active_notes[(ch, original_note)] = real_note
-                            except Exception as e:
-                                print(f"[ERR]: note_on 복원 실패 (채널 {ch}, note {real_note}): {e}")
-
-                        pause_duration = time.time() - pause_start_time
-                        real_start_time += pause_duration
-                        continue  # 현재 msg 쪽 그냥 넘기고 다음거
-                    else:
-                        print("중지 상태 도달 → 루프 종료")
-                        break
-
-                processed_msg = msg
-
-                if self.error_mode_enabled.get() and (msg.type == 'note_on' or msg.type == 'note_off'):
-                    error_chance = self.error_percentage.get()
-                    pitch_range = self.error_pitch_range.get()
-
-                    if msg.type == 'note_on' and msg.velocity > 0:
-                        if random.random() * 100 < error_chance:
-                            deviation = random.randint(-pitch_range, pitch_range)
-                            while deviation == 0 and pitch_range > 0:
-                                deviation = random.randint(-pitch_range, pitch_range)
-
-                            new_note = msg.note + deviation
-                            new_note = max(0, min(127, new_note))
-
-                            if new_note != msg.note:
-                                processed_msg = msg.copy(note=new_note)
-                                print(f"오타 발생: 원래 음정 {msg.note} (Ch {msg.channel}), 변경된 음정 {new_note} (오차 {deviation}) / 시간: {self.current_playback_time + msg.time:.2f}s")
-                                self.active_notes[(msg.channel, msg.note)] = new_note
-                            else:
-                                self.active_notes[(msg.channel, msg.note)] = msg.note
-
-                    elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                        original_note_on_key = (msg.channel, msg.note)
-                        if original_note_on_key in self.active_notes:
-                            errored_note = self.active_notes.pop(original_note_on_key)
-                            if errored_note != msg.note:
-                                processed_msg = msg.copy(note=errored_note)
-
-                if (processed_msg.type == 'note_on' and processed_msg.velocity > 0):
-                    scaled_velocity = int(self.velocity_scale.get())
-                    processed_msg = processed_msg.copy(velocity=scaled_velocity)
-
-                if rtmidi_available and self.outport is not None and not self.outport.closed:
-                    try:
-                        # 페달 비활성화 모드일 경우 무시.
-                        if self.pedal_mode_enabled.get() is False and processed_msg.type == 'control_change' and processed_msg.control == 64:
-                            continue  # sustain pedal
-
-                        if not processed_msg.is_meta and processed_msg.type not in ('sysex', 'unknown_sysex'):
-                            self.outport.send(processed_msg)
-                    except Exception as e:
-                        print(f"[ERR]: MIDI 메시지 전송 오류: {e}")
-                        self.root.after(0, self.stop_midi)
-
-
-                self.current_playback_time += msg.time
-
-                if self.stop_event.is_set() or self.pause_event.is_set():
-                    if self.pause_event.is_set():
-                        print(f"루프 종료: 일시정지 상태. 현재 시간: {self.current_playback_time:.2f}s")
-                    if self.stop_event.is_set():
-                        print("루프 종료: 중지 상태.")
-                        self.current_playback_time = 0.0
-                    break
-
-            if not self.stop_event.is_set() and not self.pause_event.is_set():
-                self.current_playback_time = self.total_midi_time
-                self.root.after(0, self.stop_midi)
-
-        except Exception as e:
-            print(f"[ERR]: 재생 중 예상치 못한 오류 발생: {e}")
-            traceback.print_exc()
-            self.root.after(0, lambda: messagebox.showerror("재생 오류", f"재생 중 오류가 발생했습니다:\n{e}"))
-            self.root.after(0, self.stop_midi)
+    def _start_playlist(self, file_paths):
+        if not self.engine.has_output():
+            messagebox.showwarning("재생 경고", "재생 전에 MIDI 출력 포트를 선택하고 여세요.")
+            return
+        self.playlist.streaming = self._streaming_option()
+        self.playlist.set_entries(file_paths)
+        self.playlist.play()
+        self.status_bar.config(text=f"재생목록: {len(file_paths)}곡")
+
+    def next_in_playlist(self):
+        if not self.playlist.active:
+            self.status_bar.config(text="재생목록을 재생하고 있지 않습니다.")
+        elif not self.playlist.next():
+            self.status_bar.config(text="재생목록의 마지막 곡입니다.")
+
+    def previous_in_playlist(self):
+        if not self.playlist.previous():
+            self.status_bar.config(text="재생목록을 재생하고 있지 않습니다.")
+
+    def _on_playlist_repeat_changed(self):
+        self.playlist.set_repeat(self.playlist_repeat.get())
+
+    def _on_playlist_shuffle_changed(self):
+        self.playlist.set_shuffle(self.playlist_shuffle.get())
+
+    def _on_playlist_gap_changed(self):
+        self.playlist.set_gap(self.playlist_gap.get())
+
+    def _on_playlist_changed(self, file_path):
+        # 곡이 바뀜 (이미 로드 / 컴파일된 상태라 표시만 갱신)
+        self._on_file_loaded(file_path)
+        self._reset_gui_state(f"재생목록: {os.path.basename(file_path)} ({self.playlist.current + 1}/{len(self.playlist)})")
+
+    def _on_playlist_error(self, file_path, error):
+        self.status_bar.config(text=f"재생목록: 건너뜀 ({os.path.basename(file_path)}): {error}")
+
+    def cancel_file_load(self):
+        if self.engine.cancel_load():
+            self._hide_load_progress()
+            self._reset_gui_state("파일 로드 취소됨.")
+
+    def _show_load_progress(self, fraction):
+        if fraction >= 1.0:
+            self._hide_load_progress()
+            return
+        self.load_progress["value"] = fraction * 100
+        if not self.load_progress.winfo_ismapped():
+            self.load_progress.pack(side=tk.RIGHT, padx=5)
+        # 취소는 교체 전까지만. 교체된 뒤에는 백그라운드 디코딩 진행률만 표시
+        if self.engine.is_loading:
+            if not self.load_cancel_button.winfo_ismapped():
+                self.load_cancel_button.pack(side=tk.RIGHT, padx=5, before=self.load_progress)
+        else:
+            self.load_cancel_button.pack_forget()
+
+    def _hide_load_progress(self):
+        self.load_progress.pack_forget()
+        self.load_cancel_button.pack_forget()
+
+    def _on_file_loaded(self, file_path):
+        self.midi_file_path = file_path
+        display_name = os.path.basename(file_path)
+        if len(display_name) > 40:
+             display_name = display_name[:37] + "..."
+        self.file_label.config(text=f"로드됨: {display_name}")
+        self._show_position(0.0, force=True)
+        self.load_cancel_button.pack_forget()
+        timeline = self.engine.timeline
+        if not timeline.complete:
+            # 백그라운드 디코딩이 끝나면 추정 길이를 실제 길이로 한 번만 갱신
+            def wait_decoded():
+                timeline.wait_decoded()
+                self.root.after(0, self._on_timeline_decoded, timeline)
+            threading.Thread(target=wait_decoded, daemon=True).start()
+        self.status_bar.config(text=f"파일 로드됨: {os.path.basename(file_path)}")
+        self._update_button_states()
 
-        finally:
-            self.is_playing = False
-            self.is_paused = False
-            self.active_notes = {}
-            self.root.after(0, self._reset_gui_state)
+    def _on_file_load_error(self, file_path, error):
+        self._hide_load_progress()
+        self.file_label.config(text=f"파일 로드 오류")
+        self.status_bar.config(text=f"파일 로드 오류: {error}")
+        messagebox.showerror("파일 오류", f"MIDI 파일을 로드할 수 없습니다:\n{error}\n\n파일 형식이 올바른지 확인하세요.")
+        self._update_button_states()
 
     def _update_button_states(self):
         valid_port_selected = (
-            self.selected_port_name.get() in self.output_ports and
-            self.outport is not None and
-            not self.outport.closed
+            (self.selected_port_name.get() in self.output_ports or isinstance(self.engine.outport, MidiRouter)) and
+            self.engine.has_output()
         )
         can_play = (
-            self.mid is not None and
+            self.engine.timeline is not None and
             rtmidi_available and
             valid_port_selected and
-            not self.is_playing and
-            not self.is_paused
+            not self.engine.is_playing
         )
 
         self.play_button['state'] = tk.NORMAL if can_play else tk.DISABLED
-        self.pause_button['state'] = tk.NORMAL if self.is_playing and not self.is_paused else tk.DISABLED
-        self.stop_button['state'] = tk.NORMAL if self.is_playing or self.is_paused else tk.DISABLED
+        self.pause_button['state'] = tk.NORMAL if self.engine.is_playing else tk.DISABLED
+        self.stop_button['state'] = tk.NORMAL if self.engine.is_playing or self.engine.is_paused else tk.DISABLED
 
-    def _reset_gui_state(self):
+    def _reset_gui_state(self, status_text=None):
         print("[UI]: UI 상태가 초기화 되고 있습니다...")
         self._update_button_states()
 
-        seek_value = (self.current_playback_time / self.total_midi_time * 100) if self.total_midi_time > 0 else 0
-        if hasattr(self, 'seek_scale'):
-             self.seek_scale.set(seek_value)
-        if hasattr(self, 'time_label'):
-             self.update_time_label(self.current_playback_time, self.total_midi_time)
+        self._show_position(self.engine.position, force=True)
 
         if hasattr(self, 'status_bar'):
-             if self.stop_event.is_set() or (self.mid is not None and self.total_midi_time > 0 and abs(self.current_playback_time - self.total_midi_time) < 0.1):
-                  if self.stop_event.is_set():
-                       status_text = "중지됨."
-                  else:
-                       status_text = "재생 완료."
-
+             if status_text is not None:
+                  # 중지 / 재생 완료 / 오류
+                  if self.engine.latency.count:
+                       status_text += f" | {self.engine.latency.summary_text()}"
                   self.status_bar.config(text=status_text)
-
-                  self.current_playback_time = 0.0
-                  if hasattr(self, 'time_label'):
-                       self.update_time_label(0, self.total_midi_time)
-                  if hasattr(self, 'seek_scale'):
-                       self.seek_scale.set(0)
-
-             elif self.is_paused:
-                 self.status_bar.config(text="일시정지됨.")
+             elif self.engine.is_playing:
+                  self.status_bar.config(text="재생 중...")
+             elif self.engine.is_paused:
+                  self.status_bar.config(text="일시정지됨.")
              else:
                   status_text = "준비됨."
-                  if self.mid is not None and hasattr(self, 'midi_file_path'):
+                  if self.engine.timeline is not None and self.midi_file_path:
                        display_name = os.path.basename(self.midi_file_path)
                        if len(display_name) > 40: display_name = display_name[:37] + "..."
                        status_text = f"파일 로드됨: {display_name}"
-                  if rtmidi_available and self.outport is not None and not self.outport.closed:
-                       status_text += f" | 포트: {self.outport.name}"
+                  if rtmidi_available and self.engine.has_output():
+                       status_text += f" | 포트: {self.engine.outport.name}"
                   self.status_bar.config(text=status_text)
-
-        if self.stop_event.is_set():
-             self.stop_event.clear()
-        if self.pause_event.is_set() and not self.is_playing:
-             self.pause_event.clear()
         print("[UI]: UI 가 초기화 되었습니다.")
 
+    def _on_playback_finished(self):
+        self._reset_gui_state("재생 완료.")
+
+    def _on_playback_error(self, error):
+        self._reset_gui_state(f"재생 오류: {error}")
+        messagebox.showerror("재생 오류", f"재생 중 오류가 발생했습니다:\n{error}")
+
     def pause_midi(self):
-        if self.is_playing and not self.is_paused:
-            self.is_paused = True
-            self.is_playing = False
-            self.stop_event.set()
-            self.pause_event.set()
-            self._update_button_states()
-            if hasattr(self, 'status_bar'):
-                 self.status_bar.config(text="일시정지됨.")
+        if self.engine.pause():
+            self._reset_gui_state()
 
     def stop_midi(self):
-        if self.is_playing or self.is_paused:
-            print("재생 중지 신호 발생...")
-            self.stop_event.set()
-            self.pause_event.set()
-            self._update_button_states()
+        if self.engine.stop():
+            self._reset_gui_state("중지됨.")
 
-            if rtmidi_available and self.outport is not None and not self.outport.closed:
-                try:
-                    print("중지 시 All Notes Off 및 note_off 메시지 전송 중...")
-                    for channel in range(16):
-                        # All Notes Off
-                        try:
-                            self.outport.send(mido.Message('control_change', channel=channel, control=64, value=0))
-                        except Exception as e:
-                            print(f"Sustain pedal 해제 실패 (채널 {channel}): {e}")
-                    # 남아있는 note_off 강제 전송쪽
-                    for (channel, note), _ in self.active_notes.items():
-                        try:
-                            self.outport.send(mido.Message('note_off', channel=channel, note=note, velocity=0))
-                        except Exception as e:
-                            print(f"[ERR]: note_off 오류: ch={channel}, note={note}, err={e}")
-                    print("All Notes Off 완료.")
-                except Exception as e:
-                    print(f"[ERR]: 오류: All Notes Off 전송 실패: {e}")
-            else:
-                print("MIDI 포트가 닫혀 있거나 사용 불가.")
-
-            if self.playback_thread is not None and self.playback_thread.is_alive():
-                print("재생 스레드 종료 대기 (join)...")
-                self.playback_thread.join(timeout=3.0)
-                if self.playback_thread.is_alive():
-                    print("경고: 재생 스레드가 종료되지 않았습니다.")
+    def panic_midi(self):
+        if self.engine.panic():
+            self._reset_gui_state("모든 소리 끔.")
+        else:
+            messagebox.showwarning("경고", "MIDI 출력 포트가 열려있지 않습니다.")
 
-            self.playback_thread = None
-            self.current_playback_time = 0.0
-            self.active_notes.clear()
-            self.root.after(0, self._reset_gui_state)
 
+    def export_latency_log(self):
+        if self.engine.latency.count == 0:
+            messagebox.showwarning("경고", "내보낼 타이밍 기록이 없습니다. 먼저 재생하세요.")
+            return
+        file_path = filedialog.asksaveasfilename(
+            title="타이밍 기록 저장",
+            defaultextension=".csv",
+            filetypes=(("CSV 파일", "*.csv"), ("JSON 파일", "*.json"))
+        )
+        if file_path:
+            try:
+                self.engine.latency.export(file_path)
+                self.status_bar.config(text=f"타이밍 기록 저장됨: {os.path.basename(file_path)}")
+            except Exception as e:
+                messagebox.showerror("저장 실패", str(e))
 
     def save_current_midi(self):
         if self.midi_file_path and os.path.exists(self.midi_file_path):
@@ -852,8 +946,7 @@ class MidiPlayerApp:
                 os.makedirs(save_dir, exist_ok=True)
                 save_path = os.path.join(save_dir, filename)
                 try:
-                    with open(self.midi_file_path, "rb") as src, open(save_path, "wb") as dst:
-                        dst.write(src.read())
+                    shutil.copyfile(self.midi_file_path, save_path)
                     messagebox.showinfo("저장 완료", f"{filename} 저장 성공!")
                     self.refresh_saved_midi_list()
                 except Exception as e:
@@ -871,6 +964,7 @@ class MidiPlayerApp:
          if hasattr(self, 'speed_scale') and hasattr(self, 'speed_value_label'):
               speed = self.speed_scale.get()
               self.speed_value_label.config(text=f"{speed:.1f}x")
+              self.engine.configure(speed=speed)
 
     def _update_velocity_display_cmd(self, value):
         self._update_velocity_display()
@@ -880,6 +974,7 @@ class MidiPlayerApp:
          if hasattr(self, 'velocity_scale') and hasattr(self, 'velocity_value_label'):
               velocity = int(self.velocity_scale.get())
               self.velocity_value_label.config(text=str(velocity))
+              self.params.publish(velocity=velocity)
 
     def _update_error_percent_display_cmd(self, value):
         self._update_error_percent_display()
@@ -899,24 +994,61 @@ class MidiPlayerApp:
               pitch = int(self.error_pitch_scale.get())
               self.error_pitch_value_label.config(text=str(pitch))
 
-    def update_seek_bar(self):
-        if self.mid is not None and self.total_midi_time > 0:
-            display_time = min(self.current_playback_time, self.total_midi_time)
-            progress = (display_time / self.total_midi_time) * 100.0
+    def _publish_params(self, *args):
+        # GUI 스레드에서만 호출됨. 재생 스레드는 self.params.current 를 읽음 (속도가 바뀌면 재생 스레드를 깨움)
+        try:
+            self.engine.configure(
+                speed=self.speed_scale.get(),
+                speed_ramp=SPEED_SLIDER_RAMP,
+                velocity=int(self.velocity_scale.get()),
+                error_enabled=self.error_mode_enabled.get(),
+                error_percentage=self.error_percentage.get(),
+                error_pitch_range=self.error_pitch_range.get(),
+                error_seed=self._error_seed_value(),
+                timing_variance=self.timing_variance.get(),
+                pedal_enabled=self.pedal_mode_enabled.get(),
+                scheduler_mode=self.scheduler_mode.get(),
+            )
+        except (tk.TclError, ValueError) as e:
+            print(f"[ERR]: 재생 파라미터 갱신 실패: {e}")
+
+    def _error_seed_value(self):
+        # 입력 중인 시드가 숫자가 아니면 마지막으로 게시한 시드 유지
+        try:
+            return int(self.error_seed.get())
+        except (tk.TclError, ValueError):
+            return self.params.current.error_seed
+
+    def _on_position_published(self):
+        # 재생 스레드가 위치를 게시했을 때만 호출됨 (재생 중이 아니면 주기적인 갱신 없음)
+        self._show_position(self.engine.take_position())
+
+        # 재생 중에는 1초마다 지연 통계를 상태바에 표시
+        now = clock()
+        if self.engine.is_playing and self.engine.latency.count and now - self._latency_status_time >= 1.0:
+            self._latency_status_time = now
+            if hasattr(self, 'status_bar'):
+                self.status_bar.config(text=f"재생 중... | {self.engine.latency.summary_text()}")
 
-            if hasattr(self, 'seek_scale'):
-                if not self.is_playing or abs(self.seek_scale.get() - progress) > 1.5:
-                    self.seek_scale.set(progress)
+    def _on_timeline_decoded(self, timeline):
+        if timeline is self.engine.timeline and not self.engine.is_playing:
+            self._show_position(self.engine.position, force=True)
 
-            if hasattr(self, 'time_label'):
-                self.update_time_label(display_time, self.total_midi_time)
+    def _show_position(self, position, force=False):
+        duration = self.engine.duration if self.engine.timeline is not None else 0.0
+        display_time = min(position, duration) if duration > 0 else 0.0
+        progress = (display_time / duration) * 100.0 if duration > 0 else 0.0
 
-        else:
-            if hasattr(self, 'seek_scale'):
-                self.seek_scale.set(0)
-            if hasattr(self, 'time_label'):
-                self.update_time_label(0, 0)
-        self.root.after(100, self.update_seek_bar)
+        # 사용자가 탐색 바를 끄는 중이면 덮어쓰지 않음
+        if hasattr(self, 'seek_scale') and not self._seek_dragging:
+            if force or abs(progress - self._shown_progress) >= 0.1:
+                self._shown_progress = progress
+                self.seek_scale.set(progress)
+
+        shown_time = (int(display_time), int(duration))
+        if hasattr(self, 'time_label') and (force or shown_time != self._shown_time):
+            self._shown_time = shown_time
+            self.update_time_label(display_time, duration)
 
 
     def format_time(self, seconds):
@@ -931,38 +1063,48 @@ class MidiPlayerApp:
               self.time_label.config(text=f"{self.format_time(current_sec)} / {self.format_time(total_sec)}")
 
     def seek_midi_drag(self, value):
-        if self.mid is not None and self.total_midi_time > 0:
+        # 드래그 중에만 목표 시간 표시 (재생 위치 게시로 set() 될 때는 무시)
+        if self._seek_dragging and self.engine.timeline is not None and self.engine.duration > 0:
             target_progress = float(value) / 100.0
-            target_time = self.total_midi_time * target_progress
+            target_time = self.engine.duration * target_progress
             if hasattr(self, 'time_label'):
-                 self.update_time_label(target_time, self.total_midi_time)
+                 self.update_time_label(target_time, self.engine.duration)
+
+    def on_seek_press(self, event):
+        self._seek_dragging = True
 
     def on_seek_release(self, event):
-        if self.mid is not None and self.total_midi_time > 0:
+        self._seek_dragging = False
+        if self.engine.timeline is not None and self.engine.duration > 0:
             if hasattr(self, 'seek_scale'):
                  target_progress = self.seek_scale.get() / 100.0
             else:
                  return
 
-            target_time = self.total_midi_time * target_progress
+            self.engine.seek(self.engine.duration * target_progress)
+            self._show_position(self.engine.position, force=True)
 
-            was_playing = self.is_playing
-            was_paused = self.is_paused
-
-            self.stop_midi()
-
-            self.current_playback_time = target_time
-            print(f"탐색 완료. 새 시작 시간: {self.current_playback_time:.2f}s")
-
-            if hasattr(self, 'time_label'):
-                 self.update_time_label(self.current_playback_time, self.total_midi_time)
-            if hasattr(self, 'seek_scale'):
-                 self.seek_scale.set(target_progress * 100)
-
-            if was_playing or was_paused:
-                 self.play_midi()
+    def _populate_theme_menu(self):
+        # 테마 메뉴를 처음 열 때 ttkthemes 를 import 하고 목록을 채움 (시작할 때 테마 목록을 만들지 않음)
+        if self.themed_style is not None or not self.themed_style_available:
+            return
+        try:
+            from ttkthemes import ThemedStyle
+            self.themed_style = ThemedStyle(self.root)
+            print("[TEM]: ttk 테마가 적용 준비 되었습니다.")
+            for theme_name in sorted(self.themed_style.get_themes()):
+                self.thememenu.add_command(label=theme_name, command=lambda name=theme_name: self.set_theme(name),
+                                           font=self.app_font if self.app_font else None)
+        except Exception as e:
+            print(f"[ERR]: 테마 목록 로드 중 오류 발생: {e}. 테마 기능이 비활성화 됩니다.")
+            self.themed_style_available = False
+            self.themed_style = None
+            self.thememenu.delete(0, "end")
+            self.thememenu.add_command(label="(테마 목록 로드 오류)", state=tk.DISABLED,
+                                       font=self.app_font if self.app_font else None)
 
     def set_theme(self, theme_name):
+        self._populate_theme_menu()
         if self.themed_style_available and self.themed_style is not None:
             try:
                 self.themed_style.set_theme(theme_name)
@@ -978,6 +1120,7 @@ class MidiPlayerApp:
 
     def on_closing(self):
         print("애플리케이션 종료 시퀀스 시작.")
+        self.library.cancel()
         self.stop_midi()
         self.close_midi_port()
         self.root.destroy()
@@ -985,17 +1128,23 @@ class MidiPlayerApp:
 
     def run(self):
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        self.root.after(10, self.update_seek_bar)
         self.root.mainloop()
 
 if __name__ == "__main__":
-    def start_app():
-        splash.destroy()  # 스플래시 창 destory
-        root = tk.Tk()
-        app = MidiPlayerApp(root)
-        app.run()
+    from cli import build_parser, run_headless
+
+    args = build_parser().parse_args()
+    if args.headless or args.list_ports or args.render:
+        # headless / 렌더: 스플래시 / 폰트 / 테마 설정 없이 엔진만 실행
+        sys.exit(run_headless(args))
+
+    report_libraries()
 
-    splash = tk.Tk()
+    # 메인 창을 먼저 만들어 숨겨 두고 스플래시를 띄운 뒤, 앱 구성이 끝나는 즉시 스플래시를 닫고 메인 창을 보여줌
+    root = tk.Tk()
+    root.withdraw()
+
+    splash = tk.Toplevel(root)
     splash.title("Riha Studio")
     splash.geometry("300x100")
     splash.resizable(False, False)
@@ -1005,6 +1154,18 @@ if __name__ == "__main__":
     progress = ttk.Progressbar(splash, mode='indeterminate')
     progress.pack(padx=20, pady=10, fill=tk.X)
     progress.start(10)
-    # ------------ 스플래시 After ------------
-    splash.after(1000, start_app)  # 1초 후 main 앱 실행
-    splash.mainloop()
\ No newline at end of file
+    splash.update()  # 앱을 만드는 동안에도 스플래시가 그려져 있도록
+
+    def start_app():
+        app = MidiPlayerApp(root)
+        root.protocol("WM_DELETE_WINDOW", app.on_closing)
+        splash.destroy()  # 스플래시 창 destory
+        root.deiconify()
+        root.update_idletasks()
+        startup_mark("창 표시")
+        startup_report()
+        if args.file:
+            root.after(0, lambda: app.open_midi_file_from_path(args.file))
+
+    root.after_idle(start_app)
+    root.mainloop()
@@ -0,0 +1,364 @@
+import argparse
+import array
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from engine import PlaybackEngine
+from midi_stream import StreamingTimeline
+from midi_timeline import compile_midi_file, open_midi_file
+from scheduler import clock
+
+# ======================================================================================
+# MIDI PLAYER | 벤치마크
+# 합성 MIDI 파일을 만들어 로드 / 탐색 / 재생을 가짜 출력 포트로 측정하고 결과를 JSON 으로 저장합니다.
+# MIDI 장비 없이 일반 리눅스 환경에서 실행할 수 있습니다.
+#   python bench.py                          # small, medium 시나리오
+#   python bench.py --scenarios all -o bench_results.json
+#   python bench.py --startup --scenarios ""  # 시작 시간(import) 만 측정
+# ======================================================================================
+
+TICKS_PER_BEAT = 480
+
+SCENARIOS = {
+    # 이름: (노트 수, 트랙 수, 템포 변경 간격 tick (0=없음), CC 간격 tick (0=없음))
+    "notes_1k": (1000, 1, 0, 0),
+    "notes_100k": (100000, 16, 0, 0),
+    "notes_1m": (1000000, 32, 0, 0),
+    "many_tracks": (50000, 256, 0, 0),
+    "tempo_map": (20000, 4, 30, 0),
+    "cc_heavy": (20000, 16, 0, 10),
+}
+SCENARIO_GROUPS = {
+    "small": ["notes_1k", "tempo_map", "cc_heavy"],
+    "medium": ["notes_100k", "many_tracks"],
+    "large": ["notes_1m"],
+}
+DEFAULT_SCENARIOS = "small,medium"
+
+
+class FakeOutputPort:
+    # 실제 장비 대신 받은 메시지마다 시각만 기록하는 출력 포트
+    def __init__(self, name="bench"):
+        self.name = name
+        self.closed = False
+        self.timestamps = array.array('d')
+        self.count = 0
+
+    def send_event(self, status, data1=0, data2=0):
+        self.timestamps.append(clock())
+        self.count += 1
+
+    def send_bytes(self, data):
+        self.timestamps.append(clock())
+        self.count += 1
+
+    def send(self, msg):
+        self.timestamps.append(clock())
+        self.count += 1
+
+    def close(self):
+        self.closed = True
+
+
+# ------------------------------------------------------------------ 합성 SMF 생성
+
+def _vlq(value):
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(data))
+
+
+def _track_chunk(events):
+    # events: [(절대 tick, 바이트)] (tick 순 정렬)
+    body = bytearray()
+    last_tick = 0
+    for tick, data in events:
+        body += _vlq(tick - last_tick)
+        body += data
+        last_tick = tick
+    body += b"\x00\xff\x2f\x00"
+    return b"MTrk" + struct.pack(">I", len(body)) + bytes(body)
+
+
+def generate_smf(path, notes, tracks, tempo_every=0, cc_every=0, seed=1):
+    rng = random.Random(seed)
+    notes_per_track = max(notes // tracks, 1)
+    chunks = []
+    end_tick = 0
+
+    for track in range(tracks):
+        channel = track % 16
+        events = []
+        tick = 0
+        for _ in range(notes_per_track):
+            tick += rng.choice((0, 0, 15, 30, 60, 120))
+            note = rng.randint(21, 108)
+            length = rng.choice((30, 60, 120, 240))
+            events.append((tick, bytes((0x90 | channel, note, rng.randint(40, 120)))))
+            events.append((tick + length, bytes((0x80 | channel, note, 0))))
+        end_tick = max(end_tick, tick + 240)
+        if cc_every:
+            for cc_tick in range(0, tick, cc_every):
+                value = (cc_tick // cc_every) % 128
+                events.append((cc_tick, bytes((0xB0 | channel, (1, 7, 11)[cc_tick % 3], value))))
+                events.append((cc_tick, bytes((0xE0 | channel, 0, value))))
+        events.sort(key=lambda event: event[0])
+        chunks.append(events)
+
+    conductor = [(0, b"\xff\x51\x03" + (500000).to_bytes(3, "big"))]
+    if tempo_every:
+        for tempo_tick in range(tempo_every, end_tick, tempo_every):
+            tempo = 400000 + (tempo_tick // tempo_every) % 40 * 5000
+            conductor.append((tempo_tick, b"\xff\x51\x03" + tempo.to_bytes(3, "big")))
+
+    with open(path, "wb") as f:
+        f.write(b"MThd" + struct.pack(">IHHH", 6, 1, tracks + 1, TICKS_PER_BEAT))
+        f.write(_track_chunk(conductor))
+        for events in chunks:
+            f.write(_track_chunk(events))
+    return os.path.getsize(path)
+
+
+# ------------------------------------------------------------------ 측정
+
+def _percentiles(values):
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda p: values[min(int(len(values) * p / 100), len(values) - 1)]
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": values[-1],
+            "mean": sum(values) / len(values)}
+
+
+def measure_open(path):
+    # 헤더 / 길이 추정만 읽고 반환되기까지의 시간 (재생 시작 가능 시점)
+    start = time.perf_counter()
+    timeline = open_midi_file(path)
+    opened = time.perf_counter() - start
+    estimate = timeline.duration
+    timeline.wait_decoded()
+    return {"open_ms": opened * 1000, "estimate_error_s": estimate - timeline.duration}
+
+
+def measure_load(path, with_memory=True):
+    start = time.perf_counter()
+    timeline = compile_midi_file(path)
+    result = {"load_s": time.perf_counter() - start, "events": len(timeline), "duration_s": timeline.duration}
+    if with_memory:
+        del timeline
+        tracemalloc.start()
+        timeline = compile_midi_file(path)
+        result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return timeline, result
+
+
+def measure_stream_open(path, with_memory=True):
+    start = time.perf_counter()
+    timeline = StreamingTimeline.open(path, background=False)
+    result = {"stream_open_s": time.perf_counter() - start}
+    if with_memory:
+        del timeline
+        tracemalloc.start()
+        timeline = StreamingTimeline.open(path, background=False)
+        result["stream_peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return timeline, result
+
+
+def measure_seek(timeline, samples=200, seed=2, key="seek_ms"):
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(samples):
+        target = rng.uniform(0, timeline.duration)
+        start = time.perf_counter()
+        cursor = timeline.cursor(target)
+        chase_state = cursor.chase_state()
+        if chase_state is not None:
+            chase_state.chase_events()
+        cursor.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {key: _percentiles(latencies)}
+
+
+def measure_throughput(timeline, key="events_per_s"):
+    # 속도 제한 없이 (대기 없이) 전체 파이프라인을 통과하는 이벤트 수
+    engine = PlaybackEngine()
+    engine.set_timeline(timeline)
+    engine.outport = FakeOutputPort()
+    engine.configure(speed=1e9)
+    start = time.perf_counter()
+    engine.play()
+    engine.wait()
+    elapsed = time.perf_counter() - start
+    sent = engine.outport.count
+    if key != "events_per_s":
+        return {key: sent / elapsed if elapsed > 0 else 0.0}
+    return {"events_sent": sent, "unlimited_s": elapsed, "events_per_s": sent / elapsed if elapsed > 0 else 0.0}
+
+
+def measure_realtime(timeline, seconds, mode):
+    engine = PlaybackEngine()
+    engine.set_timeline(timeline)
+    engine.outport = FakeOutputPort()
+    engine.configure(speed=1.0, scheduler_mode=mode)
+    engine.play()
+    engine.wait(seconds)
+    engine.stop()
+    return {"realtime_mode": mode, "realtime_s": seconds, "lateness_ms": engine.latency.summary()}
+
+
+def _parse_importtime(stderr):
+    # python -X importtime 출력: "import time: self [us] | cumulative | 모듈" (들여쓰기 = 중첩 깊이)
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 머리글
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return modules
+
+
+def measure_startup(module="app", runs=5, top=10):
+    # 새 인터프리터에서 module 을 import 하는 시간 (GUI 를 띄우기 전까지). 가장 빠른 실행 기준
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   cwd=here, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise RuntimeError(f"{module} import 실패: {completed.stderr.strip().splitlines()[-1:]}")
+        if best is None or elapsed < best[0]:
+            best = (elapsed, _parse_importtime(completed.stderr))
+    elapsed, modules = best
+    own = [m for m in modules if m[0] == module]
+    total_us = own[-1][3] if own else sum(m[3] for m in modules if m[1] == 0)
+    # module 이 직접 import 한 모듈(깊이 1)을 누적 시간 순으로
+    direct = sorted((m for m in modules if m[1] == 1), key=lambda m: m[3], reverse=True)
+    return {
+        "startup_module": module,
+        "startup_process_ms": elapsed * 1000,
+        "startup_import_ms": total_us / 1000,
+        "startup_top_imports_ms": {name: cumulative / 1000 for name, depth, self_us, cumulative in direct[:top]},
+    }
+
+
+def run_scenario(name, corpus_dir, options):
+    notes, tracks, tempo_every, cc_every = SCENARIOS[name]
+    path = os.path.join(corpus_dir, f"{name}.mid")
+    if not os.path.exists(path):
+        print(f"[BENCH]: {name} 합성 파일 생성 중... (노트 {notes}개, 트랙 {tracks}개)")
+        generate_smf(path, notes, tracks, tempo_every, cc_every)
+
+    result = {"notes": notes, "tracks": tracks, "file_mb": os.path.getsize(path) / 1e6}
+    result.update(measure_open(path))
+    timeline, load_result = measure_load(path, with_memory=not options.no_memory)
+    result.update(load_result)
+    result.update(measure_seek(timeline))
+    result.update(measure_throughput(timeline))
+    if options.realtime_seconds > 0:
+        result.update(measure_realtime(timeline, options.realtime_seconds, options.timing_mode))
+    del timeline
+
+    if options.streaming:
+        # 스트리밍 모드: 체크포인트 인덱스만 만들고 이벤트는 재생하면서 디코딩
+        stream, stream_result = measure_stream_open(path, with_memory=not options.no_memory)
+        result.update(stream_result)
+        result.update(measure_seek(stream, samples=50, key="stream_seek_ms"))
+        result.update(measure_throughput(stream, key="stream_events_per_s"))
+    return result
+
+
+def _scenario_names(spec):
+    names = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part == "all":
+            names.extend(SCENARIOS)
+        elif part in SCENARIO_GROUPS:
+            names.extend(SCENARIO_GROUPS[part])
+        elif part in SCENARIOS:
+            names.append(part)
+        elif part:
+            raise SystemExit(f"[ERR]: 알 수 없는 시나리오: {part} (사용 가능: {', '.join(list(SCENARIO_GROUPS) + list(SCENARIOS))})")
+    return list(dict.fromkeys(names))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="미디 플레이어 벤치마크")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS,
+                        help="쉼표로 구분한 시나리오 또는 그룹 (small / medium / large / all)")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="결과 JSON 경로")
+    parser.add_argument("--corpus-dir", help="합성 파일을 보관할 디렉토리 (기본: 임시 디렉토리)")
+    parser.add_argument("--realtime-seconds", type=float, default=3.0, help="실시간 지연 측정 시간 (0 이면 생략)")
+    parser.add_argument("--timing-mode", default="balanced", help="실시간 측정 스케줄러 모드")
+    parser.add_argument("--no-memory", action="store_true", help="최대 메모리 측정 생략 (로드를 한 번만 수행)")
+    parser.add_argument("--streaming", action="store_true", help="스트리밍 타임라인 로드 / 탐색 / 처리량도 측정")
+    parser.add_argument("--startup", action="store_true", help="GUI 시작 시간(import, python -X importtime) 도 측정")
+    options = parser.parse_args(argv)
+
+    names = _scenario_names(options.scenarios)
+    temp_dir = None
+    corpus_dir = options.corpus_dir
+    if corpus_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix="midi_bench_")
+        corpus_dir = temp_dir.name
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": {},
+    }
+    try:
+        if options.startup:
+            startup = measure_startup()
+            report["startup"] = startup
+            print(f"[BENCH]: 시작: 프로세스 {startup['startup_process_ms']:.0f}ms / import {startup['startup_import_ms']:.1f}ms")
+            for module_name, cumulative_ms in startup["startup_top_imports_ms"].items():
+                print(f"[BENCH]:   {module_name}: {cumulative_ms:.1f}ms")
+        for name in names:
+            result = run_scenario(name, corpus_dir, options)
+            report["results"][name] = result
+            print(f"[BENCH]: {name}: 열기 {result['open_ms']:.1f}ms / 로드 {result['load_s']:.2f}s"
+                  + (f" / 메모리 {result['peak_memory_mb']:.1f}MB" if "peak_memory_mb" in result else "")
+                  + f" / 탐색 p99 {result['seek_ms']['p99']:.2f}ms"
+                  + f" / 처리량 {result['events_per_s']:.0f} ev/s"
+                  + (f" / 지연 p99 {result['lateness_ms']['p99_ms']:.2f}ms" if "lateness_ms" in result else ""))
+            if "stream_open_s" in result:
+                print(f"[BENCH]: {name} (스트리밍): 인덱스 {result['stream_open_s']:.2f}s"
+                      + (f" / 메모리 {result['stream_peak_memory_mb']:.1f}MB" if "stream_peak_memory_mb" in result else "")
+                      + f" / 탐색 p99 {result['stream_seek_ms']['p99']:.2f}ms"
+                      + f" / 처리량 {result['stream_events_per_s']:.0f} ev/s")
+    finally:
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    with open(options.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"[BENCH]: 결과 저장됨: {options.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import argparse
+import os
+import sys
+import time
+
+from engine import PlaybackEngine
+from error_plan import new_seed
+from playlist import REPEAT_MODES, REPEAT_OFF, Playlist
+from render import render_timeline, write_render
+from scheduler import DEFAULT_SCHEDULER_MODE, SCHEDULER_MODES
+from speed_map import SpeedCurve
+
+# ======================================================================================
+# MIDI PLAYER | 명령줄 (headless) 실행
+# python app.py --headless file.mid --port "포트 이름" --speed 1.5
+# python app.py --render out.mid file.mid --error --error-seed 7    # 재생하지 않고 처리된 연주를 파일로
+# 스플래시 / 폰트 / 테마 설정 없이 재생 엔진만 사용합니다.
+# ======================================================================================
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="app.py", description="미디 플레이어 (Made by 리하스튜디오)")
+    parser.add_argument("file", nargs="?", help="재생할 MIDI 파일 (디렉토리면 안의 MIDI 파일을 재생목록으로)")
+    parser.add_argument("--headless", action="store_true", help="GUI 없이 명령줄에서 재생")
+    parser.add_argument("--port", help="MIDI 출력 포트 이름")
+    parser.add_argument("--list-ports", action="store_true", help="사용 가능한 MIDI 출력 포트 목록 출력")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 속도 배율 (기본 1.0)")
+    parser.add_argument("--speed-curve", metavar="위치:배율,...",
+                        help="템포 자동화 (곡 위치(초):속도 배율, 점 사이는 선형). 예: 0:0.7,120:1.0 (점점 빠르게)")
+    parser.add_argument("--velocity", type=int, default=100, help="note_on 벨로서티 (0 ~ 127, 기본 100)")
+    parser.add_argument("--start", type=float, default=0.0, help="재생 시작 위치 (초)")
+    parser.add_argument("--no-pedal", action="store_true", help="페달 모드 끄기 (sustain 무시)")
+    parser.add_argument("--error", action="store_true", help="가상 오류 발생기 (오타 모드) 켜기")
+    parser.add_argument("--error-percent", type=float, default=5.0, help="오타 확률 %% (기본 5.0)")
+    parser.add_argument("--error-pitch", type=int, default=3, help="음정 오차 +/- 반음 (기본 3)")
+    parser.add_argument("--error-seed", type=int, help="오류 계획 시드 (같은 시드면 같은 오타 / 타이밍 오차, 기본: 무작위)")
+    parser.add_argument("--timing-variance", type=float, default=0.5, help="타이밍 오차 %% (기본 0.5)")
+    parser.add_argument("--timing-mode", choices=sorted(SCHEDULER_MODES), default=DEFAULT_SCHEDULER_MODE,
+                        help="스케줄러 타이밍 모드")
+    parser.add_argument("--lookahead", type=float, default=0.2,
+                        help="미리 디코딩 / 변환해 둘 시간 (초, 기본 0.2)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="파일 전체를 메모리에 올리지 않고 재생하면서 디코딩 (대용량 파일은 자동)")
+    parser.add_argument("--repeat", choices=REPEAT_MODES, default=REPEAT_OFF, help="재생목록 반복 (off / all / one)")
+    parser.add_argument("--shuffle", action="store_true", help="재생목록 셔플")
+    parser.add_argument("--gap", type=float, default=0.0, help="재생목록 곡 사이 간격 (초, 기본 0)")
+    parser.add_argument("--latency-log", help="재생 후 타이밍 기록을 저장할 경로 (.csv / .json)")
+    parser.add_argument("--render", metavar="출력.mid",
+                        help="포트로 재생하지 않고 처리된 연주(속도, 벨로서티, 페달, 오타, 타이밍 오차)를 MIDI 파일로 저장 (- 이면 표준 출력)")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="--render 와 함께: 시드를 1씩 늘리며 오타 연주 N 개를 '출력_시드.mid' 로 저장 (기본 1)")
+    return parser
+
+
+def list_output_ports():
+    from midi_output import list_output_names
+    return list_output_names()
+
+
+def run_headless(args):
+    if args.list_ports:
+        try:
+            ports = list_output_ports()
+        except Exception as e:
+            print(f"[ERR]: MIDI 포트 목록 가져오기 오류: {e}")
+            return 1
+        for port_name in ports:
+            print(port_name)
+        if not ports:
+            print("출력 포트 없음")
+        return 0
+
+    if not args.file:
+        print("[ERR]: 재생할 MIDI 파일을 지정하세요.")
+        return 2
+    if not os.path.exists(args.file):
+        print(f"[ERR]: 파일을 찾을 수 없음: {args.file}")
+        return 2
+    if not args.port and not args.render:
+        print("[ERR]: --port 로 MIDI 출력 포트를 지정하세요. (--list-ports 로 목록 확인)")
+        return 2
+    if args.speed <= 0 or not 0 <= args.velocity <= 127:
+        print("[ERR]: 속도는 0보다 커야 하고, 벨로서티는 0 ~ 127 범위여야 합니다.")
+        return 2
+    speed_curve = None
+    if args.speed_curve:
+        try:
+            speed_curve = SpeedCurve.parse(args.speed_curve)
+        except ValueError as e:
+            print(f"[ERR]: {e}")
+            return 2
+
+    error_seed = args.error_seed if args.error_seed is not None else new_seed()
+    if args.error and not args.render:
+        print(f"오타 모드 시드: {error_seed}")
+
+    errors = []
+    engine = PlaybackEngine(on_error=errors.append)
+    engine.configure(
+        speed=args.speed,
+        speed_curve=speed_curve.points if speed_curve is not None else None,
+        velocity=args.velocity,
+        pedal_enabled=not args.no_pedal,
+        error_enabled=args.error,
+        error_percentage=args.error_percent,
+        error_pitch_range=args.error_pitch,
+        error_seed=error_seed,
+        timing_variance=args.timing_variance,
+        scheduler_mode=args.timing_mode,
+        lookahead=max(0.0, args.lookahead),
+    )
+
+    if args.render:
+        return run_render(args, engine, error_seed)
+    if os.path.isdir(args.file):
+        return run_playlist(args, engine, errors)
+
+    try:
+        engine.load(args.file, streaming=True if args.streaming else None)
+        print(f"파일 로드됨: {os.path.basename(args.file)} ({engine.duration:.1f}s, 이벤트 {len(engine.timeline)}개)")
+        engine.open_port(args.port)
+    except Exception as e:
+        print(f"[ERR]: 재생 준비 실패: {e}")
+        engine.close_port()
+        return 1
+
+    try:
+        if args.start > 0:
+            engine.seek(args.start)
+        engine.play()
+        while not engine.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("중지 요청 (Ctrl+C)")
+        engine.stop()
+    finally:
+        engine.close_port()
+
+    if args.latency_log and engine.latency.count:
+        engine.latency.export(args.latency_log)
+        print(f"타이밍 기록 저장됨: {args.latency_log}")
+    return 1 if errors else 0
+
+
+def run_playlist(args, engine, errors):
+    # 디렉토리 안의 MIDI 파일을 재생목록으로 (다음 곡은 재생 중에 미리 읽어 두고 끊김 없이 이어서 재생)
+    file_paths = sorted(os.path.join(args.file, name) for name in os.listdir(args.file)
+                        if name.lower().endswith((".mid", ".midi")))
+    if not file_paths:
+        print(f"[ERR]: 디렉토리에 MIDI 파일이 없음: {args.file}")
+        return 2
+    try:
+        engine.open_port(args.port)
+    except Exception as e:
+        print(f"[ERR]: 재생 준비 실패: {e}")
+        return 1
+
+    playlist = Playlist(engine, on_change=lambda index, file_path: print(f"재생목록: {os.path.basename(file_path)}"),
+                        streaming=True if args.streaming else None)
+    playlist.set_entries(file_paths)
+    playlist.set_repeat(args.repeat)
+    playlist.set_shuffle(args.shuffle)
+    playlist.set_gap(args.gap)
+    print(f"재생목록: {len(file_paths)}곡 (반복 {args.repeat}, 셔플 {'켜짐' if args.shuffle else '꺼짐'}, 간격 {args.gap:.1f}s)")
+    try:
+        playlist.play()
+        # 미리 읽기가 늦으면 곡 사이에 잠깐 정지 상태일 수 있으므로 재생목록이 끝날 때까지 대기
+        while not errors and (playlist.active or engine.is_loading or engine.is_playing):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("중지 요청 (Ctrl+C)")
+        playlist.stop()
+    finally:
+        engine.close_port()
+
+    if args.latency_log and engine.latency.count:
+        engine.latency.export(args.latency_log)
+        print(f"타이밍 기록 저장됨: {args.latency_log}")
+    return 1 if errors else 0
+
+
+def run_render(args, engine, error_seed):
+    # 재생과 같은 변환을 대기 없이 계산해 파일로 저장. 타임라인은 한 번만 읽고 시드만 바꿔 여러 개 생성
+    # 표준 출력으로 보낼 때는 MIDI 데이터와 섞이지 않도록 안내 메시지를 표준 오류로
+    log = sys.stderr if args.render == "-" else sys.stdout
+    if os.path.isdir(args.file):
+        print("[ERR]: --render 에는 MIDI 파일 하나를 지정하세요.", file=log)
+        return 2
+    if args.variants < 1 or (args.variants > 1 and (args.render == "-" or not args.error)):
+        print("[ERR]: --variants 는 1 이상이어야 하고, 2 이상이면 --error 와 파일 출력이 필요합니다.", file=log)
+        return 2
+
+    try:
+        timeline = engine.open_timeline(args.file, streaming=True if args.streaming else None)
+        # 렌더는 곡 끝 길이가 필요하므로 디코딩 / 스트리밍 인덱스가 끝날 때까지 대기
+        timeline.wait_decoded()
+        if timeline.error is not None:
+            raise timeline.error
+    except Exception as e:
+        print(f"[ERR]: 파일 로드 실패: {e}", file=log)
+        return 1
+
+    stem, extension = os.path.splitext(args.render)
+    try:
+        for variant in range(args.variants):
+            seed = error_seed + variant
+            settings = engine.params.publish(error_seed=seed)
+            output = args.render if args.variants == 1 else f"{stem}_{seed}{extension or '.mid'}"
+            started = time.perf_counter()
+            result = render_timeline(timeline, settings)
+            write_render(result, output)
+            elapsed = time.perf_counter() - started
+            print(f"렌더 완료: {output} (이벤트 {result.events}개, 길이 {result.duration:.1f}s"
+                  + (f", 시드 {seed}, 오타 {result.typos}개" if args.error else "")
+                  + f", {elapsed:.2f}s)", file=log)
+    except Exception as e:
+        print(f"[ERR]: 렌더 실패: {e}", file=log)
+        return 1
+    finally:
+        timeline.close()
+    return 0
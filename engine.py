@@ -0,0 +1,725 @@
+import os
+import threading
+import traceback
+
+from midi_timeline import LoadCancelled, open_midi_file
+from midi_output import open_output
+from midi_router import MidiRouter
+from held_notes import EMPTY_ROW, HeldNotes, controller_reset_events, panic_events
+from error_plan import ErrorPlan, numpy_available
+from midi_stream import STREAMING_THRESHOLD, StreamingTimeline
+from playback_params import PlaybackParams
+from scheduler import HybridScheduler, clock
+from speed_map import SpeedCurve, TimeBase
+from latency import LatencyRecorder
+from lookahead import LookaheadBuffer
+from transform import EventBatches, EventTransform
+
+# ======================================================================================
+# MIDI PLAYER | 재생 엔진
+# Tkinter 없이 동작하는 재생 엔진입니다. GUI / CLI / 스크립트 / 벤치마크가 모두 이 엔진을 사용합니다.
+# 콜백은 재생 스레드에서 호출되므로, GUI 쪽에서는 root.after 등으로 넘겨서 처리해야 합니다.
+# ======================================================================================
+
+STATE_STOPPED = "stopped"
+STATE_PLAYING = "playing"
+STATE_PAUSED = "paused"
+
+# 재생 위치 게시 간격 (초): 탐색 바에서 한 칸(길이의 1/1000)이 움직일 때마다, 단 이 범위 안에서
+POSITION_MIN_INTERVAL = 1 / 30
+POSITION_MAX_INTERVAL = 0.25
+POSITION_STEPS = 1000
+
+# 이보다 늦어지면(초) 밀린 이벤트를 몰아서 보내지 않고 시간 기준을 그만큼 뒤로 미룸
+MAX_CATCH_UP = 0.05
+
+# 이 값이 바뀌면 대기 중인 재생 스레드를 깨워 새 속도로 다시 계산
+_TIMING_SETTINGS = ("speed", "speed_ramp", "speed_curve")
+
+
+class PlaybackEngine:
+    def __init__(self, params=None, on_state=None, on_finished=None, on_error=None, cache=None, on_position=None,
+                 on_advance=None):
+        self.params = params if params is not None else PlaybackParams()
+        self.cache = cache  # TimelineCache 또는 None
+        self.scheduler = HybridScheduler()
+        self.latency = LatencyRecorder()
+
+        self.timeline = None
+        self.file_path = None
+        self.outport = None
+
+        self.state = STATE_STOPPED
+        self.position = 0.0
+        self.held = HeldNotes()  # 실제로 보낸 바이트 기준 눌린 노트 / 페달
+        self.error_plan = None  # 오류 설정이 바뀔 때만 새로 만듦
+        self.typo_count = 0
+
+        self.on_state = on_state
+        self.on_finished = on_finished
+        self.on_error = on_error
+        # 재생 위치 게시: 단일 슬롯 값 + 깨우기 1회. UI 가 take_position() 으로 가져가기 전에는 다시 깨우지 않음
+        self.on_position = on_position
+        self.published_position = 0.0
+        self._position_pending = False
+        # 이어서 재생할 다음 곡 (타임라인, 파일 경로, 곡 사이 간격). 넘어가면 on_advance(파일 경로) 호출
+        self.on_advance = on_advance
+        self._next = None
+
+        self.stop_event = threading.Event()
+        self._thread = None
+        self._buffer = None  # 미리 읽기 버퍼 (재생 중에만)
+        self._producer_error = None
+        # 일시정지: 재생 스레드는 종료하지 않고 조건 변수에서 대기 (위치 / 시간 기준 유지)
+        # _wake 는 스케줄러 대기를 깨우는 용도 (일시정지 / 중지 요청)
+        self._cond = threading.Condition()
+        self._paused = False
+        self._wake = threading.Event()
+
+        self._load_lock = threading.Lock()
+        self._load_generation = 0
+        self._load_cancel = None
+
+    # ------------------------------------------------------------------ 파일 / 포트
+
+    @property
+    def duration(self):
+        return self.timeline.duration if self.timeline is not None else 0.0
+
+    @property
+    def is_playing(self):
+        return self.state == STATE_PLAYING
+
+    @property
+    def is_paused(self):
+        return self.state == STATE_PAUSED
+
+    def load(self, file_path, streaming=None):
+        timeline = self.open_timeline(file_path, streaming)
+        self.set_timeline(timeline, file_path)
+        return timeline
+
+    def load_async(self, file_path, streaming=None, on_progress=None, on_loaded=None, on_error=None):
+        # 워커 스레드에서 로드. 로드가 끝날 때까지 이전 파일 재생은 계속되고, 끝나면 한 번에 교체
+        # 나중에 시작한 로드가 있으면 먼저 시작한 로드의 결과는 버려짐 (세대 번호 비교)
+        # 콜백은 워커 스레드에서 호출되므로, GUI 쪽에서는 root.after 등으로 넘겨서 처리해야 함
+        with self._load_lock:
+            if self._load_cancel is not None:
+                self._load_cancel.set()
+            self._load_generation += 1
+            generation = self._load_generation
+            cancel = self._load_cancel = threading.Event()
+        threading.Thread(target=self._load_worker, daemon=True,
+                         args=(generation, cancel, file_path, streaming, on_progress, on_loaded, on_error)).start()
+        return generation
+
+    def cancel_load(self):
+        # 교체 전(이전 파일이 아직 재생 중)에만 취소 가능. 이미 교체됐으면 False
+        with self._load_lock:
+            if self._load_cancel is None:
+                return False
+            self._load_cancel.set()
+            self._load_cancel = None
+            self._load_generation += 1
+        print("파일 로드 취소됨.")
+        return True
+
+    @property
+    def is_loading(self):
+        return self._load_cancel is not None
+
+    def _load_worker(self, generation, cancel, file_path, streaming, on_progress, on_loaded, on_error):
+        try:
+            timeline = self.open_timeline(file_path, streaming, on_progress, cancel)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            print(f"[ERR]: MIDI 파일 로드 오류: {e}")
+            with self._load_lock:
+                current = generation == self._load_generation
+                if current:
+                    self._load_cancel = None
+            if current and on_error is not None:
+                on_error(e)
+            return
+
+        with self._load_lock:
+            if generation != self._load_generation:
+                timeline.close()
+                return
+            self.set_timeline(timeline, file_path)
+            # 교체한 뒤에는 취소할 수 없음 (이전 타임라인은 이미 닫혔으므로 되돌릴 곳이 없음)
+            # 남은 백그라운드 디코딩은 다른 파일로 바꾸거나 unload 하면 close() 로 멈춤
+            self._load_cancel = None
+        if on_loaded is not None:
+            on_loaded(timeline)
+
+        # 교체 후에도 백그라운드 디코딩이 끝날 때까지 진행률 보고
+        while not timeline.complete and generation == self._load_generation:
+            timeline.wait_decoded(count=len(timeline) + 1, timeout=0.1)
+            if on_progress is not None and generation == self._load_generation:
+                on_progress(timeline.progress)
+        if on_progress is not None and generation == self._load_generation:
+            on_progress(1.0)
+
+    def open_timeline(self, file_path, streaming=None, on_progress=None, cancel=None):
+        # streaming=None 이면 파일 크기로 자동 선택 (대용량 파일은 전체를 메모리에 올리지 않음)
+        if streaming is None:
+            streaming = os.path.getsize(file_path) >= STREAMING_THRESHOLD
+        if streaming:
+            # 탐색 인덱스는 백그라운드에서 기록 (진행률은 교체 후 _load_worker 가 보고, 중단은 close())
+            return StreamingTimeline.open(file_path)
+        timeline = self.cache.load(file_path, cancel) if self.cache is not None else None
+        if timeline is None:
+            # 헤더 / 길이 추정만 읽고 바로 반환. 나머지는 재생과 동시에 백그라운드 디코딩
+            timeline = open_midi_file(file_path)
+            if self.cache is not None:
+                self.cache.store_when_complete(file_path, timeline)
+        return timeline
+
+    def set_timeline(self, timeline, file_path=None):
+        self.stop()
+        if self.timeline is not None and self.timeline is not timeline:
+            self.timeline.close()
+        self.timeline = timeline
+        self.file_path = file_path
+        self.position = 0.0
+
+    def unload(self):
+        self.stop()
+        self.clear_next()
+        if self.timeline is not None:
+            self.timeline.close()
+        self.timeline = None
+        self.file_path = None
+        self.position = 0.0
+
+    def queue_next(self, timeline, file_path=None, gap=0.0):
+        # 지금 곡이 끝나면 재생 스레드를 멈추지 않고 바로 이어서 재생할 곡. gap: 곡 사이 쉬는 시간(초, 0 이면 바로)
+        # 예약한 타임라인은 엔진이 가짐 (다른 곡으로 바꾸거나 unload 하면 닫음)
+        with self._cond:
+            previous = self._next
+            self._next = (timeline, file_path, max(0.0, gap))
+        if previous is not None and previous[0] is not timeline:
+            self._close_unused(previous[0])
+
+    def clear_next(self):
+        with self._cond:
+            previous = self._next
+            self._next = None
+        if previous is not None:
+            self._close_unused(previous[0])
+        return previous is not None
+
+    @property
+    def queued_file(self):
+        upcoming = self._next
+        return upcoming[1] if upcoming is not None else None
+
+    def _close_unused(self, timeline):
+        if timeline is not self.timeline:
+            timeline.close()
+
+    def open_port(self, port_name):
+        self.close_port()
+        self.outport = open_output(port_name)
+        return self.outport
+
+    def open_ports(self, port_names, channels=None, tracks=None):
+        # 여러 포트를 동시에 사용 (포트별 전송 스레드). channels / tracks: {채널 / 트랙 번호: [포트 이름]}
+        self.close_port()
+        router = MidiRouter()
+        try:
+            for port_name in port_names:
+                router.add_port(port_name)
+        except Exception:
+            router.close()
+            raise
+        router.set_routes(channels or {}, tracks or {})
+        self.outport = router
+        return router
+
+    def set_routes(self, channels=None, tracks=None):
+        # 재생 중에도 바꿀 수 있음 (다음 이벤트부터 적용)
+        if not isinstance(self.outport, MidiRouter):
+            raise RuntimeError("다중 포트 출력이 열려있지 않습니다.")
+        self.outport.set_routes(channels, tracks)
+        # 재생 스레드는 라우팅 종류(트랙별 여부)를 설정 버전이 바뀔 때만 다시 읽음
+        self.params.publish()
+
+    def port_stats(self):
+        # 포트별 전송 수 / 초당 전송 수 / 버림 / 큐 깊이 (다중 포트 출력일 때만)
+        return self.outport.stats() if isinstance(self.outport, MidiRouter) else []
+
+    def close_port(self):
+        if self.outport is not None:
+            self.stop()
+            try:
+                if not self.outport.closed:
+                    print(f"MIDI 포트 닫는 중: {self.outport.name}")
+                    self.outport.close()
+            finally:
+                self.outport = None
+
+    def has_output(self):
+        return self.outport is not None and not self.outport.closed
+
+    def configure(self, **settings):
+        previous = self.params.current
+        published = self.params.publish(**settings)
+        if self.state == STATE_PLAYING and any(getattr(previous, name) != getattr(published, name)
+                                               for name in _TIMING_SETTINGS):
+            self._wake.set()
+        return published
+
+    def set_speed_curve(self, points):
+        # 템포 자동화: [(곡 위치(초), 속도 배율)] 또는 None. 재생 속도(speed) 에 곱해짐
+        curve = SpeedCurve(points) if points else None
+        return self.configure(speed_curve=curve.points if curve is not None else None)
+
+    # ------------------------------------------------------------------ 재생 제어
+
+    def play(self):
+        if self.state == STATE_PLAYING:
+            return False
+        if self.timeline is None:
+            raise RuntimeError("재생할 MIDI 파일이 로드되지 않았습니다.")
+        if not self.has_output():
+            raise RuntimeError("MIDI 출력 포트가 열려있지 않습니다.")
+
+        if self.state == STATE_PAUSED and self._thread is not None:
+            # 일시정지 중인 재생 스레드를 깨우기만 하면 파일 / 위치 / 시간 기준 그대로 이어서 재생
+            self._set_state(STATE_PLAYING)
+            with self._cond:
+                self._paused = False
+                self._cond.notify_all()
+            print(f"재개됨. 현재 시간: {self.position:.2f}s")
+            return True
+
+        if self.position == 0:
+            self.latency.reset()
+        settings = self.params.current
+        if settings.error_enabled:
+            plan = self._error_plan_for(settings)
+            if numpy_available and not self.timeline.streaming:
+                plan.precompute(len(self.timeline))
+        self._start()
+        return True
+
+    def _error_plan_for(self, settings):
+        plan = self.error_plan
+        if plan is None or not plan.matches(settings):
+            plan = self.error_plan = ErrorPlan.from_settings(settings)
+        return plan
+
+    def _start(self):
+        self.typo_count = 0
+        self.stop_event.clear()
+        self._wake.clear()
+        self._paused = False
+        self._set_state(STATE_PLAYING)
+        self._thread = threading.Thread(target=self._playback_loop, daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        if self.state != STATE_PLAYING:
+            return False
+        with self._cond:
+            self._paused = True
+            self._wake.set()
+        self._set_state(STATE_PAUSED)
+        print(f"일시정지됨. 현재 시간: {self.position:.2f}s")
+        return True
+
+    def stop(self):
+        if self.state == STATE_STOPPED and self._thread is None:
+            return False
+        print("재생 중지 신호 발생...")
+        self._set_state(STATE_STOPPED)
+        self._halt()
+        self.position = 0.0
+        return True
+
+    def panic(self):
+        # 재생을 멈추고, 추적 상태와 상관없이 모든 채널에 페달 해제 / All Sound Off / All Notes Off 전송
+        if self.state != STATE_STOPPED or self._thread is not None:
+            self.stop()
+        self.held.clear()
+        outport = self.outport
+        if outport is None or outport.closed:
+            return False
+        self._send_batch(outport, panic_events(), broadcast=True)
+        print("[PANIC]: 모든 채널 소리 끄기 전송")
+        return True
+
+    def seek(self, seconds):
+        # 일시정지 중이면 대기 중인 스레드를 끝내고 위치만 바꿈 (재개 시 새 위치에서 상태 복원 후 시작)
+        was_playing = self.state == STATE_PLAYING
+        if self._thread is not None:
+            self._halt()
+        self.position = max(0.0, min(seconds, self.duration))
+        print(f"탐색 완료. 새 시작 시간: {self.position:.2f}s")
+        if was_playing:
+            self._start()
+
+    def wait(self, timeout=None):
+        # 재생 중이 아니게 될 때까지 (끝남 / 중지 / 일시정지) 대기
+        with self._cond:
+            self._cond.wait_for(lambda: self.state != STATE_PLAYING, timeout)
+        thread = self._thread
+        if self.state == STATE_STOPPED and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return self.state != STATE_PLAYING
+
+    def _halt(self):
+        thread = self._thread
+        if thread is None:
+            return
+        self.stop_event.set()
+        buffer = self._buffer
+        if buffer is not None:
+            buffer.close()  # 미리 읽은 배치를 버리고 생산 / 전송 대기를 깨움
+        with self._cond:
+            self._wake.set()
+            self._cond.notify_all()
+        if thread is not threading.current_thread():
+            thread.join(timeout=3.0)
+            if thread.is_alive():
+                print("경고: 재생 스레드가 종료되지 않았습니다.")
+        self._thread = None
+
+    def take_position(self):
+        # 게시된 최신 위치를 가져감 (이후 게시부터 다시 on_position 호출)
+        self._position_pending = False
+        return self.published_position
+
+    def _publish_position(self):
+        self.published_position = self.position
+        if self.on_position is not None and not self._position_pending:
+            self._position_pending = True
+            self.on_position()
+
+    def _set_state(self, state):
+        with self._cond:
+            self.state = state
+            self._cond.notify_all()
+        if self.on_state is not None:
+            self.on_state(state)
+
+    # ------------------------------------------------------------------ 재생 루프
+
+    def _send_batch(self, outport, events, broadcast=False):
+        # broadcast: 끄는 메시지는 다중 포트 출력이면 모든 포트로 (트랙 라우팅으로 어느 포트에서 울리는지 모름)
+        send = outport.send_event
+        if broadcast and isinstance(outport, MidiRouter):
+            send = outport.broadcast_event
+        for status, data1, data2 in events:
+            try:
+                send(status, data1, data2)
+            except Exception as e:
+                print(f"[ERR]: 메시지 전송 실패: {status:02X} {data1} {data2}: {e}")
+
+    def _release_notes(self):
+        # 눌려 있는 노트 / 밟힌 페달만 끔 (채널에 노트가 많으면 CC123 한 번)
+        outport = self.outport
+        if outport is not None and not outport.closed:
+            self._send_batch(outport, self.held.release_events(), broadcast=True)
+        self.held.clear()
+
+    def _hold_for_pause(self, outport):
+        # 일시정지: 울리던 노트 / 페달을 끄고 재개될 때까지 대기한 뒤, 같은 velocity 로 다시 누름
+        # 멈춰 있던 시간(초)을 반환 (시간 기준을 그만큼 미룸). 중지되면 None
+        paused_at = clock()
+        self._send_batch(outport, self.held.release_events(), broadcast=True)
+
+        with self._cond:
+            while self._paused and not self.stop_event.is_set():
+                self._cond.wait()
+            self._wake.clear()
+        if self.stop_event.is_set():
+            return None
+
+        restore = self.held.restore_events()
+        self._send_batch(outport, restore)
+        if restore:
+            print(f"재개: 눌려 있던 노트 / 페달 {len(restore)}개 복원")
+        return clock() - paused_at
+
+    def _produce(self, cursor, buffer):
+        # 생산 스레드: 타임라인을 디코딩 / 변환해 전송 준비된 배치를 미리 읽기 버퍼에 채움 (대기 / 전송은 하지 않음)
+        # 전송 위치보다 lookahead 초 이상 앞서면 버퍼에서 대기하므로, 설정 변경은 최대 그만큼 늦게 적용됨
+        try:
+            settings = self.params.current
+            # 오류 모드: 난수 대신 시드로 미리 계산한 계획에서 이벤트 인덱스로 값을 꺼냄
+            plan = self._error_plan_for(settings) if settings.error_enabled else None
+            transform = EventTransform(settings, plan, cursor.ordinal)
+            # 같은 시각(또는 batch_window 이내)의 이벤트들은 한 번만 대기한 뒤 연속 전송
+            batches = EventBatches(cursor, settings.batch_window)
+
+            for batch in batches:
+                if buffer.closed:
+                    break
+                if batch is None:
+                    continue  # 재생이 디코딩을 따라잡음: 중지 요청만 확인
+                if self.params.version != settings.version:
+                    settings = self.params.current
+                    plan = self._error_plan_for(settings) if settings.error_enabled else None
+                    transform.update(settings, plan)
+                    batches.window = settings.batch_window
+
+                batch_time, gap, status_arr, data1_arr, data2_arr, track_arr, batch_start, batch_end = batch
+                # 타이밍 오차: 직전 배치와의 간격에 비례 (누적되지 않음)
+                jitter = transform.jitter(gap)
+                events = []
+                transform.apply(status_arr, data1_arr, data2_arr, track_arr, batch_start, batch_end, events)
+                self.typo_count = transform.typo_count
+
+                # 페달 필터로 보낼 것이 없어진 배치는 넣지 않음
+                if events and not buffer.put([batch_time, jitter, events], settings.lookahead * settings.speed):
+                    return
+        except Exception as e:
+            print(f"[ERR]: 이벤트 미리 읽기 중 오류 발생: {e}")
+            traceback.print_exc()
+            self._producer_error = e
+        finally:
+            buffer.finish()
+
+    def _resume_after_wake(self, outport, timebase):
+        # 스케줄러 대기가 깨어남: 중지면 False. 일시정지면 재개될 때까지 대기한 뒤 시간 기준을 그만큼 미룸
+        if self.stop_event.is_set():
+            return False
+        with self._cond:
+            paused = self._paused
+            if not paused:
+                self._wake.clear()  # 속도 변경으로 깨어남: 새 속도로 다시 계산
+        if paused:
+            paused_for = self._hold_for_pause(outport)
+            if paused_for is None:
+                return False
+            timebase.shift(paused_for)
+        return True
+
+    def _advance_to_next(self, outport, timeline):
+        # 곡 사이: 울리는 노트 / 페달을 끄고 모든 채널 컨트롤러를 초기화한 뒤 예약된 곡으로 교체
+        with self._cond:
+            upcoming = self._next
+            self._next = None
+        if upcoming is None:
+            return None
+        next_timeline, file_path, gap = upcoming
+        self._release_notes()
+        self._send_batch(outport, controller_reset_events(), broadcast=True)
+        self.timeline = next_timeline
+        self.file_path = file_path
+        self.position = 0.0
+        if timeline is not next_timeline:
+            timeline.close()
+        print(f"다음 곡: {os.path.basename(file_path) if file_path else '(타임라인)'} (간격 {gap:.2f}s)")
+        if self.on_advance is not None:
+            self.on_advance(file_path)
+        return next_timeline, gap
+
+    def _playback_loop(self):
+        # 전송 스레드: 미리 읽기 버퍼에서 배치를 꺼내 시각에 맞춰 보내기만 함
+        # 곡이 끝났을 때 다음 곡이 예약되어 있으면(queue_next) 스레드를 그대로 두고 곡 끝 시각에 이어서 재생
+        print("재생 루프 스레드 시작.")
+        timeline = self.timeline
+        outport = self.outport
+        finished = False
+        error = None
+
+        cursor = None
+        buffer = None
+        producer = None
+        try:
+            stop_event = self.stop_event
+            # 재생 스레드는 GUI 가 게시한 파라미터 스냅샷만 사용
+            settings = self.params.current
+            scheduler = self.scheduler
+            scheduler.set_mode(settings.scheduler_mode)
+            latency = self.latency
+            router = outport if isinstance(outport, MidiRouter) else None
+            if router is not None:
+                router.latency = latency
+            # 트랙별 라우팅이 있을 때만 이벤트마다 트랙 번호를 넘김 (set_routes 가 설정 버전을 올리면 다시 읽음)
+            send_track = outport.send_track_event if router is not None and router.routes_tracks else None
+            held = self.held
+            held.clear()
+            velocities = held.velocities
+            sustain = held.sustain
+            wake = self._wake
+            start_real = clock()
+            next_publish = 0.0
+
+            while True:
+                # 타임라인(메모리 / 스트리밍)에서 시작 위치를 찾음 (파일 재파싱 없음)
+                cursor = timeline.cursor(self.position)
+                self.position = cursor.position
+                # 곡 위치 -> 실제 시각. 속도가 바뀌면 그 순간을 기준점으로 다시 잡음 (지난 구간은 그대로)
+                # 버퍼의 배치는 곡 위치만 가지므로 속도가 바뀌어도 버퍼를 비울 필요가 없음
+                curve_points = settings.speed_curve
+                timebase = TimeBase(self.position, start_real, settings.speed,
+                                    SpeedCurve(curve_points) if curve_points else None)
+                self._publish_position()
+                # 재생 중에만 게시. 화면에서 위치가 눈에 띄게 바뀌는 간격보다 자주 게시하지 않음
+                publish_interval = min(POSITION_MAX_INTERVAL, max(POSITION_MIN_INTERVAL, timeline.duration / POSITION_STEPS))
+
+                if not settings.pedal_enabled:
+                    print("페달 모드 OFF 상태 - 모든 채널에 대해 sustain 해제 메시지 전송")
+                    for ch in range(16):
+                        try:
+                            outport.send_event(0xB0 | ch, 64, 0)
+                        except Exception as e:
+                            print(f"초기 페달 해제 실패 (채널 {ch}): {e}")
+
+                # 탐색 / 재개 위치의 program, CC, pitch bend, 눌린 노트를 체크포인트에서 복원 (chase)
+                chase_state = cursor.chase_state()
+                if chase_state is not None:
+                    chase_events = chase_state.chase_events(
+                        skip_sustain=not settings.pedal_enabled,
+                        note_velocity=settings.velocity)
+                    print(f"탐색 위치 상태 복원: {len(chase_events)}개 메시지 전송")
+                    for event in chase_events:
+                        try:
+                            outport.send_bytes(event)
+                            held.apply(*event)
+                        except Exception as e:
+                            print(f"[ERR]: 상태 복원 메시지 전송 실패: {e}")
+
+                # 디코딩 / 변환은 생산 스레드가 미리 해 둠 (탐색 / 중지 시에는 버퍼를 버리고 새로 시작)
+                self._producer_error = None
+                buffer = self._buffer = LookaheadBuffer(self.position)
+                producer = threading.Thread(target=self._produce, args=(cursor, buffer), daemon=True)
+                producer.start()
+
+                pending = buffer.take()
+                while pending:
+                    batch = pending[0]
+                    if self.params.version != settings.version:
+                        settings = self.params.current
+                        if settings.speed_curve != curve_points:
+                            curve_points = settings.speed_curve
+                            timebase.set_curve(SpeedCurve(curve_points) if curve_points else None,
+                                               clock(), batch[0])
+                        if settings.speed != timebase.speed:
+                            timebase.set_speed(settings.speed, clock(), settings.speed_ramp, batch[0])
+                        if settings.scheduler_mode != scheduler.mode:
+                            scheduler.set_mode(settings.scheduler_mode)
+                        send_track = outport.send_track_event if router is not None and router.routes_tracks else None
+
+                    if stop_event.is_set():
+                        break
+
+                    batch_time, jitter, events = batch
+                    target_real_time = timebase.advance(batch_time)
+                    if jitter:
+                        target_real_time += jitter / timebase.speed_at(batch_time)
+
+                    # 밀린 이벤트를 한꺼번에 보내지 않도록, 많이 늦었으면 이후 이벤트의 시간 기준을 미룸
+                    lateness = clock() - target_real_time
+                    if lateness > MAX_CATCH_UP:
+                        timebase.shift(lateness)
+
+                    if not scheduler.wait_until(target_real_time, wake):
+                        if not self._resume_after_wake(outport, timebase):
+                            break
+                        continue
+
+                    if router is not None:
+                        router.scheduled = target_real_time  # 지연은 포트 전송 스레드가 실제로 쓸 때 기록
+                    for status, data1, data2, track in events:
+                        # 실제로 보낸 바이트 기준으로 눌린 노트 / 페달 기록
+                        kind = status & 0xF0
+                        if kind == 0x90 and data2 > 0:
+                            velocities[((status & 0x0F) << 7) | data1] = data2
+                        elif kind == 0x80 or kind == 0x90:
+                            velocities[((status & 0x0F) << 7) | data1] = 0
+                        elif kind == 0xB0:
+                            if data1 == 64:
+                                sustain[status & 0x0F] = data2
+                            elif data1 == 120 or data1 == 123:
+                                channel = status & 0x0F
+                                velocities[channel << 7:(channel + 1) << 7] = EMPTY_ROW
+
+                        try:
+                            if send_track is None:
+                                outport.send_event(status, data1, data2)
+                            else:
+                                send_track(track, status, data1, data2)
+                            if router is None:
+                                latency.record(target_real_time, clock())
+                        except Exception as e:
+                            print(f"[ERR]: MIDI 메시지 전송 오류: {e}")
+                            error = e
+                            stop_event.set()
+                            break
+
+                    if router is not None:
+                        router.scheduled = None
+                    pending.popleft()
+                    buffer.mark(batch_time)
+                    self.position = batch_time
+                    if target_real_time >= next_publish:
+                        next_publish = target_real_time + publish_interval
+                        self._publish_position()
+                    if not pending:
+                        pending = buffer.take()
+
+                # 중지 / 오류로 빠져나온 경우가 아니면 끝까지 재생한 것
+                if stop_event.is_set() or self._producer_error is not None:
+                    break
+                if self._next is None:
+                    finished = True
+                    break
+
+                # 다음 곡이 예약되어 있으면 곡 끝(마지막 이벤트 뒤 남은 시간 포함)까지 기다렸다가 교체
+                while not scheduler.wait_until(timebase.advance(timeline.duration), wake):
+                    if not self._resume_after_wake(outport, timebase):
+                        break
+                if stop_event.is_set():
+                    break
+                end_real = timebase.advance(timeline.duration)
+
+                buffer.close()
+                producer.join()
+                cursor.close()
+                buffer = producer = cursor = self._buffer = None
+                upcoming = self._advance_to_next(outport, timeline)
+                if upcoming is None:
+                    finished = True  # 기다리는 동안 예약이 취소됨
+                    break
+                timeline, gap = upcoming
+                # 새 곡의 0초 = 이전 곡 끝 + 간격 (교체에 걸린 시간과 상관없이 일정)
+                start_real = end_real + gap
+
+        except Exception as e:
+            print(f"[ERR]: 재생 중 예상치 못한 오류 발생: {e}")
+            traceback.print_exc()
+            error = e
+
+        finally:
+            if buffer is not None:
+                buffer.close()
+            if producer is not None:
+                producer.join()
+            self._buffer = None
+            if cursor is not None:
+                cursor.close()
+            if error is None:
+                error = self._producer_error
+            if isinstance(outport, MidiRouter):
+                outport.scheduled = None
+            self._release_notes()
+            if self.latency.count:
+                print(f"[TIM]: {self.latency.summary_text()}")
+            if self.typo_count:
+                print(f"오타 모드: 음정 {self.typo_count}개 변경 (시드 {self.error_plan.seed})")
+            if finished or error is not None:
+                self._thread = None
+                self.position = 0.0
+                self._set_state(STATE_STOPPED)
+                if error is not None and self.on_error is not None:
+                    self.on_error(error)
+                elif finished and self.on_finished is not None:
+                    self.on_finished()
+            print("재생 루프 스레드 종료.")
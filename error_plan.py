@@ -0,0 +1,113 @@
+import array
+import importlib.util
+import random
+
+# NumPy 는 import 가 무거우므로(수십 ms) 시작할 때는 설치 여부만 보고, 처음 계획을 만들 때 import
+numpy_available = importlib.util.find_spec("numpy") is not None
+np = None
+
+# ======================================================================================
+# MIDI PLAYER | 오류 계획 (가상 오류 발생기)
+# 오타(음정 오차)와 타이밍 오차를 시드로부터 이벤트 인덱스별로 미리 계산해 둡니다.
+# 재생 루프는 난수 생성 없이 값만 꺼내 쓰며, 같은 시드 / 같은 설정이면 항상 같은 "실수" 연주가 됩니다.
+# 값은 CHUNK 단위로 생성되므로 스트리밍 타임라인에서도 필요한 구간만 만들어 씁니다.
+# NumPy 가 없으면 random 모듈로 같은 분포를 만듭니다 (같은 시드라도 NumPy 결과와 값은 다름).
+# ======================================================================================
+
+PLAN_CHUNK_SHIFT = 13
+PLAN_CHUNK = 1 << PLAN_CHUNK_SHIFT
+PLAN_CHUNK_MASK = PLAN_CHUNK - 1
+
+# 미리 계산하지 않은 (스트리밍) 계획이 메모리에 들고 있는 최대 청크 수
+_MAX_LAZY_CHUNKS = 8
+
+
+def _load_numpy():
+    global np, numpy_available
+    if np is None and numpy_available:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            numpy_available = False
+    return np is not None
+
+
+class ErrorPlan:
+    def __init__(self, seed, error_percentage, error_pitch_range, timing_variance):
+        self.seed = int(seed)
+        self.error_percentage = float(error_percentage)
+        self.error_pitch_range = int(error_pitch_range)
+        self.timing_variance = float(timing_variance)
+        self._chunks = {}
+        self._precomputed = 0
+
+    @property
+    def key(self):
+        return (self.seed, self.error_percentage, self.error_pitch_range, self.timing_variance)
+
+    def matches(self, settings):
+        return self.key == (int(settings.error_seed), float(settings.error_percentage),
+                            int(settings.error_pitch_range), float(settings.timing_variance))
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.error_seed, settings.error_percentage, settings.error_pitch_range, settings.timing_variance)
+
+    def precompute(self, event_count):
+        # 이벤트 수가 정해진 타임라인은 재생 전에 전체 청크를 한 번에 만들어 둠
+        for chunk in range((event_count + PLAN_CHUNK_MASK) >> PLAN_CHUNK_SHIFT):
+            self.chunk(chunk)
+        self._precomputed = len(self._chunks)
+
+    def chunk(self, chunk):
+        # (음정 오차 배열, 타이밍 오차 배열): 인덱스 chunk * PLAN_CHUNK 부터 PLAN_CHUNK 개
+        # 음정 오차는 모든 인덱스에 대해 만들어지지만 재생 루프에서는 note_on 에만 적용됨
+        cached = self._chunks.get(chunk)
+        if cached is not None:
+            return cached
+        if numpy_available and _load_numpy():
+            deviations, jitters = self._generate_numpy(chunk)
+        else:
+            deviations, jitters = self._generate_python(chunk)
+        if not self._precomputed and len(self._chunks) >= _MAX_LAZY_CHUNKS:
+            self._chunks.pop(next(iter(self._chunks)))
+        self._chunks[chunk] = (deviations, jitters)
+        return deviations, jitters
+
+    def _generate_numpy(self, chunk):
+        rng = np.random.default_rng([self.seed & 0xFFFFFFFF, chunk])
+        hits = rng.random(PLAN_CHUNK) * 100 < self.error_percentage
+        pitch_range = self.error_pitch_range
+        if pitch_range > 0:
+            # 0 을 제외한 -range ~ +range 균등 분포 (크기 1 ~ range, 부호 무작위)
+            magnitude = rng.integers(1, pitch_range + 1, PLAN_CHUNK)
+            sign = rng.integers(0, 2, PLAN_CHUNK) * 2 - 1
+            deviation = np.where(hits, magnitude * sign, 0).astype(np.int8)
+        else:
+            deviation = np.zeros(PLAN_CHUNK, dtype=np.int8)
+        ratio = self.timing_variance / 100.0
+        jitter = rng.uniform(-ratio, ratio, PLAN_CHUNK)
+
+        deviations = array.array('b')
+        deviations.frombytes(deviation.tobytes())
+        jitters = array.array('d')
+        jitters.frombytes(jitter.astype(np.float64).tobytes())
+        return deviations, jitters
+
+    def _generate_python(self, chunk):
+        rng = random.Random((self.seed & 0xFFFFFFFF) << 32 | chunk)
+        percentage = self.error_percentage
+        pitch_range = self.error_pitch_range
+        deviations = array.array('b', bytes(PLAN_CHUNK))
+        if pitch_range > 0:
+            for i in range(PLAN_CHUNK):
+                if rng.random() * 100 < percentage:
+                    deviations[i] = rng.randint(1, pitch_range) * rng.choice((-1, 1))
+        ratio = self.timing_variance / 100.0
+        jitters = array.array('d', [rng.uniform(-ratio, ratio) for _ in range(PLAN_CHUNK)])
+        return deviations, jitters
+
+
+def new_seed():
+    return random.randrange(1, 1000000)
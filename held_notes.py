@@ -0,0 +1,99 @@
+# ======================================================================================
+# MIDI PLAYER | 눌린 노트 추적
+# 실제로 포트에 보낸 바이트 기준으로 채널 x 노트(16 x 128) 를 bytearray 하나에 기록합니다.
+# 중지 / 일시정지 / 탐색 시에는 지금 울리는 노트와 밟힌 페달만 끄는 메시지를 한 번에 만들어 보냅니다.
+# ======================================================================================
+
+# 한 채널에 이 수 이상 눌려 있으면 note_off 여러 개 대신 All Notes Off (CC123) 한 번
+ALL_NOTES_OFF_MIN = 4
+
+EMPTY_ROW = bytes(128)
+
+
+class HeldNotes:
+    __slots__ = ("velocities", "sustain")
+
+    def __init__(self):
+        # (채널 << 7) | 실제 전송한 노트 -> velocity (0 = 안 눌림)
+        self.velocities = bytearray(16 * 128)
+        self.sustain = bytearray(16)  # 채널별 마지막 sustain (CC64) 값
+
+    def __len__(self):
+        return len(self.velocities) - self.velocities.count(0)
+
+    def clear(self):
+        self.velocities[:] = bytes(16 * 128)
+        self.sustain[:] = bytes(16)
+
+    def apply(self, status, data1, data2=0):
+        # 재생 루프 밖에서 보낸 메시지 (상태 복원 등) 반영. 재생 루프는 같은 처리를 직접 인라인으로 함
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind == 0x90 and data2 > 0:
+            self.velocities[(channel << 7) | data1] = data2
+        elif kind == 0x80 or kind == 0x90:
+            self.velocities[(channel << 7) | data1] = 0
+        elif kind == 0xB0:
+            if data1 == 64:
+                self.sustain[channel] = data2
+            elif data1 == 120 or data1 == 123:
+                self.velocities[channel << 7:(channel + 1) << 7] = EMPTY_ROW
+
+    def notes(self):
+        # [(채널, 노트, velocity)] 지금 눌려 있는 (실제 전송한) 노트
+        velocities = self.velocities
+        held = []
+        for channel in range(16):
+            base = channel << 7
+            if velocities[base:base + 128] == EMPTY_ROW:
+                continue
+            for note in range(128):
+                if velocities[base + note]:
+                    held.append((channel, note, velocities[base + note]))
+        return held
+
+    def release_events(self):
+        # 울리는 노트 / 밟힌 페달만 끄는 최소 메시지 목록 [(status, data1, data2)]
+        events = []
+        velocities = self.velocities
+        for channel in range(16):
+            if self.sustain[channel]:
+                events.append((0xB0 | channel, 64, 0))
+            base = channel << 7
+            row = velocities[base:base + 128]
+            if row == EMPTY_ROW:
+                continue
+            count = 128 - row.count(0)
+            if count >= ALL_NOTES_OFF_MIN:
+                events.append((0xB0 | channel, 123, 0))
+            else:
+                for note in range(128):
+                    if row[note]:
+                        events.append((0x80 | channel, note, 0))
+        return events
+
+    def restore_events(self):
+        # release_events 로 끈 페달 / 노트를 같은 값으로 다시 누르는 메시지 목록 (일시정지 후 재개)
+        events = [(0xB0 | channel, 64, value) for channel, value in enumerate(self.sustain) if value]
+        events.extend((0x90 | channel, note, velocity) for channel, note, velocity in self.notes())
+        return events
+
+
+def controller_reset_events():
+    # 곡 사이: 모든 채널의 컨트롤러 초기화 (Reset All Controllers) + pitch bend 중앙
+    # CC121 에서 pitch bend 를 초기화하지 않는 장치도 있어서 따로 보냄
+    events = []
+    for channel in range(16):
+        events.append((0xB0 | channel, 121, 0))
+        events.append((0xE0 | channel, 0, 64))
+    return events
+
+
+def panic_events():
+    # 추적 상태와 상관없이 모든 채널의 페달 / 소리 / 노트를 끔
+    events = []
+    for channel in range(16):
+        events.append((0xB0 | channel, 64, 0))
+        events.append((0xB0 | channel, 120, 0))
+        events.append((0xB0 | channel, 123, 0))
+    return events
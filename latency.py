@@ -0,0 +1,114 @@
+import array
+import csv
+import json
+
+# ======================================================================================
+# MIDI PLAYER | 타이밍 지연 계측
+# 전송된 이벤트마다 예정 시각 / 실제 전송 시각 / 지연을 미리 할당된 링 버퍼에 기록하고,
+# 실시간 히스토그램으로 p50 / p95 / p99 / 최대 지연을 계산합니다.
+# ======================================================================================
+
+HISTOGRAM_BUCKET = 0.0001  # 100us 단위
+HISTOGRAM_BUCKETS = 1000   # 0 ~ 100ms, 마지막 칸은 그 이상
+
+
+class LatencyRecorder:
+    def __init__(self, capacity=1 << 16, late_threshold=0.005):
+        # capacity 는 2의 거듭제곱으로 맞춤 (인덱스 계산을 비트 연산으로)
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self.late_threshold = late_threshold
+
+        self.scheduled = array.array('d', [0.0]) * size
+        self.actual = array.array('d', [0.0]) * size
+        self.lateness = array.array('d', [0.0]) * size
+        self.histogram = array.array('L', [0]) * (HISTOGRAM_BUCKETS + 1)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.late_count = 0
+        self.max_lateness = 0.0
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+
+    def record(self, scheduled, actual):
+        position = self.count & self._mask
+        lateness = actual - scheduled
+        self.scheduled[position] = scheduled
+        self.actual[position] = actual
+        self.lateness[position] = lateness
+        self.count += 1
+
+        if lateness > 0:
+            bucket = int(lateness / HISTOGRAM_BUCKET)
+            self.histogram[bucket if bucket < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS] += 1
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+            if lateness > self.late_threshold:
+                self.late_count += 1
+        else:
+            self.histogram[0] += 1
+
+    def percentile(self, percent):
+        if self.count == 0:
+            return 0.0
+        target = self.count * percent / 100.0
+        seen = 0
+        for bucket, amount in enumerate(self.histogram):
+            seen += amount
+            if seen >= target:
+                if bucket == HISTOGRAM_BUCKETS:
+                    return self.max_lateness
+                return (bucket + 1) * HISTOGRAM_BUCKET
+        return self.max_lateness
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max_lateness * 1000,
+            "late_threshold_ms": self.late_threshold * 1000,
+            "late_count": self.late_count,
+        }
+
+    def summary_text(self):
+        if self.count == 0:
+            return "지연 기록 없음"
+        s = self.summary()
+        return (f"지연 p50 {s['p50_ms']:.1f}ms / p95 {s['p95_ms']:.1f}ms / p99 {s['p99_ms']:.1f}ms"
+                f" / 최대 {s['max_ms']:.1f}ms / {s['late_threshold_ms']:.0f}ms 초과 {s['late_count']}건")
+
+    def records(self):
+        # 링 버퍼에 남아있는 기록을 오래된 것부터 (예정, 실제, 지연) 순으로
+        stored = min(self.count, self.capacity)
+        start = self.count - stored
+        for n in range(start, self.count):
+            position = n & self._mask
+            yield self.scheduled[position], self.actual[position], self.lateness[position]
+
+    def export(self, file_path):
+        if file_path.lower().endswith(".json"):
+            self.export_json(file_path)
+        else:
+            self.export_csv(file_path)
+
+    def export_csv(self, file_path):
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["scheduled_s", "actual_s", "lateness_ms"])
+            for scheduled, actual, lateness in self.records():
+                writer.writerow([f"{scheduled:.6f}", f"{actual:.6f}", f"{lateness * 1000:.3f}"])
+
+    def export_json(self, file_path):
+        data = {
+            "summary": self.summary(),
+            "events": [[scheduled, actual, lateness * 1000] for scheduled, actual, lateness in self.records()],
+        }
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
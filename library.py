@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from smf import META_SET_TEMPO, SmfFile, ticks_to_seconds
+
+# ======================================================================================
+# MIDI PLAYER | MIDI 라이브러리 인덱스
+# ./midi 폴더의 파일별 정보(길이, 트랙 / 채널 / 노트 수, 템포 범위, 크기)를 백그라운드에서 수집하고
+# JSON 으로 저장합니다. 다시 스캔할 때는 mtime / 크기가 바뀐 파일만 다시 읽습니다.
+# ======================================================================================
+
+DEFAULT_LIBRARY_DIR = os.path.join(".", "midi")
+LIBRARY_INDEX_NAME = os.path.join(".cache", "library.json")
+LIBRARY_EXTENSIONS = (".mid", ".midi")
+LIBRARY_VERSION = 1
+
+SCAN_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def scan_file(file_path):
+    # 트랙별로 독립 디코딩 (병합 없이) 해서 통계만 모음
+    stat = os.stat(file_path)
+    entry = {"name": os.path.basename(file_path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+    with SmfFile(file_path) as smf:
+        tempos = []
+        channels = 0
+        notes = 0
+        end_tick = 0
+        for decoder in smf.decoders():
+            while True:
+                event = decoder.next_event()
+                if event is None:
+                    break
+                status = event[1]
+                if 0x90 <= status < 0xA0 and event[3] > 0:
+                    notes += 1
+                    channels |= 1 << (status & 0x0F)
+                elif status == 0xFF and event[2] == META_SET_TEMPO and len(event[4]) == 3:
+                    tempos.append((event[0], int.from_bytes(event[4], "big")))
+            end_tick = max(end_tick, decoder.tick)
+        tempos.sort()
+        bpms = [60000000.0 / tempo for _, tempo in tempos if tempo > 0] or [120.0]
+        entry.update({
+            "format": smf.format,
+            "duration": ticks_to_seconds(end_tick, tempos, smf.ticks_per_beat),
+            "tracks": smf.track_count,
+            "channels": bin(channels).count("1"),
+            "notes": notes,
+            "tempo_min": round(min(bpms), 2),
+            "tempo_max": round(max(bpms), 2),
+        })
+    return entry
+
+
+class MidiLibrary:
+    def __init__(self, root=DEFAULT_LIBRARY_DIR, index_path=None):
+        self.root = root
+        self.index_path = index_path or os.path.join(root, LIBRARY_INDEX_NAME)
+        self.entries = {}  # 파일 이름 -> 정보 dict
+        self.scanning = False
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+        self.load_index()
+
+    # ------------------------------------------------------------------ 저장 / 불러오기
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == LIBRARY_VERSION:
+                with self._lock:
+                    self.entries = data.get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def save_index(self):
+        with self._lock:
+            data = {"version": LIBRARY_VERSION, "entries": dict(self.entries)}
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"[ERR]: 라이브러리 인덱스 저장 실패: {e}")
+
+    # ------------------------------------------------------------------ 스캔
+
+    def scan(self, on_progress=None, on_done=None):
+        # 백그라운드 스캔 시작. 콜백은 스캔 스레드에서 호출되므로 GUI 는 root.after 로 넘겨야 함
+        if self.scanning:
+            return False
+        self._cancel.clear()
+        self.scanning = True
+        self._thread = threading.Thread(target=self._scan_worker, args=(on_progress, on_done), daemon=True)
+        self._thread.start()
+        return True
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.scanning
+
+    def _scan_worker(self, on_progress, on_done):
+        changed = False
+        try:
+            found = {}
+            try:
+                with os.scandir(self.root) as it:
+                    for item in it:
+                        if item.is_file() and item.name.lower().endswith(LIBRARY_EXTENSIONS):
+                            stat = item.stat()
+                            found[item.name] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                pass
+
+            with self._lock:
+                removed = [name for name in self.entries if name not in found]
+                for name in removed:
+                    del self.entries[name]
+                stale = [name for name, (mtime, size) in found.items()
+                         if name not in self.entries
+                         or self.entries[name].get("mtime") != mtime
+                         or self.entries[name].get("size") != size]
+            changed = bool(removed)
+
+            if stale:
+                print(f"[LIB]: 라이브러리 스캔: 파일 {len(found)}개 중 {len(stale)}개 갱신")
+            done = 0
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+                futures = {pool.submit(self._scan_one, name): name for name in stale}
+                for future, name in futures.items():
+                    entry = future.result()
+                    if self._cancel.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                    with self._lock:
+                        if entry is not None:
+                            self.entries[name] = entry
+                        else:
+                            self.entries.pop(name, None)
+                    changed = True
+                    done += 1
+                    if on_progress is not None:
+                        on_progress(done, len(stale))
+        except Exception as e:
+            print(f"[ERR]: 라이브러리 스캔 오류: {e}")
+        finally:
+            if changed:
+                self.save_index()
+            self.scanning = False
+            if on_done is not None:
+                on_done(changed)
+
+    def _scan_one(self, name):
+        if self._cancel.is_set():
+            return None
+        try:
+            return scan_file(os.path.join(self.root, name))
+        except Exception as e:
+            print(f"[ERR]: 라이브러리 파일 읽기 실패: {name}: {e}")
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except OSError:
+                return None
+            # 읽을 수 없는 파일도 목록에 남기고, 파일이 바뀌기 전까지 다시 읽지 않음
+            return {"name": name, "size": stat.st_size, "mtime": stat.st_mtime_ns, "error": str(e)}
+
+    # ------------------------------------------------------------------ 조회
+
+    def path_for(self, name):
+        return os.path.join(self.root, name)
+
+    def names(self):
+        with self._lock:
+            return sorted(self.entries)
+
+    def query(self, text="", sort_key="name", reverse=False):
+        # 이름 부분 일치 (대소문자 무시) 필터 + 정렬한 엔트리 목록
+        text = text.strip().lower()
+        with self._lock:
+            entries = [entry for name, entry in self.entries.items() if not text or text in name.lower()]
+        if sort_key == "name":
+            entries.sort(key=lambda entry: entry["name"].lower(), reverse=reverse)
+        else:
+            entries.sort(key=lambda entry: entry.get(sort_key, 0), reverse=reverse)
+        return entries
@@ -0,0 +1,72 @@
+import collections
+import threading
+
+# ======================================================================================
+# MIDI PLAYER | 미리 읽기 버퍼
+# 생산 스레드(디코딩 + 변환)가 만든 전송 준비된 배치를 전송 스레드에 넘기는 크기 제한 버퍼입니다.
+# 배치 = [곡 위치(초), 타이밍 오차(곡 위치 초), [(status, data1, data2, 트랙)]]
+# 시각은 곡 위치로 넣고 실제 시각은 전송 스레드가 보내기 직전에 계산하므로, 속도가 바뀌어도 버퍼를 비울 필요가 없습니다.
+# ======================================================================================
+
+# 버퍼에 담을 수 있는 최대 이벤트 수 (미리 읽기 시간과 상관없이)
+LOOKAHEAD_CAPACITY = 8192
+
+
+class LookaheadBuffer:
+    def __init__(self, start=0.0, capacity=LOOKAHEAD_CAPACITY):
+        self.capacity = capacity
+        self.batches = collections.deque()
+        self.count = 0  # 버퍼에 있는 이벤트 수
+        self.consumed = start  # 전송 스레드가 마지막으로 보낸 배치의 곡 위치
+        self.closed = False  # 더 이상 넣지 않음 (끝까지 읽었거나 중지)
+        self.waiting = False  # 생산 스레드가 put 에서 대기 중일 수 있음 (mark 가 깨워야 함)
+        self._cond = threading.Condition()
+
+    def put(self, batch, window):
+        # 버퍼가 가득 찼거나, 전송 위치보다 window(곡 위치 초) 이상 앞서면 대기. 중지(close) 되면 False
+        size = len(batch[2])
+        with self._cond:
+            # 조건을 보기 전에 표시: mark 는 consumed 를 먼저 바꾸고 이 값을 보므로 깨우기를 놓치지 않음
+            self.waiting = True
+            while not self.closed and self.batches and (
+                    self.count + size > self.capacity or batch[0] > self.consumed + window):
+                self._cond.wait()
+            self.waiting = False
+            if self.closed:
+                return False
+            self.batches.append(batch)
+            self.count += size
+            self._cond.notify_all()
+        return True
+
+    def take(self):
+        # 지금 버퍼에 있는 배치를 모두 가져감 (잠금 한 번). 비어 있으면 들어올 때까지 대기, 끝났으면 빈 deque
+        with self._cond:
+            while not self.batches and not self.closed:
+                self._cond.wait()
+            batches = self.batches
+            self.batches = collections.deque()
+            self.count = 0
+            self._cond.notify_all()
+        return batches
+
+    def mark(self, position):
+        # 전송 스레드가 position 까지 보냄. 생산 스레드가 대기 중일 때만 잠금 (배치마다 호출되므로)
+        self.consumed = position
+        if self.waiting:
+            with self._cond:
+                self._cond.notify_all()
+
+    def finish(self):
+        # 생산 완료: 남은 배치는 전송 스레드가 마저 가져감
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def close(self):
+        # 중지: 남은 배치를 버리고 양쪽 대기를 모두 깨움
+        with self._cond:
+            self.closed = True
+            self.batches.clear()
+            self.count = 0
+            self._cond.notify_all()
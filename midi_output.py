@@ -0,0 +1,106 @@
+import importlib.util
+
+from midi_timeline import message_length
+
+# ======================================================================================
+# MIDI PLAYER | 출력 포트
+# mido.Message 객체를 만들지 않고, 미리 인코딩된 바이트를 python-rtmidi 로 바로 전송합니다.
+# python-rtmidi 가 없으면 mido 포트로 대체합니다.
+# 시작 시간을 줄이기 위해 rtmidi / mido 는 설치 여부만 확인하고, 처음 포트를 열거나 목록을 볼 때 import 합니다.
+# ======================================================================================
+
+rtmidi_available = importlib.util.find_spec("rtmidi") is not None
+
+# status 바이트 -> 메시지 길이 조회 테이블
+MESSAGE_LENGTHS = bytes(message_length(status) if status >= 0x80 else 0 for status in range(256))
+
+
+class RawMidiOutput:
+    def __init__(self, port_name):
+        import rtmidi
+        self._midiout = rtmidi.MidiOut()
+        ports = self._midiout.get_ports()
+        if port_name not in ports:
+            raise IOError(f"MIDI 출력 포트를 찾을 수 없습니다: {port_name}")
+        self._midiout.open_port(ports.index(port_name))
+        self.name = port_name
+        self.closed = False
+        # 재사용 버퍼: 매 이벤트마다 리스트를 만들지 않고 바이트만 덮어씀
+        self._buffers = (None, [0], [0, 0], [0, 0, 0])
+
+    def send_event(self, status, data1=0, data2=0):
+        buffer = self._buffers[MESSAGE_LENGTHS[status]]
+        buffer[0] = status
+        if len(buffer) > 1:
+            buffer[1] = data1
+            if len(buffer) > 2:
+                buffer[2] = data2
+        self._midiout.send_message(buffer)
+
+    def send_bytes(self, data):
+        self._midiout.send_message(data)
+
+    def send(self, msg):
+        self._midiout.send_message(msg.bytes())
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._midiout.close_port()
+            del self._midiout
+
+
+class MidoOutput:
+    def __init__(self, port_name):
+        import mido
+        self._mido = mido
+        self._port = mido.open_output(port_name)
+        self.name = self._port.name
+
+    @property
+    def closed(self):
+        return self._port.closed
+
+    def send_event(self, status, data1=0, data2=0):
+        length = MESSAGE_LENGTHS[status]
+        message = self._mido.Message
+        if length == 3:
+            self._port.send(message.from_bytes([status, data1, data2]))
+        elif length == 2:
+            self._port.send(message.from_bytes([status, data1]))
+        else:
+            self._port.send(message.from_bytes([status]))
+
+    def send_bytes(self, data):
+        self._port.send(self._mido.Message.from_bytes(data))
+
+    def send(self, msg):
+        self._port.send(msg)
+
+    def close(self):
+        self._port.close()
+
+
+def open_output(port_name):
+    if rtmidi_available:
+        try:
+            return RawMidiOutput(port_name)
+        except Exception as e:
+            print(f"[ERR]: rtmidi 직접 출력 포트 열기 실패 ({e}). mido 포트로 대체합니다.")
+    return MidoOutput(port_name)
+
+
+def list_output_names():
+    # 출력 포트 이름 목록. rtmidi 로 직접 조회 (mido 를 import 하지 않음), 실패하면 mido
+    if rtmidi_available:
+        try:
+            import rtmidi
+            midiout = rtmidi.MidiOut()
+            try:
+                return midiout.get_ports()
+            finally:
+                del midiout
+        except Exception as e:
+            print(f"[ERR]: rtmidi 포트 목록 조회 실패 ({e}). mido 로 대체합니다.")
+    import mido
+    return mido.get_output_names()
@@ -0,0 +1,251 @@
+import collections
+import threading
+
+from midi_output import open_output
+from scheduler import clock
+
+# ======================================================================================
+# MIDI PLAYER | 다중 출력 포트 라우터
+# 채널 / 트랙별로 여러 출력 포트에 동시에 보냅니다. 포트마다 전송 스레드와 크기 제한 큐를 두므로
+# 느린 장치(USB-MIDI 31.25 kbaud 등)가 막혀도 다른 포트의 이벤트는 늦어지지 않습니다.
+# 출력 포트와 같은 메서드(send_event / send_bytes / send / close)를 가지므로 재생 엔진은 그대로 사용합니다.
+# ======================================================================================
+
+PORT_QUEUE_SIZE = 4096
+
+
+def _is_note_on(event):
+    return type(event) is tuple and (event[0] & 0xF0) == 0x90 and event[2] > 0
+
+
+class PortSender:
+    def __init__(self, name, output, router=None):
+        self.name = name
+        self.output = output
+        self.router = router  # 전송 지연 기록용 (MidiRouter.latency)
+        # [(예정 시각 또는 None, 이벤트)]. 재생 스레드는 절대 대기하지 않음 (가득 차면 버림)
+        self.events = collections.deque()
+        self.capacity = PORT_QUEUE_SIZE
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self._last_sent = 0
+        self._last_time = clock()
+        self._thread = threading.Thread(target=self._worker, name=f"midi-out-{name}", daemon=True)
+        self._thread.start()
+
+    def put(self, event, scheduled=None):
+        # 대기하지 않음. 큐가 가득 차면 note_on 은 버리고, 끄는 메시지 / CC / 페달은 큐에 있는 note_on 하나를 빼고 넣음
+        # (note_on 이 빠지는 것이 끄는 메시지가 빠져 노트가 남는 것보다 안전). 뺄 note_on 도 없으면 버림
+        with self._cond:
+            # 전송 스레드가 잠금 안에서 큐를 새 deque 로 바꾸므로 잠금을 잡은 뒤에 읽음
+            events = self.events
+            if len(events) >= self.capacity and not self._evict_for(event):
+                self.dropped += 1
+                return
+            events.append((scheduled, event))
+            depth = len(events)
+            if depth == 1:
+                self._cond.notify()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _evict_for(self, event):
+        # 잠금을 잡은 상태에서 호출. 같은 채널 / 노트의 note_on 을 먼저, 없으면 가장 최근 note_on 을 뺌
+        if _is_note_on(event):
+            return False
+        events = self.events
+        fallback = None
+        key = (event[0] & 0x0F, event[1]) if type(event) is tuple and (event[0] & 0xE0) == 0x80 else None
+        for index in range(len(events) - 1, -1, -1):
+            queued = events[index][1]
+            if _is_note_on(queued):
+                if key is None or (queued[0] & 0x0F, queued[1]) == key:
+                    del events[index]
+                    self.dropped += 1
+                    return True
+                if fallback is None:
+                    fallback = index
+        if fallback is None:
+            return False
+        del events[fallback]
+        self.dropped += 1
+        return True
+
+    def _worker(self):
+        output = self.output
+        cond = self._cond
+        while True:
+            # 쌓인 이벤트를 한 번에 가져와 잠금 없이 전송
+            with cond:
+                while not self.events and not self.closed:
+                    cond.wait()
+                if not self.events:
+                    break
+                batch = self.events
+                self.events = collections.deque()
+            router = self.router
+            latency = router.latency if router is not None else None
+            for scheduled, event in batch:
+                try:
+                    if type(event) is tuple:
+                        output.send_event(event[0], event[1], event[2])
+                    else:
+                        output.send_bytes(event)  # sysex 는 list 로 들어옴
+                    self.sent += 1
+                    if scheduled is not None and latency is not None:
+                        # 지연은 포트에 실제로 쓴 시각 기준 (큐에 넣은 시각이 아님)
+                        router.record_latency(scheduled, clock())
+                except Exception as e:
+                    self.errors += 1
+                    if self.errors == 1:
+                        print(f"[ERR]: 포트 '{self.name}' 전송 실패: {e}")
+
+    def stats(self):
+        # 지난 stats() 호출 이후의 초당 전송 수 포함
+        now = clock()
+        sent = self.sent
+        rate = (sent - self._last_sent) / (now - self._last_time) if now > self._last_time else 0.0
+        self._last_sent = sent
+        self._last_time = now
+        return {"name": self.name, "sent": sent, "rate": rate, "dropped": self.dropped,
+                "errors": self.errors, "depth": len(self.events), "max_depth": self.max_depth}
+
+    def close(self, timeout=1.0):
+        # 큐에 남은 메시지(노트 끄기 등)를 보낸 뒤 종료
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        try:
+            self.output.close()
+        except Exception as e:
+            print(f"[ERR]: 포트 '{self.name}' 닫기 실패: {e}")
+
+
+class MidiRouter:
+    def __init__(self):
+        self.senders = {}  # 포트 이름 -> PortSender (연 순서 유지)
+        self.channel_routes = {}  # 채널(0 ~ 15) -> [포트 이름]
+        self.track_routes = {}  # 트랙 번호 -> [포트 이름]. 지정된 트랙은 채널 라우팅보다 우선
+        self.closed = True
+        # 재생 스레드가 읽는 조회 테이블 (라우팅이 바뀌면 통째로 교체)
+        self._channel_targets = [()] * 16
+        self._track_targets = {}
+        self._all = ()
+        # 전송 지연: 재생 스레드가 배치마다 예정 시각(scheduled)을 정하고, 포트 전송 스레드가 실제로 쓴 시각을 기록
+        self.latency = None
+        self.scheduled = None
+        self._latency_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return " + ".join(self.senders) or "(없음)"
+
+    @property
+    def port_names(self):
+        return list(self.senders)
+
+    def add_port(self, port_name, output=None):
+        if port_name in self.senders:
+            return self.senders[port_name]
+        sender = PortSender(port_name, output if output is not None else open_output(port_name), self)
+        self.senders[port_name] = sender
+        self.closed = False
+        self._rebuild()
+        return sender
+
+    def remove_port(self, port_name):
+        sender = self.senders.pop(port_name, None)
+        if sender is None:
+            return False
+        self._rebuild()
+        sender.close()
+        self.closed = not self.senders
+        return True
+
+    def set_routes(self, channels=None, tracks=None):
+        # channels: {채널: [포트 이름]}, tracks: {트랙 번호: [포트 이름]}. 지정하지 않은 채널은 첫 번째 포트로
+        if channels is not None:
+            self.channel_routes = {int(channel): list(names) for channel, names in channels.items() if names}
+        if tracks is not None:
+            self.track_routes = {int(track): list(names) for track, names in tracks.items() if names}
+        self._rebuild()
+
+    def _targets(self, names):
+        return tuple(self.senders[name] for name in names if name in self.senders)
+
+    def _rebuild(self):
+        senders = list(self.senders.values())
+        default = tuple(senders[:1])
+        self._all = tuple(senders)
+        self._channel_targets = [self._targets(self.channel_routes.get(channel, ())) or default
+                                 for channel in range(16)]
+        track_targets = {}
+        for track, names in self.track_routes.items():
+            targets = self._targets(names)
+            if targets:
+                track_targets[track] = targets
+        self._track_targets = track_targets
+
+    def record_latency(self, scheduled, actual):
+        # 여러 포트 전송 스레드가 같은 기록기에 씀
+        with self._latency_lock:
+            latency = self.latency
+            if latency is not None:
+                latency.record(scheduled, actual)
+
+    @property
+    def routes_tracks(self):
+        return bool(self._track_targets)
+
+    # ------------------------------------------------------------------ 출력 포트 인터페이스
+
+    def send_event(self, status, data1=0, data2=0):
+        targets = self._channel_targets[status & 0x0F] if status < 0xF0 else self._all
+        event = (status, data1, data2)
+        scheduled = self.scheduled
+        for sender in targets:
+            sender.put(event, scheduled)
+
+    def send_track_event(self, track, status, data1=0, data2=0):
+        targets = self._track_targets.get(track)
+        if targets is None or status >= 0xF0:
+            self.send_event(status, data1, data2)
+            return
+        event = (status, data1, data2)
+        scheduled = self.scheduled
+        for sender in targets:
+            sender.put(event, scheduled)
+
+    def broadcast_event(self, status, data1=0, data2=0):
+        # 노트 / 페달 끄기: 트랙 라우팅으로 어느 포트에 갔는지 모르므로 모든 포트에 보냄
+        event = (status, data1, data2)
+        for sender in self._all:
+            sender.put(event)
+
+    def send_bytes(self, data):
+        status = data[0]
+        if status == 0xF0:
+            event = list(data)
+            for sender in self._all:
+                sender.put(event)
+        else:
+            self.send_event(status, data[1] if len(data) > 1 else 0, data[2] if len(data) > 2 else 0)
+
+    def send(self, msg):
+        self.send_bytes(msg.bytes())
+
+    def stats(self):
+        return [sender.stats() for sender in self.senders.values()]
+
+    def close(self):
+        senders = list(self.senders.values())
+        self.senders = {}
+        self._rebuild()
+        self.closed = True
+        for sender in senders:
+            sender.close()
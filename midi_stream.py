@@ -0,0 +1,281 @@
+import array
+import bisect
+import heapq
+import threading
+import traceback
+
+from midi_timeline import DEFAULT_TEMPO, ChannelState, LoadCancelled
+from smf import META_SET_TEMPO, SmfFile
+
+# ======================================================================================
+# MIDI PLAYER | 스트리밍 타임라인
+# 트랙을 필요할 때만 디코딩하고, 절대 tick 기준 힙으로 k-way 병합하면서 템포를 바로 적용합니다.
+# 전체 이벤트를 메모리에 올리지 않고, 탐색용 희소 체크포인트만 보관하므로
+# 파일 길이와 상관없이 메모리 사용량이 거의 일정합니다.
+# 체크포인트는 백그라운드에서 기록하고, 커서는 파일에서 직접 병합하므로 인덱스가 끝나기 전에도 바로 재생할 수 있습니다.
+# ======================================================================================
+
+# 이 이벤트 수 또는 이 시간(초)마다 탐색 체크포인트 저장
+STREAM_CHECKPOINT_EVENTS = 16384
+STREAM_CHECKPOINT_SECONDS = 5.0
+
+# 재생 스레드에 한 번에 넘기는 이벤트 블록 크기 (배열은 재사용)
+# 블록을 채우는 동안은 전송이 멈추므로 너무 크게 잡지 않음
+STREAM_BLOCK_SIZE = 1024
+
+# 이 크기 이상의 파일은 자동으로 스트리밍 모드로 로드
+STREAMING_THRESHOLD = 64 * 1024 * 1024
+
+
+class TrackMerger:
+    def __init__(self, smf, checkpoint=None):
+        self.ticks_per_beat = smf.ticks_per_beat
+        self.decoders = smf.decoders()
+        self.heap = []
+        self.tick = 0
+        self.seconds = 0.0
+        self.tempo = DEFAULT_TEMPO
+
+        if checkpoint is not None:
+            self.tick = checkpoint.tick
+            self.seconds = checkpoint.seconds
+            self.tempo = checkpoint.tempo
+            states = checkpoint.track_states
+            for index, decoder in enumerate(self.decoders):
+                flags = states[index * 3 + 2]
+                decoder.restore((states[index * 3], states[index * 3 + 1], flags & 0xFF, bool(flags >> 8)))
+
+        for decoder in self.decoders:
+            self._push(decoder)
+
+    def _push(self, decoder):
+        event = decoder.next_event()
+        if event is not None:
+            heapq.heappush(self.heap, (event[0], decoder.index, event))
+
+    def track_states(self):
+        # 힙에 대기 중인 각 트랙 이벤트 '직전' 상태. 복원하면 같은 힙이 다시 만들어짐
+        # 체크포인트마다 트랙 수만큼 저장되므로 튜플 대신 트랙당 (pos, tick, running status | finished << 8) 3칸 배열
+        states = array.array('Q')
+        for decoder in self.decoders:
+            pos, tick, running_status, finished = decoder.last_state
+            states.extend((pos, tick, running_status | (finished << 8)))
+        return states
+
+    def next(self):
+        # 다음 채널 / 시스템 이벤트 (초, status, data1, data2, 트랙). meta / sysex 는 템포만 반영하고 건너뜀
+        heap = self.heap
+        while heap:
+            tick, track, event = heapq.heappop(heap)
+            self._push(self.decoders[track])
+            if tick != self.tick:
+                self.seconds += (tick - self.tick) * self.tempo * 1e-6 / self.ticks_per_beat
+                self.tick = tick
+            status = event[1]
+            if status == 0xFF:
+                if event[2] == META_SET_TEMPO and len(event[4]) == 3:
+                    self.tempo = int.from_bytes(event[4], "big")
+                continue
+            if status == 0xF0:
+                continue
+            return (self.seconds, status, event[2], event[3], track)
+        return None
+
+
+class StreamCheckpoint:
+    __slots__ = ("seconds", "event_count", "channel_count", "tick", "tempo", "track_states", "channel_state")
+
+    def __init__(self, merger, event_count, channel_count, channel_state):
+        self.seconds = merger.seconds
+        self.event_count = event_count
+        self.channel_count = channel_count  # 체크포인트 앞의 채널 이벤트 수 (오류 계획 순번)
+        self.tick = merger.tick
+        self.tempo = merger.tempo
+        self.track_states = merger.track_states()
+        self.channel_state = channel_state.copy()
+
+
+class StreamingTimeline:
+    streaming = True
+
+    def __init__(self, file_path, checkpoint_events=STREAM_CHECKPOINT_EVENTS,
+                 checkpoint_seconds=STREAM_CHECKPOINT_SECONDS):
+        self.file_path = file_path
+        with SmfFile(file_path) as smf:
+            if smf.format == 2:
+                raise TypeError("type 2 (비동기) MIDI 파일은 재생할 수 없습니다.")
+            self.ticks_per_beat = smf.ticks_per_beat
+            self.track_count = smf.track_count
+            # 인덱스가 끝나기 전에는 추정 길이
+            self.duration = smf.estimate_duration()
+        self.checkpoint_events = checkpoint_events
+        self.checkpoint_seconds = checkpoint_seconds
+
+        self.checkpoints = []
+        self.checkpoint_times = array.array('d')
+        self.event_count = 0
+
+        # 인덱스 상태. MidiTimeline 의 백그라운드 디코딩과 같은 속성 / 대기 방식
+        self.complete = False
+        self.error = None
+        self.progress = 0.0
+        self._cancelled = False
+        self._decoded = threading.Condition()
+
+    @classmethod
+    def open(cls, file_path, progress=None, cancel=None, background=True, **options):
+        # 헤더 / 길이 추정만 읽고 반환. 인덱스는 background 이면 별도 스레드에서 기록
+        timeline = cls(file_path, **options)
+        if background:
+            threading.Thread(target=timeline.build_index, args=(progress, cancel), daemon=True).start()
+        else:
+            timeline.build_index(progress, cancel)
+            if timeline.error is not None:
+                raise timeline.error
+        return timeline
+
+    def __len__(self):
+        return self.event_count
+
+    def wait_decoded(self, count=None, seconds=None, timeout=None):
+        # 인덱스가 이벤트 수 / 시간(초)까지 진행되거나 끝날 때까지 대기
+        def ready():
+            if self.complete:
+                return True
+            if count is not None and self.event_count >= count:
+                return True
+            return seconds is not None and len(self.checkpoint_times) > 0 and self.checkpoint_times[-1] >= seconds
+        with self._decoded:
+            return self._decoded.wait_for(ready, timeout)
+
+    def _notify_decoded(self):
+        with self._decoded:
+            self._decoded.notify_all()
+
+    def build_index(self, progress=None, cancel=None):
+        # 한 번 끝까지 병합하면서 길이 / 이벤트 수 / 희소 체크포인트만 기록 (이벤트 자체는 버림)
+        # progress(0.0 ~ 1.0) 는 체크포인트마다 호출, cancel(Event) 이 설정되거나 close() 하면 중단 (error = LoadCancelled)
+        smf = merger = None
+        try:
+            smf = SmfFile(self.file_path)
+            merger = TrackMerger(smf)
+            total_bytes = sum(decoder.length for decoder in merger.decoders) or 1
+            state = ChannelState()
+            count = 0
+            channel_count = 0
+            last_count = -self.checkpoint_events
+            last_seconds = -self.checkpoint_seconds
+            while True:
+                if count - last_count >= self.checkpoint_events or merger.seconds - last_seconds >= self.checkpoint_seconds:
+                    # 커서가 읽는 순서: checkpoint_times 길이가 기준이므로 마지막에 추가
+                    self.checkpoints.append(StreamCheckpoint(merger, count, channel_count, state))
+                    self.checkpoint_times.append(merger.seconds)
+                    self.event_count = count
+                    last_count = count
+                    last_seconds = merger.seconds
+                    if self._cancelled or (cancel is not None and cancel.is_set()):
+                        raise LoadCancelled()
+                    self.progress = sum(decoder.pos for decoder in merger.decoders) / total_bytes
+                    if progress is not None:
+                        progress(self.progress)
+                    self._notify_decoded()
+                event = merger.next()
+                if event is None:
+                    break
+                if event[1] < 0xF0:
+                    state.apply(event[1], event[2], event[3])
+                    channel_count += 1
+                count += 1
+            self.event_count = count
+            self.duration = merger.seconds
+            self.progress = 1.0
+        except LoadCancelled as e:
+            self.error = e
+        except Exception as e:
+            print(f"[ERR]: 스트리밍 인덱스 오류: {e}")
+            traceback.print_exc()
+            self.error = e
+        finally:
+            merger = None
+            if smf is not None:
+                smf.close()
+            self.complete = True
+            self._notify_decoded()
+
+    def cursor(self, position):
+        return StreamCursor(self, position)
+
+    def close(self):
+        # 더 이상 사용하지 않는 타임라인: 진행 중인 인덱스 기록을 멈춤
+        if not self.complete:
+            self._cancelled = True
+
+
+class StreamCursor:
+    def __init__(self, timeline, position):
+        self.timeline = timeline
+        target = position - 0.01 if position > 0 else 0.0
+        if not timeline.complete:
+            # 아직 인덱스가 기록되지 않은 위치로 탐색하면 그 위치의 체크포인트가 생길 때까지 대기
+            timeline.wait_decoded(seconds=target)
+        if not timeline.checkpoints:
+            raise timeline.error or LoadCancelled()
+        count = len(timeline.checkpoint_times)
+        checkpoint = timeline.checkpoints[max(bisect.bisect_right(timeline.checkpoint_times, target, 0, count) - 1, 0)]
+
+        self.smf = SmfFile(timeline.file_path)
+        self.merger = TrackMerger(self.smf, checkpoint)
+        self.state = checkpoint.channel_state.copy()
+        self.index = checkpoint.event_count
+        self.ordinal = checkpoint.channel_count  # 시작 이벤트 앞의 채널 이벤트 수 (오류 계획 조회 기준)
+        self.position = checkpoint.seconds if self.index > 0 else 0.0
+
+        # 체크포인트부터 목표 위치 직전까지 상태만 반영하며 건너뜀 (최대 체크포인트 간격만큼)
+        event = self.merger.next()
+        while event is not None and event[0] < target:
+            if event[1] < 0xF0:
+                self.state.apply(event[1], event[2], event[3])
+                self.ordinal += 1
+            self.position = event[0]
+            self.index += 1
+            event = self.merger.next()
+        self._pending = event
+
+        self.times = array.array('d', [0.0]) * STREAM_BLOCK_SIZE
+        self.status = array.array('B', [0]) * STREAM_BLOCK_SIZE
+        self.data1 = array.array('B', [0]) * STREAM_BLOCK_SIZE
+        self.data2 = array.array('B', [0]) * STREAM_BLOCK_SIZE
+        self.track = array.array('H', [0]) * STREAM_BLOCK_SIZE
+        # 첫 블록은 미리 채워둠 (재생 시작 시각을 잡은 뒤 디코딩 때문에 늦지 않도록)
+        self._count = self._fill_block()
+
+    def chase_state(self):
+        return self.state if self.index > 0 else None
+
+    def _fill_block(self):
+        times, status, data1, data2, track = self.times, self.status, self.data1, self.data2, self.track
+        merger = self.merger
+        event = self._pending
+        count = 0
+        while count < STREAM_BLOCK_SIZE and event is not None:
+            times[count], status[count], data1[count], data2[count], track[count] = event
+            count += 1
+            event = merger.next()
+        self._pending = event
+        return count
+
+    def blocks(self):
+        try:
+            count = self._count
+            while count > 0:
+                yield self.times, self.status, self.data1, self.data2, 0, count
+                count = self._fill_block() if self.smf is not None else 0
+        finally:
+            self.close()
+
+    def close(self):
+        if self.smf is not None:
+            self.merger = None
+            self._pending = None
+            self.smf.close()
+            self.smf = None
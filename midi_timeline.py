@@ -0,0 +1,412 @@
+import array
+import bisect
+import heapq
+import threading
+import traceback
+
+from smf import DEFAULT_TEMPO, META_SET_TEMPO, SmfFile, encode_vlq
+
+# ======================================================================================
+# MIDI PLAYER | 타임라인 컴파일러
+# 파일을 로드 시점에 한 번만 파싱하여, 재생 / 탐색 / UI 가 공유하는 평평한 배열로 만듭니다.
+# open_midi_file 은 헤더와 길이 추정만 하고 바로 반환하며, 나머지 디코딩은 재생과 동시에 백그라운드에서 진행됩니다.
+# ======================================================================================
+
+# meta / sysex 이벤트는 status 배열에 아래 값으로 표시되고, 실제 내용은 extra 테이블에 보관
+STATUS_SYSEX = 0xF0
+STATUS_META = 0xFF
+
+# 탐색용 상태 체크포인트 간격 (이벤트 수). 탐색 시 최대 이 만큼만 재연산하므로 파일 길이와 무관
+CHECKPOINT_INTERVAL = 2048
+
+# 백그라운드 디코딩 중 재생 스레드를 깨우는 간격 (이벤트 수)
+DECODE_NOTIFY_INTERVAL = 4096
+
+_UNSET = 0xFF
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+class MidiTimeline:
+    streaming = False
+
+    def __init__(self, ticks_per_beat=480, track_count=0):
+        self.ticks_per_beat = ticks_per_beat
+        self.track_count = track_count
+
+        # 이벤트별 병렬 배열 (절대 시간 초 / status / data1 / data2 / 채널 / 트랙 번호)
+        self.times = array.array('d')
+        self.status = array.array('B')
+        self.data1 = array.array('B')
+        self.data2 = array.array('B')
+        self.channel = array.array('B')
+        self.track = array.array('H')
+
+        # meta / sysex 사이드 테이블: 이벤트 인덱스 -> (meta 타입, 데이터 bytes). sysex 는 타입 None
+        self.extra = {}
+
+        # [(절대 시간 초, tempo)]
+        self.tempo_map = [(0.0, DEFAULT_TEMPO)]
+        self.duration = 0.0
+        self.seek_index = None
+
+        # 백그라운드 디코딩 상태. complete 전에는 duration 이 추정값
+        self.file_path = None
+        self.complete = True
+        self.error = None
+        self.progress = 1.0  # 디코딩 진행률 (0.0 ~ 1.0, 파일 바이트 기준)
+        self._cancelled = False
+        self._decoded = threading.Condition()
+
+    def __len__(self):
+        return len(self.times)
+
+    def index_at(self, seconds):
+        return bisect.bisect_left(self.times, seconds)
+
+    def cursor(self, position):
+        return TimelineCursor(self, position)
+
+    def tempo_at(self, seconds):
+        position = bisect.bisect_right(self.tempo_map, (seconds, float('inf'))) - 1
+        return self.tempo_map[max(position, 0)][1]
+
+    def is_channel_event(self, index):
+        return self.status[index] < STATUS_SYSEX
+
+    def message_at(self, index):
+        import mido
+        extra = self.extra.get(index)
+        if extra is not None:
+            meta_type, data = extra
+            if meta_type is None:
+                return mido.Message.from_bytes(b"\xf0" + data)
+            return mido.MetaMessage.from_bytes(bytes((0xFF, meta_type)) + encode_vlq(len(data)) + data)
+        return mido.Message.from_bytes(self.event_bytes(index))
+
+    def wait_decoded(self, count=None, seconds=None, timeout=None):
+        # 백그라운드 디코딩이 이벤트 수 / 시간(초)까지 진행되거나 끝날 때까지 대기
+        def ready():
+            if self.complete:
+                return True
+            if count is not None and len(self.times) >= count:
+                return True
+            return seconds is not None and len(self.times) > 0 and self.times[-1] >= seconds
+        with self._decoded:
+            return self._decoded.wait_for(ready, timeout)
+
+    def close(self):
+        # 더 이상 사용하지 않는 타임라인: 진행 중인 백그라운드 디코딩을 멈춤
+        if not self.complete:
+            self._cancelled = True
+
+    def _notify_decoded(self):
+        with self._decoded:
+            self._decoded.notify_all()
+
+    def event_bytes(self, index):
+        status = self.status[index]
+        length = message_length(status)
+        if length == 3:
+            return [status, self.data1[index], self.data2[index]]
+        if length == 2:
+            return [status, self.data1[index]]
+        return [status]
+
+    def append(self, seconds, status, data1=0, data2=0, track=0):
+        # 길이는 times 기준이므로 times 를 마지막에 추가 (백그라운드 디코딩 중 재생 스레드가 읽어도 안전)
+        self.status.append(status)
+        self.data1.append(data1)
+        self.data2.append(data2)
+        self.channel.append(status & 0x0F if status < STATUS_SYSEX else 0)
+        self.track.append(track)
+        self.times.append(seconds)
+
+
+_SYSTEM_MESSAGE_LENGTHS = {0xF1: 2, 0xF2: 3, 0xF3: 2}
+
+
+def message_length(status):
+    if status < STATUS_SYSEX:
+        # program_change (0xC0), aftertouch (0xD0) 는 데이터 바이트가 1개
+        return 2 if (status & 0xF0) in (0xC0, 0xD0) else 3
+    return _SYSTEM_MESSAGE_LENGTHS.get(status, 1)
+
+
+class TimelineCursor:
+    # 재생 시작 위치. 재생 엔진은 cursor 의 blocks() 만 순회하므로 스트리밍 타임라인과 같은 방식으로 동작
+    # ordinal: 시작 이벤트 앞의 채널 이벤트 수 (오류 계획 조회 기준, 스트리밍 커서와 같은 값)
+    def __init__(self, timeline, position):
+        self.timeline = timeline
+        self.track = timeline.track  # 블록과 같은 인덱스의 트랙 번호 (트랙별 출력 라우팅용)
+        times = timeline.times
+        if position > 0 and not timeline.complete:
+            # 아직 디코딩되지 않은 위치로 탐색하면 그 위치까지 디코딩될 때까지 대기
+            timeline.wait_decoded(seconds=position)
+        count = len(timeline)
+        self.index = 0
+        self.position = 0.0
+        if position > 0 and count > 0:
+            self.index = bisect.bisect_left(times, position - 0.01)
+            self.position = times[self.index - 1] if 0 < self.index <= count else 0.0
+            if self.index >= count and timeline.complete and timeline.duration > 0:
+                self.position = timeline.duration - 0.001
+                self.index = max(count - 1, 0)
+        self.ordinal = channel_ordinal(timeline, self.index)
+
+    def chase_state(self):
+        if self.index > 0 and self.timeline.seek_index is not None:
+            return self.timeline.seek_index.state_at(self.index)
+        return None
+
+    def blocks(self):
+        timeline = self.timeline
+        start = self.index
+        while True:
+            complete = timeline.complete
+            end = len(timeline)
+            if start < end:
+                yield timeline.times, timeline.status, timeline.data1, timeline.data2, start, end
+                start = end
+            elif complete:
+                return
+            else:
+                # 재생이 디코딩을 따라잡음: 잠깐 기다렸다가 빈 블록을 넘겨 재생 스레드가 중지 요청을 확인하게 함
+                timeline.wait_decoded(count=start + 1, timeout=0.05)
+                yield timeline.times, timeline.status, timeline.data1, timeline.data2, start, start
+
+    def close(self):
+        pass
+
+
+def channel_ordinal(timeline, event_index):
+    # event_index 앞의 채널 이벤트(status < 0xF0) 수. 탐색 체크포인트의 순번에서 최대 체크포인트 간격만큼만 셈
+    if event_index <= 0:
+        return 0
+    seek_index = timeline.seek_index
+    start = ordinal = 0
+    if seek_index is not None and seek_index.ordinals:
+        checkpoint = min(event_index // seek_index.interval, len(seek_index.ordinals) - 1)
+        start = checkpoint * seek_index.interval
+        ordinal = seek_index.ordinals[checkpoint]
+    status_arr = timeline.status
+    for i in range(start, event_index):
+        if status_arr[i] < STATUS_SYSEX:
+            ordinal += 1
+    return ordinal
+
+
+def open_midi_file(file_path, background=True):
+    # 헤더 / 트랙 위치 / 길이 추정만 읽고 반환. 이벤트는 background 이면 별도 스레드에서 채워짐
+    smf = SmfFile(file_path)
+    try:
+        if smf.format == 2:
+            raise TypeError("type 2 (비동기) MIDI 파일은 재생할 수 없습니다.")
+        timeline = MidiTimeline(smf.ticks_per_beat, smf.track_count)
+        timeline.file_path = file_path
+        timeline.duration = smf.estimate_duration()
+        timeline.seek_index = SeekIndex(timeline)
+        timeline.complete = False
+        timeline.progress = 0.0
+    except Exception:
+        smf.close()
+        raise
+
+    if background:
+        threading.Thread(target=_decode_timeline, args=(timeline, smf), daemon=True).start()
+    else:
+        _decode_timeline(timeline, smf)
+        if timeline.error is not None:
+            raise timeline.error
+    return timeline
+
+
+def compile_midi_file(file_path):
+    return open_midi_file(file_path, background=False)
+
+
+def _decode_timeline(timeline, smf):
+    # 트랙들을 절대 tick 기준으로 병합 (같은 tick 은 트랙 순서). 탐색 체크포인트도 함께 기록
+    try:
+        decoders = smf.decoders()
+        heap = []
+        for decoder in decoders:
+            event = decoder.next_event()
+            if event is not None:
+                heap.append((event[0], decoder.index, event))
+        heapq.heapify(heap)
+
+        ticks_per_beat = timeline.ticks_per_beat
+        tempo = DEFAULT_TEMPO
+        last_tick = 0
+        current_time = 0.0
+        state = ChannelState()
+        checkpoints = timeline.seek_index.checkpoints
+        ordinals = timeline.seek_index.ordinals
+        interval = timeline.seek_index.interval
+        channel_count = 0
+        append = timeline.append
+        count = 0
+        total_bytes = sum(decoder.length for decoder in decoders) or 1
+
+        while heap:
+            tick, track, event = heapq.heappop(heap)
+            next_event = decoders[track].next_event()
+            if next_event is not None:
+                heapq.heappush(heap, (next_event[0], track, next_event))
+
+            if tick != last_tick:
+                current_time += (tick - last_tick) * tempo * 1e-6 / ticks_per_beat
+                last_tick = tick
+
+            if count % interval == 0:
+                checkpoints.append(state.copy())
+                ordinals.append(channel_count)
+
+            status = event[1]
+            if status == STATUS_META:
+                timeline.extra[count] = (event[2], bytes(event[4]))
+                append(current_time, STATUS_META, 0, 0, track)
+                if event[2] == META_SET_TEMPO and len(event[4]) == 3:
+                    tempo = int.from_bytes(event[4], "big")
+                    timeline.tempo_map.append((current_time, tempo))
+            elif status == STATUS_SYSEX:
+                timeline.extra[count] = (None, bytes(event[4]))
+                append(current_time, STATUS_SYSEX, 0, 0, track)
+            else:
+                if status < STATUS_SYSEX:
+                    state.apply(status, event[2], event[3])
+                    channel_count += 1
+                append(current_time, status, event[2], event[3], track)
+            count += 1
+
+            if count % DECODE_NOTIFY_INTERVAL == 0:
+                if timeline._cancelled:
+                    raise LoadCancelled()
+                timeline.progress = sum(decoder.pos for decoder in decoders) / total_bytes
+                timeline._notify_decoded()
+
+        timeline.duration = current_time
+        timeline.progress = 1.0
+    except LoadCancelled as e:
+        timeline.error = e
+    except Exception as e:
+        print(f"[ERR]: MIDI 파일 디코딩 오류: {e}")
+        traceback.print_exc()
+        timeline.error = e
+        if len(timeline):
+            timeline.duration = timeline.times[-1]
+    finally:
+        decoders = heap = event = next_event = None
+        smf.close()
+        timeline.complete = True
+        timeline._notify_decoded()
+
+
+class ChannelState:
+    # 채널별 program / controller / pitch bend / 눌려있는 노트 상태
+    def __init__(self):
+        self.programs = bytearray([_UNSET] * 16)
+        self.controllers = bytearray([_UNSET] * (16 * 128))
+        self.pitch_bend = bytearray([_UNSET] * 32)  # 채널당 (lsb, msb)
+        self.held_notes = bytearray(16 * 128)  # (채널 << 7) | 노트 -> velocity (0 = 안 눌림)
+
+    def copy(self):
+        state = ChannelState()
+        state.programs[:] = self.programs
+        state.controllers[:] = self.controllers
+        state.pitch_bend[:] = self.pitch_bend
+        state.held_notes[:] = self.held_notes
+        return state
+
+    def apply(self, status, data1, data2):
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind == 0x90 and data2 > 0:
+            self.held_notes[(channel << 7) | data1] = data2
+        elif kind == 0x80 or kind == 0x90:
+            self.held_notes[(channel << 7) | data1] = 0
+        elif kind == 0xB0:
+            if data1 < 120:
+                self.controllers[channel * 128 + data1] = data2
+            elif data1 == 121:
+                # Reset All Controllers
+                self.controllers[channel * 128:channel * 128 + 120] = bytes([_UNSET] * 120)
+                self.pitch_bend[channel * 2:channel * 2 + 2] = bytes([_UNSET, _UNSET])
+            elif data1 == 120 or data1 == 123:
+                # All Sound Off / All Notes Off
+                self.held_notes[channel << 7:(channel + 1) << 7] = bytes(128)
+        elif kind == 0xC0:
+            self.programs[channel] = data1
+        elif kind == 0xE0:
+            self.pitch_bend[channel * 2] = data1
+            self.pitch_bend[channel * 2 + 1] = data2
+
+    def chase_events(self, include_notes=True, skip_sustain=False, note_velocity=None):
+        # 상태를 복원하는 최소한의 메시지 목록. 순서: bank select → program → 나머지 CC → pitch bend → 노트
+        events = []
+        for channel in range(16):
+            base = channel * 128
+            for control in (0, 32):
+                value = self.controllers[base + control]
+                if value != _UNSET:
+                    events.append([0xB0 | channel, control, value])
+            if self.programs[channel] != _UNSET:
+                events.append([0xC0 | channel, self.programs[channel]])
+            for control in range(1, 120):
+                if control == 32 or (control == 64 and skip_sustain):
+                    continue
+                value = self.controllers[base + control]
+                if value != _UNSET:
+                    events.append([0xB0 | channel, control, value])
+            if self.pitch_bend[channel * 2 + 1] != _UNSET:
+                events.append([0xE0 | channel, self.pitch_bend[channel * 2], self.pitch_bend[channel * 2 + 1]])
+        if include_notes:
+            for key, velocity in enumerate(self.held_notes):
+                if velocity:
+                    events.append([0x90 | (key >> 7), key & 0x7F, velocity if note_velocity is None else note_velocity])
+        return events
+
+
+class SeekIndex:
+    def __init__(self, timeline, interval=CHECKPOINT_INTERVAL):
+        self.timeline = timeline
+        self.interval = interval
+        self.checkpoints = []  # checkpoints[k] = 이벤트 k * interval 직전의 상태
+        self.ordinals = array.array('I')  # ordinals[k] = 이벤트 k * interval 앞의 채널 이벤트 수
+
+    @classmethod
+    def build(cls, timeline, interval=CHECKPOINT_INTERVAL):
+        index = cls(timeline, interval)
+        state = ChannelState()
+        status_arr = timeline.status
+        data1_arr = timeline.data1
+        data2_arr = timeline.data2
+        channel_count = 0
+        for i in range(len(timeline)):
+            if i % interval == 0:
+                index.checkpoints.append(state.copy())
+                index.ordinals.append(channel_count)
+            status = status_arr[i]
+            if status < STATUS_SYSEX:
+                state.apply(status, data1_arr[i], data2_arr[i])
+                channel_count += 1
+        return index
+
+    def state_at(self, event_index):
+        # event_index 이벤트를 보내기 직전의 채널 상태
+        if not self.checkpoints:
+            return ChannelState()
+        event_index = max(0, min(event_index, len(self.timeline)))
+        checkpoint = min(event_index // self.interval, len(self.checkpoints) - 1)
+        state = self.checkpoints[checkpoint].copy()
+        status_arr = self.timeline.status
+        data1_arr = self.timeline.data1
+        data2_arr = self.timeline.data2
+        for i in range(checkpoint * self.interval, event_index):
+            status = status_arr[i]
+            if status < STATUS_SYSEX:
+                state.apply(status, data1_arr[i], data2_arr[i])
+        return state
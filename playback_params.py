@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+# ======================================================================================
+# MIDI PLAYER | 재생 파라미터 블록
+# GUI 스레드가 값을 게시(publish)하고, 재생 스레드는 Tk 호출 없이 일반 속성 읽기만 합니다.
+# ======================================================================================
+
+PlaybackSettings = namedtuple('PlaybackSettings', [
+    'version',
+    'speed',
+    'speed_ramp',
+    'speed_curve',
+    'velocity',
+    'error_enabled',
+    'error_percentage',
+    'error_pitch_range',
+    'error_seed',
+    'timing_variance',
+    'pedal_enabled',
+    'batch_window',
+    'lookahead',
+    'scheduler_mode',
+])
+
+
+class PlaybackParams:
+    def __init__(self, **values):
+        defaults = dict(
+            speed=1.0,
+            speed_ramp=0.0,  # 재생 중 속도를 바꿀 때 새 속도까지 선형으로 바뀌는 시간(초)
+            speed_curve=None,  # 템포 자동화 ((곡 위치(초), 속도 배율), ...) 또는 None
+            velocity=100,
+            error_enabled=False,
+            error_percentage=5.0,
+            error_pitch_range=3,
+            error_seed=1,  # 오류 계획 시드. 같은 시드 / 같은 설정이면 같은 오타 / 타이밍 오차
+            timing_variance=0.5,
+            pedal_enabled=True,
+            batch_window=0.001,  # 이 시간(초) 이내의 이벤트는 한 번에 전송
+            lookahead=0.2,  # 전송 시각보다 이 시간(실제 초)만큼 미리 디코딩 / 변환해 둠
+            scheduler_mode='balanced',
+        )
+        defaults.update(values)
+        self.current = PlaybackSettings(version=0, **defaults)
+        self.version = 0
+
+    def publish(self, **changes):
+        # 새 스냅샷을 통째로 교체하므로 읽는 쪽은 잠금 없이도 일부만 바뀐 값을 보지 않음
+        settings = self.current._replace(version=self.current.version + 1, **changes)
+        self.current = settings
+        self.version = settings.version
+        return settings
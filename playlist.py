@@ -0,0 +1,314 @@
+import os
+import random
+import threading
+
+# ======================================================================================
+# MIDI PLAYER | 재생목록
+# 라이브러리(./midi) 또는 선택한 파일로 재생목록을 만들고 반복 / 셔플을 지원합니다.
+# 지금 곡을 재생하는 동안 다음 곡을 백그라운드에서 읽고 컴파일해 엔진에 예약(queue_next) 해 두므로,
+# 곡이 끝나면 재생 스레드가 멈추지 않고 정해진 간격(0 이면 바로) 뒤에 다음 곡을 이어서 재생합니다.
+# 콜백은 재생 / 로드 스레드에서 호출되므로, GUI 쪽에서는 root.after 등으로 넘겨서 처리해야 합니다.
+# ======================================================================================
+
+REPEAT_OFF = "off"
+REPEAT_ALL = "all"
+REPEAT_ONE = "one"
+REPEAT_MODES = (REPEAT_OFF, REPEAT_ALL, REPEAT_ONE)
+
+
+class Playlist:
+    def __init__(self, engine, on_change=None, on_error=None, streaming=None):
+        self.engine = engine
+        self.on_change = on_change  # on_change(재생목록 인덱스, 파일 경로): 곡이 바뀜
+        self.on_error = on_error  # on_error(파일 경로, 예외): 곡을 읽지 못해 건너뜀
+        self.streaming = streaming
+        self.entries = []  # 파일 경로
+        self.order = []  # 재생 순서 (entries 인덱스). 셔플이면 섞인 순서
+        self.current = -1  # order 안의 위치 (-1 = 재생목록 재생 중 아님)
+        self.repeat = REPEAT_OFF
+        self.shuffle = False
+        self.gap = 0.0  # 곡 사이 쉬는 시간(초)
+
+        self._lock = threading.Lock()
+        self._generation = 0  # 재생목록 / 순서가 바뀌면 증가: 이전 미리 읽기 결과는 버림
+        self._planned = None  # (order, 위치): 엔진에 예약된 다음 곡
+        self._failures = 0  # 연속으로 읽지 못한 곡 수 (전부 실패하면 멈춤)
+        self._random = random.Random()
+
+        # 엔진 콜백 연결: 곡이 넘어가면 다음 곡 미리 읽기, 예약이 늦어 재생이 끝나버리면 직접 다음 곡 시작
+        self._engine_finished = engine.on_finished
+        engine.on_finished = self._on_engine_finished
+        engine.on_advance = self._on_engine_advance
+
+    # ------------------------------------------------------------------ 목록
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def active(self):
+        return self.current >= 0
+
+    @property
+    def current_path(self):
+        with self._lock:
+            return self.entries[self.order[self.current]] if 0 <= self.current < len(self.order) else None
+
+    def set_entries(self, paths):
+        with self._lock:
+            self.entries = list(paths)
+            self.current = -1
+            self._reorder(None)
+        self.engine.clear_next()
+
+    def add(self, paths):
+        with self._lock:
+            start = len(self.entries)
+            self.entries.extend(paths)
+            added = list(range(start, len(self.entries)))
+            if self.shuffle:
+                self._random.shuffle(added)
+            self.order.extend(added)
+            self._generation += 1
+        self._schedule_next()
+
+    def from_library(self, library):
+        self.set_entries([library.path_for(name) for name in library.names()])
+
+    def clear(self):
+        self.set_entries([])
+
+    def _reorder(self, keep):
+        # 재생 순서를 다시 만듦. keep(entries 인덱스) 는 맨 앞에 두고 현재 위치로 (셔플을 켜도 지금 곡은 그대로)
+        order = list(range(len(self.entries)))
+        if self.shuffle:
+            self._random.shuffle(order)
+        if keep is not None:
+            order.remove(keep)
+            order.insert(0, keep)
+            self.current = 0
+        self.order = order
+        self._generation += 1
+        self._planned = None
+
+    # ------------------------------------------------------------------ 반복 / 셔플 / 간격
+
+    def set_repeat(self, mode):
+        if mode not in REPEAT_MODES:
+            raise ValueError(f"알 수 없는 반복 모드: {mode}")
+        with self._lock:
+            self.repeat = mode
+            self._generation += 1
+        self._schedule_next()
+
+    def set_shuffle(self, enabled):
+        with self._lock:
+            self.shuffle = bool(enabled)
+            playing = self.order[self.current] if 0 <= self.current < len(self.order) else None
+            self._reorder(playing)
+        self._schedule_next()
+
+    def set_gap(self, seconds):
+        with self._lock:
+            self.gap = max(0.0, float(seconds))
+            self._generation += 1
+        self._schedule_next()
+
+    # ------------------------------------------------------------------ 재생
+
+    def play(self, index=None):
+        # index: entries 인덱스 (None 이면 재생 순서의 처음부터)
+        with self._lock:
+            if not self.entries:
+                return False
+            if index is None:
+                position = 0
+            else:
+                position = self.order.index(index)
+            self._generation += 1
+            generation = self._generation
+            path = self.entries[self.order[position]]
+        self.engine.clear_next()
+        # 워커 스레드에서 로드 (UI 스레드 멈춤 없음). 로드가 끝나면 재생을 시작하고 그다음 곡을 미리 읽음
+        self.engine.load_async(path, streaming=self.streaming,
+                               on_loaded=lambda timeline: self._start_loaded(generation, position, path),
+                               on_error=lambda e: self._skip_failed(generation, position, path, e))
+        return True
+
+    def next(self):
+        with self._lock:
+            planned = self._plan(skip=True)
+        if planned is None:
+            return False
+        order, position = planned
+        with self._lock:
+            self.order = order
+        return self.play(order[position])
+
+    def previous(self):
+        with self._lock:
+            if self.current < 0 or not self.order:
+                return False
+            position = self.current - 1 if self.current > 0 else (len(self.order) - 1 if self.repeat == REPEAT_ALL else 0)
+            index = self.order[position]
+        return self.play(index)
+
+    def stop(self):
+        self.deactivate()
+        self.engine.stop()
+
+    def deactivate(self):
+        # 재생목록 재생을 그만둠 (파일을 직접 열었을 때 등). 지금 재생 중인 곡은 그대로
+        with self._lock:
+            self.current = -1
+            self._generation += 1
+            self._planned = None
+        self.engine.clear_next()
+
+    def _start_loaded(self, generation, position, path):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.current = position
+            self._planned = None
+            self._failures = 0
+        try:
+            self.engine.play()
+        except Exception as e:
+            print(f"[ERR]: 재생목록 재생 시작 실패: {e}")
+            if self.on_error is not None:
+                self.on_error(path, e)
+            return
+        self._notify(position, path)
+        self._schedule_next()
+
+    def _skip_failed(self, generation, position, path, error):
+        # 읽을 수 없는 곡은 건너뛰고 다음 곡으로
+        print(f"[ERR]: 재생목록 곡 로드 실패, 건너뜀: {path}: {error}")
+        if self.on_error is not None:
+            self.on_error(path, error)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.current = position
+            self._failures += 1
+            planned = self._plan(skip=True)
+            if planned is None or self._failures >= len(self.entries):
+                self.current = -1
+                return
+            self.order = planned[0]
+            index = planned[0][planned[1]]
+        self.play(index)
+
+    def _notify(self, position, path):
+        if self.on_change is not None:
+            self.on_change(self.order[position], path)
+
+    # ------------------------------------------------------------------ 다음 곡 미리 읽기
+
+    def _plan(self, skip=False, order=None, current=None):
+        # 지금 곡 다음에 재생할 (order, 위치). 없으면 None. 잠금을 잡은 상태에서 호출
+        # skip: 직접 다음 곡으로 넘김 (한 곡 반복이어도 다음 곡, 끝이면 처음으로)
+        # order / current: 지금 곡 대신 이 순서의 이 위치 다음 (미리 읽기에 실패한 곡 건너뛰기)
+        if order is None:
+            order, current = self.order, self.current
+        if current < 0 or not order:
+            return None
+        if self.repeat == REPEAT_ONE and not skip:
+            return order, current
+        if current + 1 < len(order):
+            return order, current + 1
+        if self.repeat == REPEAT_OFF:
+            return None
+        if self.shuffle and len(order) > 1:
+            # 한 바퀴 돌면 다시 섞음. 같은 곡이 연달아 나오지 않게
+            order = list(order)
+            last = order[-1]
+            self._random.shuffle(order)
+            if order[0] == last:
+                order[0], order[-1] = order[-1], order[0]
+        return order, 0
+
+    def _schedule_next(self):
+        # 다음 곡을 워커 스레드에서 읽고 (컴파일까지 끝낸 뒤) 엔진에 예약
+        with self._lock:
+            planned = self._plan()
+            self._planned = None
+            generation = self._generation
+            gap = self.gap
+        if planned is None:
+            self.engine.clear_next()
+            return
+        order, position = planned
+        path = self.entries[order[position]]
+        threading.Thread(target=self._preload, args=(generation, order, position, path, gap), daemon=True).start()
+
+    def _preload(self, generation, order, position, path, gap):
+        try:
+            timeline = self.engine.open_timeline(path, self.streaming)
+            if not timeline.streaming:
+                timeline.wait_decoded()  # 곡이 바뀌는 순간 디코딩을 기다리지 않도록 끝까지 컴파일
+                if timeline.error is not None:
+                    # 디코딩 중 실패한 곡은 예약하지 않음 (로드 실패와 같이 건너뜀)
+                    timeline.close()
+                    raise timeline.error
+        except Exception as e:
+            self._skip_preload(generation, order, position, path, gap, e)
+            return
+        with self._lock:
+            current = generation == self._generation
+            if current:
+                self._planned = (order, position)
+                self.engine.queue_next(timeline, path, gap)
+        if not current:
+            timeline.close()
+            return
+        print(f"다음 곡 준비됨: {os.path.basename(path)}")
+
+    def _skip_preload(self, generation, order, position, path, gap, error):
+        # 미리 읽을 수 없는 곡은 건너뛰고 그다음 곡을 미리 읽음 (지금 곡 재생은 그대로, _skip_failed 와 같은 횟수 제한)
+        print(f"[ERR]: 다음 곡 미리 읽기 실패, 건너뜀: {path}: {error}")
+        if self.on_error is not None:
+            self.on_error(path, error)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._failures += 1
+            planned = self._plan(skip=True, order=order, current=position)
+            if self._failures >= len(self.entries):
+                planned = None
+        if planned is None:
+            self.engine.clear_next()
+            return
+        order, position = planned
+        path = self.entries[order[position]]
+        threading.Thread(target=self._preload, args=(generation, order, position, path, gap), daemon=True).start()
+
+    # ------------------------------------------------------------------ 엔진 콜백 (재생 스레드)
+
+    def _on_engine_advance(self, file_path):
+        with self._lock:
+            planned = self._planned
+            self._planned = None
+            if planned is None:
+                return
+            self.order, self.current = planned
+            self._generation += 1
+            self._failures = 0
+            position = self.current
+        self._notify(position, file_path)
+        self._schedule_next()
+
+    def _on_engine_finished(self):
+        # 다음 곡 예약이 늦었으면(미리 읽기가 끝나기 전에 곡이 끝남) 여기서 직접 다음 곡 시작
+        with self._lock:
+            planned = self._plan() if self.current >= 0 else None
+            if planned is None:
+                self.current = -1
+            else:
+                self.order = planned[0]
+        if planned is not None:
+            self.play(planned[0][planned[1]])
+            return
+        if self._engine_finished is not None:
+            self._engine_finished()
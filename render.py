@@ -0,0 +1,123 @@
+import os
+import struct
+import sys
+from collections import namedtuple
+
+from error_plan import ErrorPlan
+from smf import META_END_OF_TRACK, META_SET_TEMPO, encode_vlq
+from speed_map import SpeedCurve, TimeBase
+from transform import EventBatches, EventTransform
+
+# ======================================================================================
+# MIDI PLAYER | 오프라인 렌더
+# 재생할 때 포트로 나가는 연주(속도 / 템포 자동화, velocity 덮어쓰기, 페달 필터, 오타, 타이밍 오차)를
+# 대기 없이 계산해서 새 MIDI 파일로 저장합니다. 실시간 재생과 같은 EventTransform / 배치 / 시간 기준을 사용하므로
+# 같은 시드 / 설정이면 재생했을 때 보낸 것과 같은 메시지가 같은 시각에 기록됩니다.
+# 시각은 실제 재생 시각(초) 그대로 기록합니다 (고정 템포 120 BPM, 원래 템포 맵은 쓰지 않음).
+# ======================================================================================
+
+# 실제 시각 -> tick: 120 BPM 에서 1 tick = 1 / 7680 초 (타이밍 오차가 반올림으로 뭉개지지 않을 정도)
+RENDER_TICKS_PER_BEAT = 3840
+RENDER_TEMPO = 500000
+
+RenderResult = namedtuple('RenderResult', ['data', 'events', 'typos', 'duration'])
+
+
+def render_timeline(timeline, settings, plan=None, ticks_per_beat=RENDER_TICKS_PER_BEAT):
+    # settings: PlaybackSettings. 반환: RenderResult (data = SMF format 1 바이트, duration = 실제 재생 길이(초))
+    # 원래 트랙 번호별로 트랙을 나눠 기록 (맨 앞은 템포만 있는 conductor 트랙)
+    if settings.error_enabled and plan is None:
+        plan = ErrorPlan.from_settings(settings)
+    ticks_per_second = ticks_per_beat * 1e6 / RENDER_TEMPO
+    timebase = TimeBase(0.0, 0.0, settings.speed,
+                        SpeedCurve(settings.speed_curve) if settings.speed_curve else None)
+
+    slots = {}  # 원래 트랙 번호 -> [MTrk 본문, 마지막으로 기록한 tick]
+    last_tick = 0
+    count = 0
+
+    if not settings.pedal_enabled:
+        # 재생 시작 때처럼 모든 채널 sustain 해제
+        slots[0] = [bytearray(b"".join(bytes((0, 0xB0 | ch, 64, 0)) for ch in range(16))), 0]
+        count += 16
+
+    cursor = timeline.cursor(0.0)
+    try:
+        transform = EventTransform(settings, plan, cursor.ordinal)
+        events = []
+        # PlaybackEngine._produce 와 같은 배치 / 변환. 대기 대신 배치 시각을 바로 tick 으로 바꿔 기록
+        for batch in EventBatches(cursor, settings.batch_window):
+            if batch is None:
+                continue
+            batch_time, gap, status_arr, data1_arr, data2_arr, track_arr, batch_start, batch_end = batch
+            jitter = transform.jitter(gap)
+            del events[:]
+            transform.apply(status_arr, data1_arr, data2_arr, track_arr, batch_start, batch_end, events)
+            if not events:
+                continue
+
+            real_time = timebase.advance(batch_time)
+            if jitter:
+                real_time += jitter / timebase.speed_at(batch_time)
+            # 재생 스레드는 배치를 순서대로 보내므로 타이밍 오차로 앞 배치보다 앞설 수 없음
+            tick = int(real_time * ticks_per_second + 0.5)
+            if tick < last_tick:
+                tick = last_tick
+            last_tick = tick
+
+            for status, data1, data2, track in events:
+                slot = slots.get(track)
+                if slot is None:
+                    slot = slots[track] = [bytearray(), 0]
+                chunk = slot[0]
+                delta = tick - slot[1]
+                slot[1] = tick
+                # delta(VLQ) + 메시지를 extend 한 번에. 1 / 2 바이트 delta 는 encode_vlq 호출 없이
+                if delta < 0x80:
+                    if (status & 0xE0) == 0xC0:
+                        chunk.extend((delta, status, data1))
+                    else:
+                        chunk.extend((delta, status, data1, data2))
+                elif delta < 0x4000:
+                    if (status & 0xE0) == 0xC0:
+                        chunk.extend((0x80 | (delta >> 7), delta & 0x7F, status, data1))
+                    else:
+                        chunk.extend((0x80 | (delta >> 7), delta & 0x7F, status, data1, data2))
+                else:
+                    chunk += encode_vlq(delta)
+                    if (status & 0xE0) == 0xC0:
+                        chunk.extend((status, data1))
+                    else:
+                        chunk.extend((status, data1, data2))
+            count += len(events)
+    finally:
+        cursor.close()
+
+    # 곡 끝(마지막 이벤트 뒤 남은 시간 포함)까지를 파일 길이로. 스트리밍 인덱스가 끝나기 전의 duration 은 추정값
+    timeline.wait_decoded()
+    duration = max(timebase.advance(timeline.duration), last_tick / ticks_per_second)
+    end_tick = max(int(duration * ticks_per_second + 0.5), last_tick)
+
+    conductor = bytearray(b"\x00\xff" + bytes((META_SET_TEMPO, 3)) + RENDER_TEMPO.to_bytes(3, "big"))
+    tracks = [(conductor, 0)] + [tuple(slots[track]) for track in sorted(slots)]
+    parts = [b"MThd", struct.pack(">IHHH", 6, 1, len(tracks), ticks_per_beat)]
+    for chunk, chunk_tick in tracks:
+        chunk += encode_vlq(end_tick - chunk_tick) + bytes((0xFF, META_END_OF_TRACK, 0))
+        parts.append(b"MTrk" + struct.pack(">I", len(chunk)))
+        parts.append(chunk)
+    return RenderResult(b"".join(parts), count, transform.typo_count, duration)
+
+
+def write_render(result, output):
+    # output: 파일 경로, "-" 이면 표준 출력
+    if output == "-":
+        sys.stdout.buffer.write(result.data)
+        sys.stdout.buffer.flush()
+        return
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    # 중간에 실패해도 이전 결과 파일이 깨지지 않도록 임시 파일에 쓰고 교체
+    temp_path = output + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(result.data)
+    os.replace(temp_path, output)
@@ -0,0 +1,64 @@
+import time
+
+# ======================================================================================
+# MIDI PLAYER | 고정밀 스케줄러
+# 단조 시계(perf_counter) 기준으로 마감 직전까지는 잠들고, 남은 구간은 spin / yield 로 맞춥니다.
+# 마감 직전 여유(margin)는 실제로 측정한 sleep 초과 시간으로 스스로 보정합니다.
+# ======================================================================================
+
+SCHEDULER_MODES = {
+    # precise: 마지막 구간을 busy spin (CPU 사용 많음, 가장 정확)
+    'precise': dict(min_margin=0.0005, max_margin=0.005, margin_factor=2.0, final='spin'),
+    # balanced: 마지막 구간을 sleep(0) 으로 양보하며 대기
+    'balanced': dict(min_margin=0.0002, max_margin=0.003, margin_factor=1.5, final='yield'),
+    # eco: spin 없이 평균 초과 시간만큼 일찍 깨어나도록만 보정
+    'eco': dict(min_margin=0.0, max_margin=0.002, margin_factor=1.0, final=None),
+}
+DEFAULT_SCHEDULER_MODE = 'balanced'
+
+clock = time.perf_counter
+
+
+class HybridScheduler:
+    def __init__(self, mode=DEFAULT_SCHEDULER_MODE):
+        self.mode = None
+        self.overshoot = 0.001  # sleep 초과 시간 이동 평균 (초)
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        if mode not in SCHEDULER_MODES:
+            print(f"[ERR]: 알 수 없는 스케줄러 모드 '{mode}'. '{DEFAULT_SCHEDULER_MODE}' 모드를 사용합니다.")
+            mode = DEFAULT_SCHEDULER_MODE
+        config = SCHEDULER_MODES[mode]
+        self.mode = mode
+        self.min_margin = config['min_margin']
+        self.max_margin = config['max_margin']
+        self.margin_factor = config['margin_factor']
+        self.final = config['final']
+        self._update_margin()
+
+    def _update_margin(self):
+        self.margin = min(max(self.overshoot * self.margin_factor, self.min_margin), self.max_margin)
+
+    def wait_until(self, deadline, interrupt=None):
+        # deadline 은 clock() 기준 초. interrupt(threading.Event) 가 설정되면 즉시 False 반환
+        remaining = deadline - clock()
+        if remaining > self.margin:
+            requested = remaining - self.margin
+            slept_from = clock()
+            if interrupt is not None:
+                if interrupt.wait(requested):
+                    return False
+            else:
+                time.sleep(requested)
+            overshoot = clock() - slept_from - requested
+            self.overshoot += (max(overshoot, 0.0) - self.overshoot) * 0.1
+            self._update_margin()
+
+        if self.final == 'spin':
+            while clock() < deadline:
+                pass
+        elif self.final == 'yield':
+            while clock() < deadline:
+                time.sleep(0)
+        return True
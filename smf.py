@@ -0,0 +1,233 @@
+import mmap
+import os
+import struct
+
+# ======================================================================================
+# MIDI PLAYER | SMF (Standard MIDI File) 리더
+# 파일을 mmap 으로 매핑하고 헤더와 MTrk 청크 위치만 먼저 읽습니다.
+# 각 트랙은 매핑된 버퍼(memoryview)에서 중간 bytes 객체 없이 필요할 때 이벤트 단위로 디코딩합니다.
+# ======================================================================================
+
+META_END_OF_TRACK = 0x2F
+META_SET_TEMPO = 0x51
+
+DEFAULT_TEMPO = 500000
+
+# 길이 추정 시 트랙당 디코딩해 보는 바이트 수 / 최대 트랙 수
+ESTIMATE_SAMPLE_BYTES = 4096
+ESTIMATE_SAMPLE_TRACKS = 8
+# 템포 맵을 읽기 위해 첫 트랙(conductor)에서 디코딩하는 최대 바이트 수
+ESTIMATE_TEMPO_BYTES = 65536
+
+# 시스템 공통 메시지 데이터 바이트 수
+_SYSTEM_DATA_LENGTHS = {0xF1: 1, 0xF2: 2, 0xF3: 1}
+
+
+def encode_vlq(value):
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(data))
+
+
+class SmfFile:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self.file_size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        try:
+            if self.file_size > 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self._map)
+            else:
+                self.view = memoryview(b"")
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        view = self.view
+        if len(view) < 14 or view[:4] != b"MThd":
+            raise ValueError("MIDI 파일 헤더(MThd)가 없습니다.")
+        header_length = struct.unpack_from(">I", view, 4)[0]
+        self.format, _, division = struct.unpack_from(">HHH", view, 8)
+        if division & 0x8000:
+            raise ValueError("SMPTE 시간 단위 MIDI 파일은 지원하지 않습니다.")
+        self.ticks_per_beat = division
+
+        # 청크 헤더만 읽고 본문은 건너뜀
+        self.tracks = []  # [(청크 데이터 시작 오프셋, 길이)]
+        offset = 8 + header_length
+        while offset + 8 <= self.file_size:
+            length = struct.unpack_from(">I", view, offset + 4)[0]
+            start = offset + 8
+            length = min(length, self.file_size - start)
+            if view[offset:offset + 4] == b"MTrk":
+                self.tracks.append((start, length))
+            offset = start + length
+
+    @property
+    def track_count(self):
+        return len(self.tracks)
+
+    def decoder(self, index):
+        start, length = self.tracks[index]
+        return TrackDecoder(self.view[start:start + length], index, start)
+
+    def decoders(self):
+        return [self.decoder(index) for index in range(len(self.tracks))]
+
+    def estimate_duration(self):
+        # 전체를 디코딩하지 않고 길이(초) 추정: 큰 트랙 몇 개의 앞부분만 디코딩해서
+        # 바이트당 tick 비율로 트랙 끝 tick 을 외삽하고, 첫 트랙의 템포 맵으로 초로 변환
+        if not self.tracks:
+            return 0.0
+        tempos = []
+        decoder = self.decoder(0)
+        while decoder.pos < ESTIMATE_TEMPO_BYTES:
+            event = decoder.next_event()
+            if event is None:
+                break
+            if event[1] == 0xFF and event[2] == META_SET_TEMPO and len(event[4]) == 3:
+                tempos.append((event[0], int.from_bytes(event[4], "big")))
+
+        end_tick = 0
+        largest = sorted(range(len(self.tracks)), key=lambda index: self.tracks[index][1], reverse=True)
+        for index in largest[:ESTIMATE_SAMPLE_TRACKS]:
+            decoder = self.decoder(index)
+            while decoder.pos < ESTIMATE_SAMPLE_BYTES and decoder.next_event() is not None:
+                pass
+            if decoder.finished or decoder.pos == 0:
+                end_tick = max(end_tick, decoder.tick)
+            else:
+                end_tick = max(end_tick, int(decoder.tick * decoder.length / decoder.pos))
+        return ticks_to_seconds(end_tick, sorted(tempos), self.ticks_per_beat)
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self.view.release()
+                self._map.close()
+            except BufferError:
+                pass  # 디코더가 아직 버퍼를 참조 중이면 참조가 사라질 때 해제됨
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ticks_to_seconds(tick, tempos, ticks_per_beat):
+    # tempos: tick 순 [(tick, tempo)]
+    seconds = 0.0
+    last_tick = 0
+    tempo = DEFAULT_TEMPO
+    for tempo_tick, new_tempo in tempos:
+        if tempo_tick >= tick:
+            break
+        seconds += (tempo_tick - last_tick) * tempo * 1e-6 / ticks_per_beat
+        last_tick = tempo_tick
+        tempo = new_tempo
+    return seconds + (tick - last_tick) * tempo * 1e-6 / ticks_per_beat
+
+
+class TrackDecoder:
+    # 한 트랙의 delta / running status 를 매핑된 버퍼에서 직접 디코딩 (pos 는 트랙 시작 기준)
+    def __init__(self, view, index, offset=0):
+        self.view = view
+        self.index = index
+        self.offset = offset
+        self.length = len(view)
+        self.pos = 0
+        self.tick = 0
+        self.running_status = 0
+        self.finished = self.length == 0
+        # 마지막으로 디코딩한 이벤트 직전의 상태 (탐색 체크포인트용)
+        self.last_state = self.state()
+
+    def state(self):
+        return (self.pos, self.tick, self.running_status, self.finished)
+
+    def restore(self, state):
+        self.pos, self.tick, self.running_status, self.finished = state
+        self.last_state = state
+
+    def next_event(self):
+        # (tick, status, data1, data2, payload) 또는 None. meta 는 status 0xFF / data1 = meta 타입
+        if self.finished:
+            return None
+        self.last_state = (self.pos, self.tick, self.running_status, False)
+        buf = self.view
+        i = self.pos
+        try:
+            delta = 0
+            while True:
+                byte = buf[i]
+                i += 1
+                delta = (delta << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            tick = self.tick + delta
+
+            status = buf[i]
+            if status < 0x80:
+                status = self.running_status
+                if status == 0:
+                    raise ValueError("running status 없이 데이터 바이트가 나왔습니다.")
+            else:
+                i += 1
+
+            if status < 0xF0:
+                self.running_status = status
+                data1 = buf[i] & 0x7F
+                if (status & 0xE0) == 0xC0:
+                    data2 = 0
+                    i += 1
+                else:
+                    data2 = buf[i + 1] & 0x7F
+                    i += 2
+                self.pos = i
+                self.tick = tick
+                return (tick, status, data1, data2, None)
+
+            if status == 0xFF or status == 0xF0 or status == 0xF7:
+                meta_type = 0
+                if status == 0xFF:
+                    meta_type = buf[i]
+                    i += 1
+                length = 0
+                while True:
+                    byte = buf[i]
+                    i += 1
+                    length = (length << 7) | (byte & 0x7F)
+                    if byte < 0x80:
+                        break
+                if i + length > self.length:
+                    raise IndexError("meta / sysex 길이가 트랙 끝을 넘습니다.")
+                payload = buf[i:i + length]
+                self.pos = i + length
+                self.tick = tick
+                if status == 0xFF:
+                    if meta_type == META_END_OF_TRACK:
+                        self.finished = True
+                    return (tick, 0xFF, meta_type, 0, payload)
+                return (tick, 0xF0, 0, 0, payload)
+
+            data_length = _SYSTEM_DATA_LENGTHS.get(status, 0)
+            data1 = buf[i] & 0x7F if data_length > 0 else 0
+            data2 = buf[i + 1] & 0x7F if data_length > 1 else 0
+            self.pos = i + data_length
+            self.tick = tick
+            return (tick, status, data1, data2, None)
+
+        except (IndexError, ValueError):
+            # 잘린 / 손상된 트랙은 여기까지만 재생
+            self.finished = True
+            return None
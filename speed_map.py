@@ -0,0 +1,136 @@
+import bisect
+import math
+
+# ======================================================================================
+# MIDI PLAYER | 재생 속도 / 시간 기준
+# 곡 위치(초)를 실제 시각(clock)으로 바꿉니다. 속도가 바뀌면 바뀐 순간을 새 기준점으로 잡으므로(rebase)
+# 이미 지나간 구간의 시간은 다시 계산되지 않고, 앞으로 나올 이벤트의 간격만 바뀝니다.
+# 속도 변경 램프와 템포 자동화 곡선(곡 위치 -> 속도 배율)도 여기서 함께 적분합니다.
+# ======================================================================================
+
+MIN_SPEED = 0.01
+
+# 램프 / 자동화 구간은 이 길이(곡 위치 초) 이하의 조각으로 나눠 적분
+_INTEGRATE_STEP = 0.25
+
+
+class SpeedCurve:
+    # 템포 자동화: [(곡 위치(초), 속도 배율)]. 점 사이는 선형 보간, 첫 점 이전 / 마지막 점 이후는 그 값 유지
+    def __init__(self, points):
+        points = sorted((float(position), max(float(factor), MIN_SPEED)) for position, factor in points)
+        if not points:
+            raise ValueError("템포 자동화 곡선에 점이 없습니다.")
+        self.points = tuple(points)
+        self.times = [position for position, _ in points]
+        self.factors = [factor for _, factor in points]
+
+    @classmethod
+    def parse(cls, text):
+        # "위치:배율,위치:배율,..." 형식 (명령줄용). 예: "0:0.8,60:1.2"
+        points = []
+        for item in text.split(","):
+            position, _, factor = item.partition(":")
+            if not factor:
+                raise ValueError(f"템포 자동화 점 형식이 잘못되었습니다: '{item}' (위치:배율)")
+            points.append((float(position), float(factor)))
+        return cls(points)
+
+    def factor_at(self, position):
+        times = self.times
+        i = bisect.bisect_right(times, position)
+        if i == 0:
+            return self.factors[0]
+        if i == len(times):
+            return self.factors[-1]
+        t0, t1 = times[i - 1], times[i]
+        f0, f1 = self.factors[i - 1], self.factors[i]
+        return f0 + (f1 - f0) * (position - t0) / (t1 - t0)
+
+    def breakpoints(self, start, end):
+        times = self.times
+        return times[bisect.bisect_right(times, start):bisect.bisect_left(times, end)]
+
+
+class TimeBase:
+    def __init__(self, position, now, speed, curve=None):
+        # 기준점: 곡 위치 midi 가 실제 시각 real 에 재생됨
+        self.midi = position
+        self.real = now
+        self.speed = max(speed, MIN_SPEED)  # 기본 속도 (램프 중이면 램프의 목표 속도)
+        self.ramp = None  # (시작 위치, 끝 위치, 시작 속도, 끝 속도)
+        self.curve = curve
+
+    def base_speed_at(self, position):
+        ramp = self.ramp
+        if ramp is not None and position < ramp[1]:
+            start, end, from_speed, to_speed = ramp
+            return from_speed + (to_speed - from_speed) * max(position - start, 0.0) / (end - start)
+        return self.speed
+
+    def speed_at(self, position):
+        speed = self.base_speed_at(position)
+        if self.curve is not None:
+            speed *= self.curve.factor_at(position)
+        return speed
+
+    def advance(self, position):
+        # position 이 재생될 실제 시각. 기준점을 position 으로 옮김 (재생 루프에서 위치는 단조 증가)
+        if position > self.midi:
+            if self.ramp is None and self.curve is None:
+                self.real += (position - self.midi) / self.speed
+            else:
+                self.real += self._integrate(self.midi, position)
+                if self.ramp is not None and position >= self.ramp[1]:
+                    self.ramp = None
+            self.midi = position
+        return self.real
+
+    def shift(self, seconds):
+        # 일시정지 / 지연 흡수: 앞으로의 모든 이벤트를 seconds 만큼 뒤로 미룸
+        self.real += seconds
+
+    def rebase(self, now, limit=None):
+        # 지금 시각을 새 기준점으로. 아직 재생하지 않은 다음 이벤트(limit) 위치는 넘지 않음
+        position = self.midi + (now - self.real) * self.speed_at(self.midi)
+        if limit is not None and position > limit:
+            position = limit
+        if self.ramp is not None and position >= self.ramp[1]:
+            self.ramp = None
+        self.midi = position
+        self.real = now
+        return position
+
+    def set_speed(self, speed, now, ramp=0.0, limit=None):
+        # 지금 위치에서 새 속도로. ramp(초) 가 있으면 그 시간 동안 현재 속도에서 선형으로 바뀜
+        speed = max(speed, MIN_SPEED)
+        position = self.rebase(now, limit)
+        current = self.base_speed_at(position)
+        if ramp > 0 and current != speed:
+            # 램프는 곡 위치 기준 구간으로 저장: 실제 ramp 초 동안 평균 속도로 지나가는 길이
+            self.ramp = (position, position + ramp * (current + speed) / 2, current, speed)
+        else:
+            self.ramp = None
+        self.speed = speed
+
+    def set_curve(self, curve, now, limit=None):
+        self.rebase(now, limit)
+        self.curve = curve
+
+    def _integrate(self, start, end):
+        # ∫ 1 / speed d(위치): 램프 끝 / 자동화 점에서 나누고 각 조각은 Simpson 공식
+        cuts = [start, end]
+        if self.ramp is not None and start < self.ramp[1] < end:
+            cuts.append(self.ramp[1])
+        if self.curve is not None:
+            cuts.extend(self.curve.breakpoints(start, end))
+        cuts.sort()
+        speed_at = self.speed_at
+        total = 0.0
+        for x0, x1 in zip(cuts, cuts[1:]):
+            steps = max(1, math.ceil((x1 - x0) / _INTEGRATE_STEP))
+            width = (x1 - x0) / steps
+            for step in range(steps):
+                a = x0 + step * width
+                b = a + width
+                total += width * (1.0 / speed_at(a) + 4.0 / speed_at((a + b) * 0.5) + 1.0 / speed_at(b)) / 6.0
+        return total
@@ -0,0 +1,35 @@
+from held_notes import ALL_NOTES_OFF_MIN, HeldNotes, panic_events
+
+
+def test_tracks_sent_notes_and_pedal():
+    held = HeldNotes()
+    held.apply(0x90, 60, 100)
+    held.apply(0x91, 64, 90)
+    held.apply(0x90, 62, 80)
+    held.apply(0x90, 62, 0)  # velocity 0 note_on = note_off
+    held.apply(0xB1, 64, 127)
+    assert len(held) == 2
+    assert held.notes() == [(0, 60, 100), (1, 64, 90)]
+    assert held.release_events() == [(0x80, 60, 0), (0xB1, 64, 0), (0x81, 64, 0)]
+    # 재개 시에는 같은 값으로 다시 누름 (페달 먼저)
+    assert held.restore_events() == [(0xB1, 64, 127), (0x90, 60, 100), (0x91, 64, 90)]
+
+
+def test_many_notes_use_all_notes_off():
+    held = HeldNotes()
+    for note in range(ALL_NOTES_OFF_MIN):
+        held.apply(0x92, 40 + note, 70)
+    assert held.release_events() == [(0xB2, 123, 0)]
+    held.apply(0xB2, 123, 0)
+    assert len(held) == 0
+
+
+def test_clear_and_panic():
+    held = HeldNotes()
+    held.apply(0x90, 60, 100)
+    held.apply(0xB0, 64, 127)
+    held.clear()
+    assert len(held) == 0 and held.release_events() == []
+    events = panic_events()
+    assert len(events) == 48
+    assert {status & 0x0F for status, _, _ in events} == set(range(16))
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from lookahead import LookaheadBuffer
+
+
+def _batch(position, size=1):
+    return [position, 0.0, [(0x90, 60, 100, 0)] * size]
+
+
+def test_take_returns_batches_in_order():
+    buffer = LookaheadBuffer()
+    for position in (0.0, 0.1, 0.2):
+        assert buffer.put(_batch(position), window=10.0)
+    buffer.finish()
+    assert [batch[0] for batch in buffer.take()] == [0.0, 0.1, 0.2]
+    assert len(buffer.take()) == 0  # 끝났으면 빈 deque
+
+
+def test_put_waits_for_window_until_marked():
+    buffer = LookaheadBuffer()
+    assert buffer.put(_batch(0.0), window=0.5)
+    done = threading.Event()
+
+    def producer():
+        buffer.put(_batch(2.0), window=0.5)
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    assert not done.wait(0.1)  # 전송 위치(0.0) 보다 window 이상 앞서므로 대기
+    buffer.mark(1.6)
+    assert done.wait(2.0)
+
+
+def test_put_waits_for_capacity():
+    buffer = LookaheadBuffer(capacity=4)
+    assert buffer.put(_batch(0.0, 3), window=10.0)
+    done = threading.Event()
+    threading.Thread(target=lambda: (buffer.put(_batch(0.1, 3), window=10.0), done.set()), daemon=True).start()
+    assert not done.wait(0.1)
+    assert len(buffer.take()) == 1
+    assert done.wait(2.0)
+
+
+def test_close_wakes_both_sides():
+    buffer = LookaheadBuffer(capacity=1)
+    assert buffer.put(_batch(0.0), window=10.0)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(buffer.put(_batch(0.1), window=10.0)), daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    buffer.close()
+    thread.join(2.0)
+    assert results == [False]
+    assert len(buffer.take()) == 0
@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from midi_router import PortSender
+
+
+class SlowOutput:
+    # 장치 전송 대신 메시지를 기록. delay 초마다 한 번씩 느려져 큐가 차게 함
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.events = []
+
+    def send_event(self, status, data1=0, data2=0):
+        self.events.append((status, data1, data2))
+        if self.delay and len(self.events) % 256 == 0:
+            time.sleep(self.delay)
+
+    def send_bytes(self, data):
+        self.events.append(tuple(data))
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("delay", [0.0, 0.002], ids=["fast", "stalling"])
+def test_every_event_is_sent_or_dropped(delay):
+    # 스레드 전환을 자주 일으켜 put 과 전송 스레드의 큐 교체가 겹치게 함
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        _put_and_close(delay)
+    finally:
+        sys.setswitchinterval(previous)
+
+
+def _put_and_close(delay):
+    output = SlowOutput(delay)
+    sender = PortSender("test", output)
+    sender.capacity = 64
+    count = 200000
+    for index in range(count):
+        sender.put((0xB0, 7, index & 0x7F))
+    sender.close(timeout=30.0)
+    assert sender.sent == len(output.events)
+    assert sender.sent + sender.dropped == count
+
+
+def test_note_off_evicts_queued_note_on():
+    output = SlowOutput()
+    blocked = threading.Event()
+    release = threading.Event()
+    send_event = output.send_event
+
+    def blocking_send(status, data1=0, data2=0):
+        blocked.set()
+        release.wait(5.0)
+        send_event(status, data1, data2)
+
+    output.send_event = blocking_send
+    sender = PortSender("test", output)
+    sender.capacity = 4
+    sender.put((0x90, 60, 100))
+    assert blocked.wait(5.0)  # 전송 스레드가 첫 이벤트에서 멈춤
+    for note in (61, 62, 63, 64):
+        sender.put((0x90, note, 100))
+    sender.put((0x90, 65, 100))  # 가득 참: note_on 은 버림
+    sender.put((0x80, 62, 0))  # 끄는 메시지는 같은 노트의 note_on 을 빼고 들어감
+    release.set()
+    sender.close(timeout=5.0)
+
+    assert sender.sent + sender.dropped == 7
+    assert sender.dropped == 2
+    assert (0x80, 62, 0) in output.events
+    assert (0x90, 62, 100) not in output.events
+    assert (0x90, 65, 100) not in output.events
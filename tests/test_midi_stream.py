@@ -0,0 +1,68 @@
+import pytest
+
+from bench import generate_smf
+from midi_stream import StreamingTimeline
+from midi_timeline import STATUS_SYSEX, LoadCancelled, compile_midi_file
+
+
+@pytest.fixture
+def midi_path(tmp_path):
+    path = str(tmp_path / "generated.mid")
+    generate_smf(path, 12000, 12, tempo_every=40, cc_every=15, seed=9)
+    return path
+
+
+def _channel_events(timeline, start=0):
+    # 스트리밍 타임라인은 meta / sysex 를 보관하지 않으므로 그 외 이벤트만 비교
+    return [(timeline.times[i], timeline.status[i], timeline.data1[i], timeline.data2[i], timeline.track[i])
+            for i in range(start, len(timeline)) if timeline.status[i] < STATUS_SYSEX]
+
+
+def _cursor_events(cursor):
+    events = []
+    for times, status, data1, data2, start, end in cursor.blocks():
+        events.extend(zip(times[start:end], status[start:end], data1[start:end], data2[start:end],
+                          cursor.track[start:end]))
+    return events
+
+
+def test_merge_matches_compiled(midi_path):
+    compiled = compile_midi_file(midi_path)
+    stream = StreamingTimeline.open(midi_path, background=False)
+    assert _cursor_events(stream.cursor(0.0)) == _channel_events(compiled)
+    assert len(stream) == len(_channel_events(compiled))
+    assert stream.duration == pytest.approx(compiled.duration, abs=1e-9)
+
+
+def test_seek_from_checkpoints(midi_path):
+    # 작은 체크포인트 간격으로 여러 체크포인트를 거쳐 탐색해도 메모리 타임라인과 같은 상태 / 이벤트
+    compiled = compile_midi_file(midi_path)
+    stream = StreamingTimeline.open(midi_path, background=False, checkpoint_events=512, checkpoint_seconds=1.0)
+    assert len(stream.checkpoints) > 10
+    for position in (0.7, compiled.duration / 3, compiled.duration * 0.9):
+        expected = compiled.cursor(position)
+        cursor = stream.cursor(position)
+        assert cursor.position <= position
+        state, expected_state = cursor.chase_state(), expected.chase_state()
+        assert state.programs == expected_state.programs
+        assert state.controllers == expected_state.controllers
+        assert state.held_notes == expected_state.held_notes
+        assert _cursor_events(cursor) == _channel_events(compiled, expected.index)
+
+
+def test_cursor_before_index_completes(midi_path):
+    compiled = compile_midi_file(midi_path)
+    stream = StreamingTimeline.open(midi_path)
+    events = _cursor_events(stream.cursor(0.0))
+    assert events == _channel_events(compiled)
+    assert stream.wait_decoded(timeout=30.0)
+    assert stream.error is None
+    assert stream.duration == pytest.approx(compiled.duration, abs=1e-9)
+
+
+def test_close_stops_index(midi_path):
+    stream = StreamingTimeline.open(midi_path, checkpoint_events=64)
+    stream.close()
+    assert stream.wait_decoded(timeout=30.0)
+    # 이미 끝났으면 오류 없음, 아니면 중단
+    assert stream.error is None or isinstance(stream.error, LoadCancelled)
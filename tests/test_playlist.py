@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from bench import generate_smf
+from engine import PlaybackEngine
+from playlist import REPEAT_ALL, Playlist
+
+
+class RecordingPort:
+    name = "test"
+    closed = False
+
+    def __init__(self):
+        self.sent = []
+
+    def send_event(self, status, data1=0, data2=0):
+        self.sent.append((status, data1, data2))
+
+    def send_bytes(self, data):
+        self.sent.append(tuple(data))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = []
+    for index in range(4):
+        path = str(tmp_path / f"song{index}.mid")
+        generate_smf(path, 20, 1, seed=index + 1)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def engine():
+    finished = threading.Event()
+    engine = PlaybackEngine(on_finished=finished.set)
+    engine.finished = finished
+    engine.outport = RecordingPort()
+    engine.configure(speed=8.0)
+    yield engine
+    engine.stop()
+
+
+def _play(engine, playlist, timeout=30.0):
+    playlist.play()
+    assert engine.finished.wait(timeout)
+
+
+def test_plays_every_song_in_order(engine, paths):
+    changes = []
+    playlist = Playlist(engine, on_change=lambda index, path: changes.append(index))
+    playlist.set_entries(paths)
+    _play(engine, playlist)
+    assert changes == [0, 1, 2, 3]
+    assert not playlist.active
+
+
+def test_skips_song_that_fails_to_preload(engine, paths):
+    broken = paths[1]
+    open_timeline = engine.open_timeline
+
+    def failing_open(path, *args, **kwargs):
+        timeline = open_timeline(path, *args, **kwargs)
+        if path == broken:
+            timeline.wait_decoded()
+            timeline.error = ValueError("broken")
+        return timeline
+
+    engine.open_timeline = failing_open
+    changes, errors = [], []
+    playlist = Playlist(engine, on_change=lambda index, path: changes.append(index),
+                        on_error=lambda path, error: errors.append(path))
+    playlist.set_entries(paths)
+    _play(engine, playlist)
+    assert changes == [0, 2, 3]
+    assert errors == [broken]
+
+
+def test_unreadable_list_stops_instead_of_looping(engine, tmp_path):
+    # 반복 모드여도 모든 곡을 읽지 못하면 멈춤
+    missing = str(tmp_path / "missing.mid")
+    errors = []
+    playlist = Playlist(engine, on_error=lambda path, error: errors.append(path))
+    playlist.set_entries([missing])
+    playlist.set_repeat(REPEAT_ALL)
+    playlist.play()
+    for _ in range(100):
+        if errors and not playlist.active:
+            break
+        time.sleep(0.05)
+    assert errors == [missing]
+    assert not playlist.active
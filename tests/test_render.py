@@ -0,0 +1,80 @@
+import mido
+import pytest
+
+from bench import generate_smf
+from midi_timeline import STATUS_SYSEX, compile_midi_file
+from playback_params import PlaybackParams
+from render import RENDER_TEMPO, RENDER_TICKS_PER_BEAT, render_timeline, write_render
+
+
+@pytest.fixture
+def midi_path(tmp_path):
+    path = str(tmp_path / "generated.mid")
+    generate_smf(path, 3000, 4, tempo_every=100, cc_every=25, seed=6)
+    return path
+
+
+def _rendered_messages(path):
+    # (초, 메시지 bytes). 렌더 파일은 고정 템포이므로 mido 시각이 곧 실제 재생 시각
+    seconds = 0.0
+    messages = []
+    for msg in mido.MidiFile(path):
+        seconds += msg.time
+        if not msg.is_meta:
+            messages.append((seconds, bytes(msg.bin())))
+    return messages
+
+
+def test_plain_render_keeps_events_and_times(midi_path, tmp_path):
+    # 오류 / 속도 변경 없이 렌더하면 velocity 만 바뀌고 같은 메시지가 같은 시각(렌더 tick 단위)에 기록됨
+    timeline = compile_midi_file(midi_path)
+    result = render_timeline(timeline, PlaybackParams(velocity=90).current)
+    output = str(tmp_path / "out.mid")
+    write_render(result, output)
+
+    ticks_per_second = RENDER_TICKS_PER_BEAT * 1e6 / RENDER_TEMPO
+    expected = []
+    for i in range(len(timeline)):
+        if timeline.status[i] >= STATUS_SYSEX:
+            continue
+        message = timeline.event_bytes(i)
+        if (message[0] & 0xF0) == 0x90 and message[2] > 0:
+            message[2] = 90
+        expected.append((round(timeline.times[i] * ticks_per_second), bytes(message)))
+    rendered = [(round(seconds * ticks_per_second), message) for seconds, message in _rendered_messages(output)]
+
+    assert result.typos == 0
+    assert result.events == len(rendered)
+    # 같은 tick 의 메시지는 원래 트랙별로 나뉘어 기록되므로 순서가 아니라 (tick, 메시지) 목록으로 비교
+    assert sorted(rendered) == sorted(expected)
+    assert result.duration == pytest.approx(timeline.duration, abs=1e-3)
+
+
+def test_speed_scales_duration(midi_path):
+    timeline = compile_midi_file(midi_path)
+    normal = render_timeline(timeline, PlaybackParams().current)
+    double = render_timeline(timeline, PlaybackParams(speed=2.0).current)
+    assert double.duration == pytest.approx(normal.duration / 2, rel=1e-3)
+
+
+def test_pedal_off_filters_sustain(tmp_path):
+    path = str(tmp_path / "pedal.mid")
+    track = mido.MidiTrack([
+        mido.Message("control_change", control=64, value=127, time=0),
+        mido.Message("note_on", note=60, velocity=80, time=0),
+        mido.Message("note_off", note=60, velocity=0, time=240),
+        mido.Message("control_change", control=64, value=0, time=240),
+        mido.Message("control_change", control=7, value=100, time=0),
+    ])
+    mido.MidiFile(tracks=[track]).save(path)
+    timeline = compile_midi_file(path)
+
+    kept = render_timeline(timeline, PlaybackParams(pedal_enabled=True).current)
+    filtered = render_timeline(timeline, PlaybackParams(pedal_enabled=False, velocity=80).current)
+    write_render(filtered, str(tmp_path / "out.mid"))
+    messages = [message for _, message in _rendered_messages(str(tmp_path / "out.mid"))]
+
+    # 페달을 끄면 시작할 때 모든 채널 sustain 해제, 곡 안의 sustain 은 빠짐 (다른 CC 는 그대로)
+    assert messages[:16] == [bytes((0xB0 | channel, 64, 0)) for channel in range(16)]
+    assert messages[16:] == [bytes((0x90, 60, 80)), bytes((0x80, 60, 0)), bytes((0xB0, 7, 100))]
+    assert kept.events == 5
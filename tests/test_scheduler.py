@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from scheduler import DEFAULT_SCHEDULER_MODE, SCHEDULER_MODES, HybridScheduler, clock
+
+
+@pytest.mark.parametrize("mode", sorted(SCHEDULER_MODES))
+def test_never_returns_early(mode):
+    scheduler = HybridScheduler(mode)
+    for delay in (0.0, 0.001, 0.004, 0.02):
+        deadline = clock() + delay
+        assert scheduler.wait_until(deadline)
+        if scheduler.final is not None:
+            assert clock() >= deadline
+        assert clock() - deadline < 0.05
+
+
+def test_interrupt_returns_false():
+    scheduler = HybridScheduler()
+    interrupt = threading.Event()
+    threading.Timer(0.05, interrupt.set).start()
+    started = clock()
+    assert not scheduler.wait_until(clock() + 5.0, interrupt)
+    assert clock() - started < 1.0
+
+
+def test_unknown_mode_falls_back():
+    scheduler = HybridScheduler("bogus")
+    assert scheduler.mode == DEFAULT_SCHEDULER_MODE
+    scheduler.set_mode("eco")
+    assert scheduler.final is None
+    assert scheduler.min_margin <= scheduler.margin <= scheduler.max_margin
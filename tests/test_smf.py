@@ -0,0 +1,78 @@
+import mido
+import pytest
+
+from bench import generate_smf
+from midi_timeline import compile_midi_file, open_midi_file
+from smf import META_END_OF_TRACK
+
+
+@pytest.fixture(params=[(2000, 1, 0, 0), (5000, 8, 100, 20), (3000, 20, 7, 3)], ids=["single", "tempo_cc", "many_tracks"])
+def midi_path(request, tmp_path):
+    notes, tracks, tempo_every, cc_every = request.param
+    path = str(tmp_path / "generated.mid")
+    generate_smf(path, notes, tracks, tempo_every=tempo_every, cc_every=cc_every, seed=notes)
+    return path
+
+
+def _mido_events(path):
+    # mido 로 읽은 (초, 메시지 bytes). end_of_track 은 mido 가 트랙을 합칠 때 하나로 모으므로 비교에서 뺌
+    events = []
+    seconds = 0.0
+    for msg in mido.MidiFile(path):
+        seconds += msg.time
+        if msg.is_meta and msg.type == "end_of_track":
+            continue
+        events.append((seconds, bytes(msg.bin())))
+    return events
+
+
+def _timeline_events(timeline):
+    events = []
+    for index in range(len(timeline)):
+        if timeline.status[index] == 0xFF and timeline.extra[index][0] == META_END_OF_TRACK:
+            continue
+        events.append((timeline.times[index], bytes(timeline.message_at(index).bin())))
+    return events
+
+
+def test_decode_matches_mido(midi_path):
+    timeline = compile_midi_file(midi_path)
+    assert timeline.error is None
+    ours = _timeline_events(timeline)
+    expected = _mido_events(midi_path)
+    assert len(ours) == len(expected)
+    for (our_time, our_bytes), (mido_time, mido_bytes) in zip(ours, expected):
+        assert our_bytes == mido_bytes
+        assert our_time == pytest.approx(mido_time, abs=1e-6)
+    assert timeline.duration == pytest.approx(mido.MidiFile(midi_path).length, abs=1e-6)
+
+
+
+def test_background_decode_matches_compiled(midi_path):
+    compiled = compile_midi_file(midi_path)
+    timeline = open_midi_file(midi_path)
+    assert timeline.wait_decoded(timeout=30.0)
+    assert timeline.error is None
+    for name in ("times", "status", "data1", "data2", "track"):
+        assert list(getattr(timeline, name)) == list(getattr(compiled, name)), name
+    assert timeline.extra == compiled.extra
+    assert timeline.duration == compiled.duration
+
+
+def test_truncated_file_decodes_prefix(tmp_path):
+    # 잘린 트랙은 잘린 곳까지만 디코딩 (예외 없이)
+    path = str(tmp_path / "full.mid")
+    generate_smf(path, 3000, 1, seed=5)
+    with open(path, "rb") as f:
+        data = f.read()
+    truncated = str(tmp_path / "truncated.mid")
+    with open(truncated, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    full = compile_midi_file(path)
+    timeline = compile_midi_file(truncated)
+    assert 0 < len(timeline) < len(full)
+    count = len(timeline)
+    assert list(timeline.status) == list(full.status[:count])
+    assert list(timeline.data1) == list(full.data1[:count])
+    assert list(timeline.times) == list(full.times[:count])
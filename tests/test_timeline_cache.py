@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from bench import generate_smf
+from midi_timeline import compile_midi_file
+from timeline_cache import CACHE_SUFFIX, TimelineCache
+
+
+@pytest.fixture
+def midi_path(tmp_path):
+    path = str(tmp_path / "generated.mid")
+    generate_smf(path, 20000, 6, tempo_every=50, cc_every=10, seed=3)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TimelineCache(str(tmp_path / "cache"))
+
+
+def test_round_trip(midi_path, cache):
+    timeline = compile_midi_file(midi_path)
+    assert cache.load(midi_path) is None
+    assert cache.store(midi_path, timeline)
+
+    loaded = cache.load(midi_path)
+    assert loaded is not None
+    assert loaded.complete and loaded.error is None
+    assert loaded.ticks_per_beat == timeline.ticks_per_beat
+    assert loaded.track_count == timeline.track_count
+    assert loaded.duration == timeline.duration
+    assert loaded.tempo_map == timeline.tempo_map
+    assert loaded.extra == timeline.extra
+    for name in ("times", "status", "data1", "data2", "channel", "track"):
+        assert list(getattr(loaded, name)) == list(getattr(timeline, name)), name
+
+    seek_index = timeline.seek_index
+    assert loaded.seek_index.interval == seek_index.interval
+    for index in range(0, len(timeline), seek_index.interval // 2):
+        expected, actual = seek_index.state_at(index), loaded.seek_index.state_at(index)
+        assert actual.programs == expected.programs
+        assert actual.controllers == expected.controllers
+        assert actual.pitch_bend == expected.pitch_bend
+        assert actual.held_notes == expected.held_notes
+
+
+def test_changed_file_is_not_loaded(midi_path, cache):
+    cache.store(midi_path, compile_midi_file(midi_path))
+    generate_smf(midi_path, 500, 2, seed=4)
+    assert cache.load(midi_path) is None
+
+
+def test_corrupt_cache_file_is_removed(midi_path, cache):
+    cache.store(midi_path, compile_midi_file(midi_path))
+    cache_path = os.path.join(cache.cache_dir, cache.key_for(midi_path) + CACHE_SUFFIX)
+    with open(cache_path, "r+b") as f:
+        f.truncate(100)
+    assert cache.load(midi_path) is None
+    assert not os.path.exists(cache_path)
+
+
+def test_evicts_least_recently_used(tmp_path, cache):
+    paths = []
+    for seed in range(3):
+        path = str(tmp_path / f"song{seed}.mid")
+        generate_smf(path, 2000, 2, seed=seed + 10)
+        assert cache.store(path, compile_midi_file(path))
+        paths.append(path)
+    cache_paths = [os.path.join(cache.cache_dir, cache.key_for(path) + CACHE_SUFFIX) for path in paths]
+    # 첫 곡을 가장 최근에 사용한 것으로 만든 뒤, 두 곡만 들어가는 크기로 줄임
+    for age, cache_path in enumerate(cache_paths):
+        os.utime(cache_path, (1000 + age, 1000 + age))
+    assert cache.load(paths[0]) is not None
+    cache.max_bytes = os.path.getsize(cache_paths[0]) + os.path.getsize(cache_paths[2])
+    cache.evict()
+    assert [os.path.exists(cache_path) for cache_path in cache_paths] == [True, False, True]
@@ -0,0 +1,101 @@
+import array
+
+import pytest
+
+from bench import generate_smf
+from error_plan import ErrorPlan
+from midi_stream import StreamingTimeline
+from midi_timeline import compile_midi_file
+from playback_params import PlaybackParams
+from render import render_timeline
+from timeline_cache import TimelineCache
+from transform import EventBatches, EventTransform
+
+
+@pytest.fixture
+def midi_path(tmp_path):
+    # tempo meta 가 채널 이벤트 사이에 많이 섞인 파일 (메모리 / 스트리밍의 이벤트 인덱스가 달라짐)
+    path = str(tmp_path / "generated.mid")
+    generate_smf(path, 20000, 6, tempo_every=50, cc_every=10, seed=3)
+    return path
+
+
+@pytest.fixture
+def settings():
+    return PlaybackParams(error_enabled=True, error_percentage=15, error_pitch_range=2,
+                          timing_variance=3.0, error_seed=7).current
+
+
+def _timelines(midi_path, tmp_path):
+    compiled = compile_midi_file(midi_path)
+    cache = TimelineCache(str(tmp_path / "cache"))
+    cache.store(midi_path, compiled)
+    return compiled, StreamingTimeline.open(midi_path, background=False), cache.load(midi_path)
+
+
+def test_cursor_ordinals_match(midi_path, tmp_path):
+    compiled, stream, cached = _timelines(midi_path, tmp_path)
+    for position in (0.0, 1.5, compiled.duration / 2, compiled.duration + 1.0):
+        ordinals = [timeline.cursor(position).ordinal for timeline in (compiled, stream, cached)]
+        assert ordinals[0] == ordinals[1] == ordinals[2]
+
+
+def test_render_is_identical_across_timelines(midi_path, tmp_path, settings):
+    # 오류 계획은 채널 이벤트 순번으로 조회하므로 메모리 / 스트리밍 / 캐시 어느 쪽이든 같은 결과
+    results = [render_timeline(timeline, settings) for timeline in _timelines(midi_path, tmp_path)]
+    assert results[0].typos > 0
+    assert results[1].data == results[0].data
+    assert results[2].data == results[0].data
+
+
+def test_same_seed_same_plan(settings):
+    first, second = ErrorPlan.from_settings(settings), ErrorPlan.from_settings(settings)
+    for chunk in (0, 3):
+        assert [list(values) for values in first.chunk(chunk)] == [list(values) for values in second.chunk(chunk)]
+    other = ErrorPlan.from_settings(settings._replace(error_seed=8))
+    assert [list(values) for values in other.chunk(0)] != [list(values) for values in first.chunk(0)]
+
+
+def test_note_off_follows_typo(settings):
+    # 오타가 난 note_on 의 note_off 는 실제로 보낸 음으로
+    transform = EventTransform(settings, ErrorPlan.from_settings(settings))
+    status = array.array('B', [0x90, 0x80] * 2000)
+    data1 = array.array('B', [60, 60] * 2000)
+    data2 = array.array('B', [100, 0] * 2000)
+    out = []
+    transform.apply(status, data1, data2, None, 0, len(status), out)
+    assert transform.typo_count > 0
+    for note_on, note_off in zip(out[::2], out[1::2]):
+        assert note_off[1] == note_on[1]
+
+
+class _BlockCursor:
+    # blocks() 를 정해진 크기로 잘라 넘기는 커서 (스트리밍 블록 경계 흉내)
+    def __init__(self, times, status, block_size):
+        self.times, self.status, self.block_size = times, status, block_size
+        self.track = None
+        self.position = 0.0
+
+    def blocks(self):
+        zeros = array.array('B', bytes(len(self.status)))
+        for start in range(0, len(self.status), self.block_size):
+            end = min(start + self.block_size, len(self.status))
+            yield self.times, self.status, zeros, zeros, start, end
+
+
+def test_batches_ignore_block_boundaries():
+    times = array.array('d', [0.0, 0.0, 0.0005, 0.002, 0.002, 0.0025, 0.004, 0.01, 0.0101, 0.0102, 0.02])
+    status = array.array('B', [0x90, 0xFF, 0x90, 0xFF, 0x90, 0x90, 0xB0, 0x90, 0x80, 0xF0, 0x80])
+
+    def batches(block_size):
+        result = []
+        for batch in EventBatches(_BlockCursor(times, status, block_size), 0.001):
+            if batch is None:
+                continue
+            batch_time, gap, batch_status, _, _, _, start, end = batch
+            result.append((batch_time, round(gap, 9), [value for value in batch_status[start:end] if value < 0xF0]))
+        return result
+
+    expected = batches(len(times))
+    assert expected[0] == (0.0, 0.0, [0x90, 0x90])
+    assert [batches(size) for size in (1, 2, 3, 5)] == [expected] * 4
@@ -0,0 +1,282 @@
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+from midi_timeline import ChannelState, LoadCancelled, MidiTimeline, SeekIndex
+
+# ======================================================================================
+# MIDI PLAYER | 타임라인 캐시
+# 컴파일된 타임라인(이벤트 배열 / 탐색 체크포인트와 채널 이벤트 순번 / 길이 / 템포 맵)을 디스크에 바이너리로 저장합니다.
+# 파일 내용 해시를 키로 쓰고, 경로별 mtime / 크기가 바뀌지 않았으면 해시도 다시 계산하지 않습니다.
+# 캐시 파일은 mmap 으로 열어 이벤트 배열을 복사 없이 그대로 사용하므로, 자주 여는 파일은 거의 즉시 열립니다.
+# ======================================================================================
+
+DEFAULT_CACHE_DIR = os.path.join(".", "midi", ".cache")
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+CACHE_MAGIC = b"MTLC"
+CACHE_VERSION = 4
+CACHE_SUFFIX = ".tlc"
+# 내용 해시를 이 크기씩 나눠 계산하고 사이마다 로드 취소 확인
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+_BYTE_ORDER_MARK = 0x01020304
+
+# magic, 버전, 바이트 순서, ticks_per_beat, 트랙 수, 이벤트 수, 길이, 템포 수, extra 수, 체크포인트 수, 체크포인트 간격
+_HEADER = struct.Struct("=4sIIIIIdIIII")
+_EXTRA_ENTRY = struct.Struct("=IHI")  # 이벤트 인덱스, meta 타입 (sysex 는 _SYSEX_TYPE), 데이터 길이
+_SYSEX_TYPE = 0xFFFF
+_CHECKPOINT_SIZE = 16 + 16 * 128 + 32 + 16 * 128  # program, CC, pitch bend, 눌린 노트 velocity
+
+
+def _pad(data):
+    # 다음 섹션을 8 바이트 경계에 맞춤 (double 배열을 그대로 cast 하기 위해)
+    data.extend(bytes(-len(data) % 8))
+
+
+class TimelineCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._index = None
+
+    # ------------------------------------------------------------------ 키
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+
+    def key_for(self, file_path, cancel=None):
+        # 경로별 (mtime, 크기) 가 같으면 저장된 해시 재사용, 바뀌었으면 내용을 다시 해시
+        # cancel(Event) 이 설정되면 LoadCancelled (큰 파일은 해시만 수 초 걸림)
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._load_index().get(file_path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                return entry[2]
+
+        digest = hashlib.sha1()
+        with open(file_path, "rb") as f:
+            if stat.st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for start in range(0, stat.st_size, HASH_CHUNK_SIZE):
+                        if cancel is not None and cancel.is_set():
+                            raise LoadCancelled()
+                        digest.update(mapped[start:start + HASH_CHUNK_SIZE])
+        key = f"{digest.hexdigest()}-{stat.st_size}"
+
+        with self._lock:
+            self._load_index()[file_path] = [stat.st_mtime_ns, stat.st_size, key]
+            try:
+                self._save_index()
+            except OSError as e:
+                print(f"[ERR]: 타임라인 캐시 인덱스 저장 실패: {e}")
+        return key
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    # ------------------------------------------------------------------ 읽기 / 쓰기
+
+    def load(self, file_path, cancel=None):
+        # 캐시에 있으면 mmap 으로 연 타임라인, 없거나 손상됐으면 None
+        try:
+            key = self.key_for(file_path, cancel)
+        except OSError:
+            return None
+        cache_path = self._path_for(key)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            timeline = read_timeline(cache_path)
+        except Exception as e:
+            print(f"[ERR]: 타임라인 캐시 손상, 삭제 후 다시 컴파일: {e}")
+            self._remove(cache_path)
+            return None
+        timeline.file_path = file_path
+        try:
+            os.utime(cache_path)  # LRU 순서는 캐시 파일 mtime 으로 관리
+        except OSError:
+            pass
+        return timeline
+
+    def store(self, file_path, timeline):
+        if not timeline.complete or timeline.error is not None:
+            return False
+        try:
+            key = self.key_for(file_path)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_path = self._path_for(key)
+            temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                write_timeline(f, timeline)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            print(f"[ERR]: 타임라인 캐시 저장 실패: {e}")
+            return False
+        self.evict()
+        return True
+
+    def store_when_complete(self, file_path, timeline):
+        # 백그라운드 디코딩이 끝나면 저장 (재생을 막지 않음)
+        def worker():
+            timeline.wait_decoded()
+            self.store(file_path, timeline)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def evict(self):
+        # 전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은 캐시 파일부터 삭제
+        try:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(CACHE_SUFFIX):
+                    path = os.path.join(self.cache_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_timeline(f, timeline):
+    count = len(timeline)
+    seek_index = timeline.seek_index
+    checkpoints = seek_index.checkpoints if seek_index is not None else []
+    ordinals = seek_index.ordinals if seek_index is not None else array.array('I')
+    interval = seek_index.interval if seek_index is not None else 0
+
+    data = bytearray(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, _BYTE_ORDER_MARK, timeline.ticks_per_beat,
+                                  timeline.track_count, count, timeline.duration, len(timeline.tempo_map),
+                                  len(timeline.extra), len(checkpoints), interval))
+    _pad(data)
+    data += timeline.times[:count].tobytes()
+    data += timeline.track[:count].tobytes()
+    for column in (timeline.status, timeline.data1, timeline.data2, timeline.channel):
+        data += column[:count].tobytes()
+    _pad(data)
+
+    data += array.array('d', [seconds for seconds, _ in timeline.tempo_map]).tobytes()
+    data += array.array('I', [tempo for _, tempo in timeline.tempo_map]).tobytes()
+
+    for index in sorted(timeline.extra):
+        meta_type, payload = timeline.extra[index]
+        data += _EXTRA_ENTRY.pack(index, _SYSEX_TYPE if meta_type is None else meta_type, len(payload))
+        data += payload
+
+    for state in checkpoints:
+        data += state.programs
+        data += state.controllers
+        data += state.pitch_bend
+        data += state.held_notes
+    # 체크포인트마다 그 앞의 채널 이벤트 수 (오류 계획 순번). 체크포인트 수와 같음
+    data += array.array('I', ordinals[:len(checkpoints)]).tobytes()
+    f.write(data)
+
+
+def read_timeline(cache_path):
+    with open(cache_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        (magic, version, byte_order, ticks_per_beat, track_count, count, duration,
+         tempo_count, extra_count, checkpoint_count, interval) = _HEADER.unpack_from(view, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or byte_order != _BYTE_ORDER_MARK:
+            raise ValueError("캐시 형식 / 버전이 다릅니다.")
+        if _HEADER.size + count * 14 + tempo_count * 12 > len(view):
+            raise ValueError("캐시 파일이 잘렸습니다.")
+
+        timeline = MidiTimeline(ticks_per_beat, track_count)
+        offset = _HEADER.size + (-_HEADER.size % 8)
+        # 이벤트 배열은 복사하지 않고 mmap 위의 memoryview 를 그대로 사용 (읽기 전용)
+        timeline.times = view[offset:offset + count * 8].cast('d')
+        offset += count * 8
+        timeline.track = view[offset:offset + count * 2].cast('H')
+        offset += count * 2
+        columns = []
+        for _ in range(4):
+            columns.append(view[offset:offset + count])
+            offset += count
+        timeline.status, timeline.data1, timeline.data2, timeline.channel = columns
+        offset += -offset % 8
+
+        tempo_times = array.array('d')
+        tempo_times.frombytes(view[offset:offset + tempo_count * 8])
+        offset += tempo_count * 8
+        tempo_values = array.array('I')
+        tempo_values.frombytes(view[offset:offset + tempo_count * 4])
+        offset += tempo_count * 4
+        timeline.tempo_map = list(zip(tempo_times, tempo_values))
+
+        for _ in range(extra_count):
+            index, meta_type, length = _EXTRA_ENTRY.unpack_from(view, offset)
+            offset += _EXTRA_ENTRY.size
+            timeline.extra[index] = (None if meta_type == _SYSEX_TYPE else meta_type, bytes(view[offset:offset + length]))
+            offset += length
+
+        if offset + checkpoint_count * _CHECKPOINT_SIZE > len(view):
+            raise ValueError("캐시 파일이 잘렸습니다.")
+        seek_index = SeekIndex(timeline, interval or 1)
+        for _ in range(checkpoint_count):
+            state = ChannelState()
+            state.programs[:] = view[offset:offset + 16]
+            state.controllers[:] = view[offset + 16:offset + 16 + 16 * 128]
+            state.pitch_bend[:] = view[offset + 16 + 16 * 128:offset + 16 + 16 * 128 + 32]
+            state.held_notes[:] = view[offset + 16 + 16 * 128 + 32:offset + _CHECKPOINT_SIZE]
+            offset += _CHECKPOINT_SIZE
+            seek_index.checkpoints.append(state)
+        if offset + checkpoint_count * 4 > len(view):
+            raise ValueError("캐시 파일이 잘렸습니다.")
+        seek_index.ordinals.frombytes(view[offset:offset + checkpoint_count * 4])
+        offset += checkpoint_count * 4
+    except Exception:
+        timeline = columns = None
+        try:
+            view.release()
+            mapped.close()
+        except BufferError:
+            pass
+        raise
+
+    timeline.duration = duration
+    timeline.seek_index = seek_index
+    timeline._cache_map = mapped  # 배열 memoryview 가 참조하므로 타임라인과 수명을 같이 함
+    return timeline
@@ -0,0 +1,141 @@
+import array
+
+from error_plan import PLAN_CHUNK_MASK, PLAN_CHUNK_SHIFT
+from midi_timeline import STATUS_SYSEX
+
+# ======================================================================================
+# MIDI PLAYER | 이벤트 변환
+# 타임라인 이벤트를 실제로 보낼 바이트로 바꿉니다: 오타(음정 오차), velocity 덮어쓰기, 페달 필터, 타이밍 오차.
+# 실시간 재생(미리 읽기 단계)과 오프라인 렌더가 같은 변환을 사용하므로 같은 시드 / 설정이면 결과가 같습니다.
+# 오류 계획은 채널 이벤트(status < 0xF0) 순번으로 조회하므로 meta / sysex 를 보관하는지(메모리 / 스트리밍 / 캐시)와
+# 상관없이 같은 시드면 같은 오타 / 타이밍 오차가 나옵니다.
+# ======================================================================================
+
+
+class EventTransform:
+    def __init__(self, settings, plan=None, ordinal=0):
+        # (채널 << 7) | 원래 노트 -> 실제로 보낸 노트. note_off 를 오타가 난 음에 보내기 위함
+        self.sent_notes = bytearray(range(128)) * 16
+        self.typo_count = 0
+        self.ordinal = ordinal  # 다음 채널 이벤트의 순번 (커서 시작 위치의 cursor.ordinal)
+        self.update(settings, plan)
+
+    def update(self, settings, plan=None):
+        # 재생 중 파라미터가 바뀌면 다음 이벤트부터 적용
+        self.settings = settings
+        self.plan = plan if settings.error_enabled else None
+        self._chunk = -1
+        self._deviations = self._jitters = None
+
+    def _load_chunk(self, index):
+        self._chunk = index >> PLAN_CHUNK_SHIFT
+        self._deviations, self._jitters = self.plan.chunk(self._chunk)
+
+    def jitter(self, gap):
+        # 다음 배치의 타이밍 오차 (곡 위치 초): 직전 이벤트와의 간격(gap)에 비례하므로 누적되지 않음
+        # 배치의 첫 채널 이벤트 순번으로 조회 (apply 전에 호출)
+        if self.plan is None:
+            return 0.0
+        index = self.ordinal
+        if index >> PLAN_CHUNK_SHIFT != self._chunk:
+            self._load_chunk(index)
+        return gap * self._jitters[index & PLAN_CHUNK_MASK]
+
+    def apply(self, status_arr, data1_arr, data2_arr, track_arr, start, end, out):
+        # 블록의 start ~ end 이벤트를 변환해 out 에 (status, data1, data2, 트랙) 으로 추가
+        settings = self.settings
+        plan = self.plan
+        velocity = settings.velocity
+        pedal_enabled = settings.pedal_enabled
+        sent_notes = self.sent_notes
+        append = out.append
+        ordinal = self.ordinal
+        for i in range(start, end):
+            status = status_arr[i]
+            # meta / sysex 는 사이드 테이블에만 있고 포트로 보내지 않음 (순번도 세지 않음)
+            if status >= STATUS_SYSEX:
+                continue
+            index = ordinal
+            ordinal += 1
+
+            data1 = data1_arr[i]
+            data2 = data2_arr[i]
+            kind = status & 0xF0
+
+            if kind == 0x90 and data2 > 0:
+                note = data1
+                if plan is not None:
+                    if index >> PLAN_CHUNK_SHIFT != self._chunk:
+                        self._load_chunk(index)
+                    deviation = self._deviations[index & PLAN_CHUNK_MASK]
+                    if deviation:
+                        data1 = max(0, min(127, note + deviation))
+                        if data1 != note:
+                            self.typo_count += 1
+                sent_notes[((status & 0x0F) << 7) | note] = data1
+                data2 = velocity
+            elif kind == 0x80 or kind == 0x90:
+                key = ((status & 0x0F) << 7) | data1
+                data1 = sent_notes[key]
+                sent_notes[key] = key & 0x7F
+            elif kind == 0xB0 and data1 == 64 and not pedal_enabled:
+                continue  # 페달 비활성화 모드일 경우 sustain 무시
+
+            append((status, data1, data2, track_arr[i] if track_arr is not None else 0))
+        self.ordinal = ordinal
+
+
+class EventBatches:
+    # 커서의 블록을 전송 배치로 나눔: 채널 이벤트 시각부터 window(곡 위치 초) 이내의 이벤트를 한 번에 보냄
+    # meta / sysex / 시스템 메시지는 보내지 않으므로 배치 시작 / 간격 계산에서 빼고, 블록 끝에 걸친 배치는 다음 블록과
+    # 이어서 만듦. 그래서 블록 크기나 meta 보관 여부가 다른 메모리 / 스트리밍 / 캐시 타임라인에서도 같은 배치가 나옴
+    # 순회하면 (배치 시각, 직전 배치와의 간격, status, data1, data2, 트랙, 시작, 끝) 또는 None (아직 디코딩 중인 빈 블록)
+    def __init__(self, cursor, window):
+        self.cursor = cursor
+        self.window = window  # 재생 중 설정이 바뀌면 다음 배치부터 적용
+        self.previous = cursor.position  # 직전 배치의 마지막 채널 이벤트 위치
+
+    def __iter__(self):
+        cursor = self.cursor
+        carry = None
+        for times, status_arr, data1_arr, data2_arr, start, end in cursor.blocks():
+            if start >= end:
+                yield None
+                continue
+            track_arr = cursor.track
+            if track_arr is None:
+                track_arr = array.array('H', [0]) * len(status_arr)
+            if carry is not None:
+                # 이전 블록 끝에 남겨 둔 이벤트 뒤에 이번 블록을 이어 붙임
+                for column, source in zip(carry, (times, status_arr, data1_arr, data2_arr, track_arr)):
+                    column.extend(source[start:end])
+                times, status_arr, data1_arr, data2_arr, track_arr = carry
+                start, end = 0, len(times)
+                carry = None
+            carry = yield from self._split(times, status_arr, data1_arr, data2_arr, track_arr, start, end, False)
+        if carry is not None:
+            yield from self._split(*carry, 0, len(carry[0]), True)
+
+    def _split(self, times, status_arr, data1_arr, data2_arr, track_arr, start, end, final):
+        while start < end:
+            if status_arr[start] >= STATUS_SYSEX:
+                start += 1
+                continue
+            batch_time = times[start]
+            limit = batch_time + self.window
+            stop = start + 1
+            while stop < end and times[stop] <= limit:
+                stop += 1
+            if stop == end and not final:
+                # 다음 블록에 같은 배치의 이벤트가 더 있을 수 있음 (스트리밍 블록은 재사용되므로 복사해 둠)
+                return (array.array('d', times[start:end]), array.array('B', status_arr[start:end]),
+                        array.array('B', data1_arr[start:end]), array.array('B', data2_arr[start:end]),
+                        array.array('H', track_arr[start:end]))
+            last = stop - 1
+            while status_arr[last] >= STATUS_SYSEX:
+                last -= 1
+            gap = batch_time - self.previous
+            self.previous = times[last]
+            yield batch_time, gap, status_arr, data1_arr, data2_arr, track_arr, start, stop
+            start = stop
+        return None